@@ -0,0 +1,62 @@
+"""
+Micro-benchmark: JSON body parse cost for typical order payloads.
+
+Compares stdlib json against orjson (if installed) and shows what the
+old otp_send path cost (key_func parsed twice + view parsed once).
+
+Usage:
+    python benchmarks/bench_json_parse.py [--items 5] [--number 20000]
+"""
+import argparse
+import json
+import timeit
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def build_order_payload(items):
+    """Build a payload shaped like POST /api/orders/."""
+    return {
+        'items': [{'product_id': 1000 + i, 'quantity': (i % 3) + 1} for i in range(items)],
+        'payment_method': 'card',
+        'delivery_method': 'courier',
+        'delivery_address': 'г. Москва, ул. Тверская, д. 1, кв. 10',
+        'delivery_cost': '350.00',
+        'discount': '0',
+        'promo_code': 'WINTER2025',
+        'customer_name': 'Иван Петров',
+        'customer_email': 'ivan.petrov@example.com',
+        'customer_phone': '+79991234567',
+        'customer_note': 'Позвонить за час до доставки',
+    }
+
+
+def bench(label, func, number):
+    seconds = timeit.timeit(func, number=number)
+    print(f'{label:<32} {seconds / number * 1e6:8.2f} us/op')
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=5, help='Order line items')
+    parser.add_argument('--number', type=int, default=20000, help='Iterations')
+    args = parser.parse_args()
+
+    raw = json.dumps(build_order_payload(args.items), ensure_ascii=False).encode('utf-8')
+    print(f'payload: {len(raw)} bytes, {args.items} items, {args.number} iterations\n')
+
+    stdlib = bench('json.loads x1', lambda: json.loads(raw), args.number)
+    bench('json.loads x3 (old otp_send)', lambda: [json.loads(raw) for _ in range(3)], args.number)
+    if orjson is not None:
+        fast = bench('orjson.loads x1', lambda: orjson.loads(raw), args.number)
+        print(f'\norjson speedup over json: {stdlib / fast:.1f}x')
+    else:
+        print('\norjson not installed; request_body falls back to json')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: bulk product import vs one create_product call per row.
+
+Generates a CSV catalog (2 images and 3 attributes per product), imports
+it into an empty database, then imports it again with changed prices and
+images (the update path). A sample of rows goes through
+ProductService.create_product for comparison.
+
+Usage:
+    python benchmarks/bench_product_import.py [--rows 100000] [--chunk-size 1000]
+        [--database sqlite:////tmp/bench_import.db] [--sample 2000]
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from vavip import create_app  # noqa: E402
+from vavip.config import TestingConfig  # noqa: E402
+from vavip.extensions import db  # noqa: E402
+
+
+def build_csv(rows, price_offset=0, image_variant='a'):
+    """CSV catalog with `rows` products."""
+    out = io.StringIO()
+    out.write('sku,name,slug,price,stock_quantity,images,attr.Power,attr.Color,attr.Warranty\n')
+    for i in range(rows):
+        out.write(
+            f'BENCH-{i:07d},Product {i},bench-product-{i},{100 + i % 5000 + price_offset},{i % 50},'
+            f'https://cdn.example.com/{i}/{image_variant}1.jpg|https://cdn.example.com/{i}/2.jpg,'
+            f'{i % 30} kW,{("red", "green", "blue")[i % 3]},{1 + i % 5} years\n'
+        )
+    return out.getvalue().encode('utf-8')
+
+
+def timed_import(label, payload, chunk_size):
+    from vavip.services.product_import_service import ProductImportService
+
+    started = time.perf_counter()
+    report = ProductImportService.import_stream(io.BytesIO(payload), 'csv', chunk_size=chunk_size)
+    seconds = time.perf_counter() - started
+    rows = report['processed']
+    print(f'{label:<28} {rows:>7} rows {seconds:8.2f} s {rows / seconds:10.0f} rows/s '
+          f'(inserted {report["inserted"]}, updated {report["updated"]}, failed {report["failed"]})')
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000, help='Products in the catalog')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='Rows per transaction')
+    parser.add_argument('--sample', type=int, default=2000, help='Rows imported through create_product')
+    parser.add_argument('--database', default=None, help='SQLAlchemy URL (default: temporary SQLite file)')
+    args = parser.parse_args()
+
+    database = args.database or f'sqlite:///{tempfile.mkdtemp()}/bench_import.db'
+
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = database
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        print(f'database: {database}, chunk size {args.chunk_size}\n')
+
+        timed_import('bulk import (insert)', build_csv(args.rows), args.chunk_size)
+        timed_import('bulk import (update)', build_csv(args.rows, price_offset=7, image_variant='b'),
+                     args.chunk_size)
+
+        from vavip.services.product_service import ProductService
+        started = time.perf_counter()
+        for i in range(args.sample):
+            ProductService.create_product({
+                'sku': f'SINGLE-{i:07d}', 'name': f'Single {i}', 'slug': f'single-{i}', 'price': 100 + i,
+            })
+        seconds = time.perf_counter() - started
+        print(f'{"create_product per row":<28} {args.sample:>7} rows {seconds:8.2f} s '
+              f'{args.sample / seconds:10.0f} rows/s (no images or attributes)')
+        db.session.remove()
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""daily sales rollup
+
+Revision ID: 3d9a6e2f8b15
+Revises: 7b41c1c2a3f0
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d9a6e2f8b15'
+down_revision = '7b41c1c2a3f0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'daily_sales_rollup',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('product_name', sa.String(length=200), nullable=True),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('orders', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'category_id', 'product_id'),
+    )
+
+    # Backfill from existing paid orders (product rows + day-total rows)
+    op.execute("""
+        INSERT INTO daily_sales_rollup (day, category_id, product_id, product_name, quantity, revenue, orders)
+        SELECT date(o.created_at), COALESCE(p.category_id, 0), oi.product_id, MAX(oi.product_name),
+               SUM(oi.quantity), SUM(oi.total), COUNT(DISTINCT o.id)
+        FROM order_items oi
+        JOIN orders o ON o.id = oi.order_id
+        LEFT JOIN products p ON p.id = oi.product_id
+        WHERE o.payment_status = 'paid'
+        GROUP BY date(o.created_at), COALESCE(p.category_id, 0), oi.product_id
+    """)
+    op.execute("""
+        INSERT INTO daily_sales_rollup (day, category_id, product_id, product_name, quantity, revenue, orders)
+        SELECT date(o.created_at), 0, 0, NULL, 0, SUM(o.total), COUNT(o.id)
+        FROM orders o
+        WHERE o.payment_status = 'paid'
+        GROUP BY date(o.created_at)
+    """)
+
+
+def downgrade():
+    op.drop_table('daily_sales_rollup')
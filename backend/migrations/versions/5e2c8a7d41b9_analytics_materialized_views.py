@@ -0,0 +1,83 @@
+"""analytics materialized views
+
+Revision ID: 5e2c8a7d41b9
+Revises: 3d9a6e2f8b15
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2c8a7d41b9'
+down_revision = '3d9a6e2f8b15'
+branch_labels = None
+depends_on = None
+
+
+VIEWS = {
+    'mv_sales_by_day': (
+        """
+        SELECT date(o.created_at) AS day, COUNT(o.id) AS orders, SUM(o.total) AS revenue
+        FROM orders o
+        WHERE o.payment_status = 'paid'
+        GROUP BY date(o.created_at)
+        """,
+        'day'
+    ),
+    'mv_product_sales_by_day': (
+        """
+        SELECT date(o.created_at) AS day, oi.product_id AS product_id,
+               MAX(oi.product_name) AS product_name,
+               SUM(oi.quantity) AS quantity, SUM(oi.total) AS revenue
+        FROM order_items oi
+        JOIN orders o ON o.id = oi.order_id
+        WHERE o.payment_status = 'paid'
+        GROUP BY date(o.created_at), oi.product_id
+        """,
+        'day, product_id'
+    ),
+    'mv_category_revenue_by_day': (
+        """
+        SELECT date(o.created_at) AS day, c.id AS category_id, c.name AS category_name,
+               SUM(oi.total) AS revenue
+        FROM order_items oi
+        JOIN orders o ON o.id = oi.order_id
+        JOIN products p ON p.id = oi.product_id
+        JOIN categories c ON c.id = p.category_id
+        WHERE o.payment_status = 'paid'
+        GROUP BY date(o.created_at), c.id, c.name
+        """,
+        'day, category_id'
+    ),
+}
+
+
+def upgrade():
+    op.create_table(
+        'analytics_view_refreshes',
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+        sa.Column('duration_ms', sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+    postgres = op.get_bind().dialect.name == 'postgresql'
+    for name, (select, key) in VIEWS.items():
+        if postgres:
+            # Unique index is required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+            op.execute(f'CREATE MATERIALIZED VIEW {name} AS {select}')
+            op.execute(f'CREATE UNIQUE INDEX ix_{name}_key ON {name} ({key})')
+            op.execute(
+                f"INSERT INTO analytics_view_refreshes (name, refreshed_at) VALUES ('{name}', timezone('utc', now()))"
+            )
+        else:
+            op.execute(f'CREATE VIEW {name} AS {select}')
+
+
+def downgrade():
+    postgres = op.get_bind().dialect.name == 'postgresql'
+    for name in VIEWS:
+        op.execute(f'DROP {"MATERIALIZED " if postgres else ""}VIEW IF EXISTS {name}')
+    op.drop_table('analytics_view_refreshes')
@@ -0,0 +1,46 @@
+"""orders (payment_status, created_at) index
+
+Revision ID: 8f4b1d6c2e73
+Revises: 5e2c8a7d41b9
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f4b1d6c2e73'
+down_revision = '5e2c8a7d41b9'
+branch_labels = None
+depends_on = None
+
+
+SALES_BY_DAY = """
+    SELECT date(o.created_at) AS day, COUNT(o.id) AS orders, SUM(o.total) AS revenue
+    FROM orders o
+    WHERE o.payment_status = 'paid'
+    GROUP BY date(o.created_at)
+"""
+
+
+def upgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.create_index('ix_orders_payment_status_created_at', ['payment_status', 'created_at'], unique=False)
+
+    # The sales chart now buckets live orders by local time; the UTC-day view is unused
+    postgres = op.get_bind().dialect.name == 'postgresql'
+    op.execute(f'DROP {"MATERIALIZED " if postgres else ""}VIEW IF EXISTS mv_sales_by_day')
+    op.execute("DELETE FROM analytics_view_refreshes WHERE name = 'mv_sales_by_day'")
+
+
+def downgrade():
+    postgres = op.get_bind().dialect.name == 'postgresql'
+    if postgres:
+        op.execute(f'CREATE MATERIALIZED VIEW mv_sales_by_day AS {SALES_BY_DAY}')
+        op.execute('CREATE UNIQUE INDEX ix_mv_sales_by_day_key ON mv_sales_by_day (day)')
+    else:
+        op.execute(f'CREATE VIEW mv_sales_by_day AS {SALES_BY_DAY}')
+
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_index('ix_orders_payment_status_created_at')
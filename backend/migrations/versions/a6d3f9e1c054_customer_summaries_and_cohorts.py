@@ -0,0 +1,55 @@
+"""customer summaries and cohorts
+
+Revision ID: a6d3f9e1c054
+Revises: 8f4b1d6c2e73
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d3f9e1c054'
+down_revision = '8f4b1d6c2e73'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'customer_summaries',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('order_count', sa.Integer(), nullable=False),
+        sa.Column('paid_order_count', sa.Integer(), nullable=False),
+        sa.Column('total_spent', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('first_order_at', sa.DateTime(), nullable=True),
+        sa.Column('last_order_at', sa.DateTime(), nullable=True),
+        sa.Column('cohort_month', sa.Date(), nullable=True),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+    with op.batch_alter_table('customer_summaries', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_customer_summaries_total_spent'), ['total_spent'], unique=False)
+        batch_op.create_index(batch_op.f('ix_customer_summaries_last_order_at'), ['last_order_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_customer_summaries_cohort_month'), ['cohort_month'], unique=False)
+
+    op.create_table(
+        'customer_cohorts',
+        sa.Column('cohort_month', sa.Date(), nullable=False),
+        sa.Column('period', sa.Integer(), nullable=False),
+        sa.Column('customers', sa.Integer(), nullable=False),
+        sa.Column('orders', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint('cohort_month', 'period'),
+    )
+
+
+def downgrade():
+    op.drop_table('customer_cohorts')
+    with op.batch_alter_table('customer_summaries', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_customer_summaries_cohort_month'))
+        batch_op.drop_index(batch_op.f('ix_customer_summaries_last_order_at'))
+        batch_op.drop_index(batch_op.f('ix_customer_summaries_total_spent'))
+    op.drop_table('customer_summaries')
@@ -0,0 +1,34 @@
+"""daily product views
+
+Revision ID: b2e7c4a9d318
+Revises: a6d3f9e1c054
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2e7c4a9d318'
+down_revision = 'a6d3f9e1c054'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'daily_product_views',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('views', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'product_id'),
+    )
+    with op.batch_alter_table('daily_product_views', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_daily_product_views_product_id'), ['product_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('daily_product_views', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_daily_product_views_product_id'))
+    op.drop_table('daily_product_views')
@@ -0,0 +1,34 @@
+"""product ranking scores
+
+Revision ID: c4f1a8e6b207
+Revises: b2e7c4a9d318
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f1a8e6b207'
+down_revision = 'b2e7c4a9d318'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('popularity_score', sa.Float(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('sales_score', sa.Float(), nullable=False, server_default='0'))
+        batch_op.create_index(batch_op.f('ix_products_popularity_score'), ['popularity_score'], unique=False)
+        batch_op.create_index(batch_op.f('ix_products_sales_score'), ['sales_score'], unique=False)
+
+
+def downgrade():
+    # Plain ALTER TABLE ... DROP COLUMN (SQLite 3.35+), not a batch rebuild:
+    # rebuilding products fails on SQLite while the analytics views created
+    # in 5e2c8a7d41b9 reference the table
+    op.drop_index(op.f('ix_products_sales_score'), table_name='products')
+    op.drop_index(op.f('ix_products_popularity_score'), table_name='products')
+    op.drop_column('products', 'sales_score')
+    op.drop_column('products', 'popularity_score')
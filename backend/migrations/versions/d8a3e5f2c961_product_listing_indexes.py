@@ -0,0 +1,44 @@
+"""product listing indexes
+
+Revision ID: d8a3e5f2c961
+Revises: c4f1a8e6b207
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8a3e5f2c961'
+down_revision = 'c4f1a8e6b207'
+branch_labels = None
+depends_on = None
+
+
+LISTING_INDEXES = {
+    'ix_products_active_created_at': ['is_active', 'created_at'],
+    'ix_products_active_price': ['is_active', 'price'],
+    'ix_products_active_name': ['is_active', 'name'],
+    'ix_products_active_popularity': ['is_active', 'popularity_score'],
+    'ix_products_active_sales': ['is_active', 'sales_score'],
+    'ix_products_active_category_created_at': ['is_active', 'category_id', 'created_at'],
+    'ix_products_active_category_price': ['is_active', 'category_id', 'price'],
+}
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        # Superseded by the (is_active, score) indexes
+        batch_op.drop_index('ix_products_popularity_score')
+        batch_op.drop_index('ix_products_sales_score')
+        for name, columns in LISTING_INDEXES.items():
+            batch_op.create_index(name, columns, unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        for name in reversed(list(LISTING_INDEXES)):
+            batch_op.drop_index(name)
+        batch_op.create_index('ix_products_sales_score', ['sales_score'], unique=False)
+        batch_op.create_index('ix_products_popularity_score', ['popularity_score'], unique=False)
@@ -0,0 +1,60 @@
+"""typed product attributes
+
+Revision ID: e1b6d4c8a527
+Revises: d8a3e5f2c961
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1b6d4c8a527'
+down_revision = 'd8a3e5f2c961'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'attribute_definitions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('code', sa.String(length=50), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('type', sa.String(length=20), nullable=False),
+        sa.Column('unit', sa.String(length=20), nullable=True),
+        sa.Column('options', sa.JSON(), nullable=True),
+        sa.Column('sort_order', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    with op.batch_alter_table('attribute_definitions', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_attribute_definitions_code'), ['code'], unique=True)
+
+    op.create_table(
+        'product_attribute_values',
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('attribute_id', sa.Integer(), nullable=False),
+        sa.Column('value_numeric', sa.Numeric(precision=14, scale=4), nullable=True),
+        sa.Column('value_enum', sa.String(length=100), nullable=True),
+        sa.Column('value_bool', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['attribute_id'], ['attribute_definitions.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('product_id', 'attribute_id'),
+    )
+    with op.batch_alter_table('product_attribute_values', schema=None) as batch_op:
+        batch_op.create_index('ix_attribute_values_numeric', ['attribute_id', 'value_numeric', 'product_id'], unique=False)
+        batch_op.create_index('ix_attribute_values_enum', ['attribute_id', 'value_enum', 'product_id'], unique=False)
+        batch_op.create_index('ix_attribute_values_bool', ['attribute_id', 'value_bool', 'product_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('product_attribute_values', schema=None) as batch_op:
+        batch_op.drop_index('ix_attribute_values_bool')
+        batch_op.drop_index('ix_attribute_values_enum')
+        batch_op.drop_index('ix_attribute_values_numeric')
+    op.drop_table('product_attribute_values')
+    with op.batch_alter_table('attribute_definitions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_attribute_definitions_code'))
+    op.drop_table('attribute_definitions')
@@ -0,0 +1,48 @@
+"""category closure table
+
+Revision ID: f5c2b9d7e4a3
+Revises: e1b6d4c8a527
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5c2b9d7e4a3'
+down_revision = 'e1b6d4c8a527'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    closure = op.create_table(
+        'category_closure',
+        sa.Column('ancestor_id', sa.Integer(), nullable=False),
+        sa.Column('descendant_id', sa.Integer(), nullable=False),
+        sa.Column('depth', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['ancestor_id'], ['categories.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['descendant_id'], ['categories.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id'),
+    )
+    with op.batch_alter_table('category_closure', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_category_closure_descendant_id'), ['descendant_id'], unique=False)
+
+    # Backfill from parent links
+    parents = dict(op.get_bind().execute(sa.text('SELECT id, parent_id FROM categories')).fetchall())
+    rows = []
+    for category_id in parents:
+        node, depth, seen = category_id, 0, set()
+        while node is not None and node in parents and node not in seen:
+            seen.add(node)
+            rows.append({'ancestor_id': node, 'descendant_id': category_id, 'depth': depth})
+            node, depth = parents[node], depth + 1
+    if rows:
+        op.bulk_insert(closure, rows)
+
+
+def downgrade():
+    with op.batch_alter_table('category_closure', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_category_closure_descendant_id'))
+    op.drop_table('category_closure')
@@ -1,11 +1,13 @@
 """
 Application entry point for Gunicorn
 """
-from vavip import create_app
+from vavip import create_app, start_background_tasks
 import os
 
 # Create app instance for Gunicorn
 app = create_app()
+# Periodic jobs run in serving processes only (not in `flask ...` CLI commands)
+start_background_tasks(app)
 
 if __name__ == '__main__':
     # Development mode
@@ -1,10 +1,17 @@
 """
 Pytest fixtures and configuration
 """
+import hashlib
+import uuid
+from contextlib import contextmanager
 import pytest
+import redis
+from flask_jwt_extended import create_access_token
 from vavip import create_app
 from vavip.extensions import db
 from vavip.config import TestingConfig
+from vavip.models import User
+from vavip.utils.query_stats import count_queries
 
 
 @pytest.fixture(scope='session')
@@ -51,13 +58,111 @@ def auth_headers(client):
     return {'Authorization': f'Bearer {data["access_token"]}'}
 
 
+@pytest.fixture
+def user_headers(app):
+    """Create a user with the given role and return its auth headers."""
+    def make(role='customer'):
+        user = User(email=f'{role}-{uuid.uuid4().hex[:8]}@example.com', role=role, is_active=True)
+        user.set_password('testpassword123')
+        db.session.add(user)
+        db.session.commit()
+        return user, {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+    return make
 
 
+@pytest.fixture
+def assert_max_queries(app):
+    """
+    Fail when a block runs more SQL statements than allowed.
+
+    Usage:
+        with assert_max_queries(6):
+            client.get('/api/products/')
+    """
+    @contextmanager
+    def check(limit):
+        with count_queries() as stats:
+            yield stats
+        db.session.expire_all()
+        repeated = ''.join(f'\n  {n}x {statement}' for statement, n in stats.repeated(5))
+        assert stats.count <= limit, f'{stats.count} queries, budget {limit}{repeated}'
+    return check
+
+
+class _FakeRedisServer:
+    """
+    In-process stand-in for a Redis server behind a real redis.Redis client.
+    
+    Replaces only the connection, so pipelines and Lua scripts go through
+    redis-py itself. Supports GET, INCRBY, PFADD, EXPIRE, SCRIPT EXISTS /
+    LOAD and EVALSHA (which replies 1); keys in `wrong_type` answer WRONGTYPE
+    and connections fail while `down` is set.
+    """
+    
+    def __init__(self):
+        self.down = False
+        self.connects = 0
+        self.data = {}
+        self.scripts = {}
+        self.wrong_type = set()
+        server = self
+        
+        class Connection(redis.Connection):
+            def connect(self):
+                server.connects += 1
+                if server.down:
+                    raise redis.ConnectionError('down')
+            
+            def disconnect(self, *args):
+                pass
+            
+            def can_read(self, timeout=0):
+                return False
+            
+            def send_command(self, *args, **kwargs):
+                self.replies = [server.reply(*args)]
+            
+            def pack_commands(self, commands):
+                return [tuple(args) for args in commands]
+            
+            def send_packed_command(self, command, check_health=True):
+                self.replies = [server.reply(*args) for args in command]
+            
+            def read_response(self, *args, **kwargs):
+                reply = self.replies.pop(0)
+                if isinstance(reply, redis.ResponseError):
+                    raise reply
+                return reply
+        
+        self.client = redis.Redis(connection_pool=redis.ConnectionPool(connection_class=Connection))
+    
+    def reply(self, command, *args):
+        command = command.upper()
+        keys = args[2:2 + int(args[1])] if command == 'EVALSHA' else args[:1]
+        if self.wrong_type.intersection(keys):
+            return redis.ResponseError('WRONGTYPE Operation against a key holding the wrong kind of value')
+        if command in ('PFADD', 'EXPIRE'):
+            return 1
+        if command == 'GET':
+            return self.data.get(args[0])
+        if command == 'INCRBY':
+            self.data[args[0]] = int(self.data.get(args[0], 0)) + int(args[1])
+            return self.data[args[0]]
+        if command == 'SCRIPT EXISTS':
+            return [int(sha in self.scripts) for sha in args]
+        if command == 'SCRIPT LOAD':
+            body = args[0] if isinstance(args[0], bytes) else args[0].encode()
+            sha = hashlib.sha1(body).hexdigest()
+            self.scripts[sha] = args[0]
+            return sha
+        if command == 'EVALSHA':
+            if args[0] not in self.scripts:
+                return redis.exceptions.NoScriptError('No matching script. Please use EVAL.')
+            return 1
+        return redis.ResponseError(f'unknown command {command}')
 
 
-
-
-
-
-
-
+@pytest.fixture
+def redis_server():
+    """Create an in-process Redis server; its `client` is a real redis.Redis."""
+    return _FakeRedisServer()
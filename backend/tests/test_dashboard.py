@@ -0,0 +1,15 @@
+"""
+Dashboard API tests
+"""
+
+
+def test_dashboard_approx_flag(client, user_headers):
+    """Test ?approx= only switches to sketch estimates for true values."""
+    _, headers = user_headers('manager')
+    for flag, approximate in (('1', True), ('true', True), ('0', False), ('false', False)):
+        response = client.get(f'/api/dashboard/products/1/buyers?approx={flag}', headers=headers)
+        assert response.status_code == 200
+        assert response.get_json()['approximate'] is approximate
+        response = client.get(f'/api/dashboard/top-products?approx={flag}', headers=headers)
+        assert response.status_code == 200
+        assert response.get_json().get('approximate', False) is approximate
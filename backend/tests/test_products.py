@@ -4,6 +4,7 @@ Products API tests
 import pytest
 from vavip.extensions import db
 from vavip.models import Product, Category
+from vavip.services.product_service import CategoryService
 
 
 @pytest.fixture
@@ -117,6 +118,23 @@ def test_get_products_search(client, product):
     assert len(data['items']) > 0
 
 
+def test_get_products_facets_flag(client, app):
+    """Test ?facets= only adds facet counts to the listing for true values."""
+    with app.app_context():
+        category = Category(name='Facets', slug='api-facets', is_active=True)
+        db.session.add(category)
+        db.session.flush()
+        db.session.add(Product(name='Faceted', slug='api-faceted', price=10, category_id=category.id,
+                               is_active=True))
+        db.session.commit()
+    
+    for flag, expected in (('1', True), ('true', True), ('0', False), ('false', False)):
+        response = client.get(f'/api/products/?category=api-facets&facets={flag}')
+        
+        assert response.status_code == 200
+        assert ('facets' in response.get_json()) is expected
+
+
 def test_get_featured_products(client, app, category):
     """Test getting featured products."""
     with app.app_context():
@@ -185,5 +203,29 @@ def test_get_categories(client, category):
     assert len(data) > 0
 
 
-
-
+def test_get_category_with_children(client, app, assert_max_queries):
+    """Test the category endpoint is served from the tree snapshot with its active children."""
+    with app.app_context():
+        root = Category(name='Boilers', slug='api-boilers', is_active=True)
+        db.session.add(root)
+        db.session.flush()
+        db.session.add_all([
+            Category(name='Gas', slug='api-boilers-gas', parent_id=root.id, sort_order=1, is_active=True),
+            Category(name='Electric', slug='api-boilers-electric', parent_id=root.id, sort_order=0,
+                     is_active=True),
+            Category(name='Retired', slug='api-boilers-retired', parent_id=root.id, is_active=False),
+        ])
+        db.session.commit()
+        CategoryService.refresh_tree()
+    
+    app.config['CATEGORY_TREE_MAX_AGE'] = 300  # Testing rebuilds the snapshot on every read
+    try:
+        with assert_max_queries(0):
+            response = client.get('/api/products/categories/api-boilers')
+    finally:
+        app.config['CATEGORY_TREE_MAX_AGE'] = 0
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['slug'] == 'api-boilers' and data['parent_id'] is None
+    assert [c['slug'] for c in data['children']] == ['api-boilers-electric', 'api-boilers-gas']
+    assert 'children' not in data['children'][0]
@@ -0,0 +1,106 @@
+"""
+Query budgets for the busiest endpoints
+
+Each test seeds a few rows, then more, and checks the endpoint stays within
+a fixed number of SQL statements, so an N+1 regression (a lazy load per
+product, order item or image) fails locally.
+"""
+from vavip.extensions import db
+from vavip.models import Product, Category, Order, OrderItem
+from vavip.models.product import ProductImage, ProductAttribute
+
+PRODUCTS_BUDGET = 4
+ORDERS_BUDGET = 3
+DASHBOARD_STATS_BUDGET = 2
+# product, category, images, attributes and typed specs
+PRODUCT_DETAIL_BUDGET = 5
+
+
+def _add_products(prefix, count, category=None):
+    products = []
+    for i in range(count):
+        product = Product(name=f'{prefix} {i}', slug=f'{prefix}-{i}', sku=f'{prefix.upper()}-{i}', price=100 + i,
+                          stock_quantity=5, category=category, is_active=True)
+        product.images = [ProductImage(url=f'https://cdn.example.com/{prefix}/{i}/{n}.jpg', is_main=n == 0,
+                                       sort_order=n) for n in range(2)]
+        product.attributes = [ProductAttribute(name='Power', value=f'{i} kW')]
+        products.append(product)
+    db.session.add_all(products)
+    db.session.commit()
+    return products
+
+
+def _add_orders(prefix, user, products, count):
+    for i in range(count):
+        order = Order(order_number=f'{prefix.upper()}-{i}', user_id=user.id, subtotal=200, total=200)
+        order.items = [OrderItem(product=p, product_name=p.name, quantity=1, price=100, total=100)
+                       for p in products[:2]]
+        db.session.add(order)
+    db.session.commit()
+
+
+def test_products_listing_query_budget(client, assert_max_queries):
+    """Test the catalog listing stays within its budget as products grow."""
+    category = Category(name='Budget', slug='budget-listing', is_active=True)
+    db.session.add(category)
+    _add_products('budget-listing', 3, category)
+
+    for extra in (0, 10):
+        _add_products(f'budget-listing-more{extra}', extra, category)
+        with assert_max_queries(PRODUCTS_BUDGET):
+            response = client.get('/api/products/?per_page=50')
+        assert response.status_code == 200
+        with assert_max_queries(PRODUCTS_BUDGET):
+            response = client.get('/api/products/?category=budget-listing&per_page=50')
+        assert response.status_code == 200
+        assert len(response.get_json()['products']) == 3 + extra
+
+
+def test_product_detail_query_budget(client, assert_max_queries):
+    """Test the product detail stays within its budget as images and attributes grow."""
+    product = _add_products('budget-detail', 1)[0]
+
+    for extra in (0, 5):
+        product.images += [ProductImage(url=f'https://cdn.example.com/budget-detail/extra-{extra}-{n}.jpg',
+                                        sort_order=10 + n) for n in range(extra)]
+        product.attributes += [ProductAttribute(name=f'Extra {extra}-{n}', value='v') for n in range(extra)]
+        db.session.commit()
+        with assert_max_queries(PRODUCT_DETAIL_BUDGET):
+            response = client.get('/api/products/budget-detail-0')
+        assert response.status_code == 200
+        assert len(response.get_json()['images']) == 2 + extra
+
+
+def test_orders_query_budget(client, user_headers, assert_max_queries):
+    """Test the order list stays within its budget for customers and managers."""
+    products = _add_products('budget-orders', 2)
+    customer, customer_headers = user_headers('customer')
+    _, manager_headers = user_headers('manager')
+
+    for count in (1, 10):
+        _add_orders(f'budget-orders-{count}', customer, products, count)
+        with assert_max_queries(ORDERS_BUDGET):
+            response = client.get('/api/orders/', headers=customer_headers)
+        assert response.status_code == 200
+        assert all(len(order['items']) == 2 for order in response.get_json()['data'])
+        with assert_max_queries(ORDERS_BUDGET):
+            response = client.get('/api/orders/?all=true', headers=manager_headers)
+        assert response.status_code == 200
+
+
+def test_dashboard_stats_query_budget(app, client, user_headers, assert_max_queries):
+    """Test dashboard stats stay within budget and expose counts as headers when enabled."""
+    products = _add_products('budget-stats', 2)
+    customer, _ = user_headers('customer')
+    _, manager_headers = user_headers('manager')
+    _add_orders('budget-stats', customer, products, 10)
+
+    app.config['QUERY_STATS_HEADERS'] = True
+    try:
+        with assert_max_queries(DASHBOARD_STATS_BUDGET) as stats:
+            response = client.get('/api/dashboard/stats', headers=manager_headers)
+    finally:
+        app.config['QUERY_STATS_HEADERS'] = False
+    assert response.status_code == 200
+    assert int(response.headers['X-Query-Count']) == stats.count
+    assert float(response.headers['X-Query-Time-Ms']) >= 0
@@ -1,12 +1,36 @@
 """
 Service layer tests
 """
+import fnmatch
 import pytest
-from vavip.extensions import db
-from vavip.models import User, Order, Product, Category
+from decimal import Decimal
+from vavip.extensions import db, socketio
+from datetime import datetime, timedelta
+from vavip.models import User, Order, Product, Category, PhoneOTP, CustomerSummary, DailySalesRollup, \
+    DailyProductViews, Feedback, CategoryClosure
 from vavip.services.auth_service import AuthService
 from vavip.services.order_service import OrderService
 from vavip.services.analytics_service import AnalyticsService
+from vavip.services.maintenance_service import MaintenanceService
+from vavip.services.sales_rollup_service import SalesRollupService
+from vavip.services.analytics_view_service import AnalyticsViewService
+from vavip.services.live_counters_service import LiveCountersService
+from vavip.services.customer_analytics_service import CustomerAnalyticsService
+from vavip.services.user_service import UserService
+from vavip.services.sketch_service import SketchService
+from vavip.services.view_tracking_service import ViewTrackingService
+from vavip.services.product_service import CategoryService, ProductService
+from vavip.services.product_ranking_service import ProductRankingService
+from vavip.models.product import ProductAttribute
+from vavip.models.order import OrderItem
+from vavip.services.facet_service import FacetService
+from vavip.services.attribute_service import AttributeService
+from vavip.services.product_import_service import ProductImportService
+from vavip.services.product_detail_service import ProductDetailService
+from vavip.config import TestingConfig
+from vavip.utils.sketches import CountMinTopK
+from vavip.utils.query_stats import count_queries
+from vavip import create_app
 
 
 def test_auth_service_register_user(app):
@@ -160,6 +184,50 @@ def test_analytics_service_get_stats(app):
         assert 'total_products' in stats
 
 
+def test_dashboard_stats_match_seeded_rows(app):
+    """Test every dashboard counter against the rows, with each filter on both sides of its boundary."""
+    with app.app_context():
+        now = datetime.utcnow()
+        old = now - timedelta(days=45)
+        users = [User(email=f'dash-stats-{i}@example.com', password_hash='x', created_at=created)
+                 for i, created in enumerate((now, old))]
+        db.session.add_all(users)
+        db.session.add_all([
+            Product(name='Dash active', slug='dash-stats-active', price=10, is_active=True),
+            Product(name='Dash hidden', slug='dash-stats-hidden', price=10, is_active=False),
+            Feedback(name='Dash', email='dash@example.com', message='Unread', is_read=False),
+            Feedback(name='Dash', email='dash@example.com', message='Read', is_read=True),
+        ])
+        db.session.flush()
+        for i, (status, payment, total, created) in enumerate((
+            ('pending', 'paid', 120, now - timedelta(days=2)),
+            ('delivered', 'paid', 80, now - timedelta(days=29)),
+            ('pending', 'pending', 1000, now),
+            ('delivered', 'paid', 500, old),
+            ('cancelled', 'refunded', 70, now),
+        )):
+            db.session.add(Order(order_number=f'DASH-STATS-{i}', user_id=users[0].id, status=status,
+                                 payment_status=payment, subtotal=total, total=total, created_at=created))
+        db.session.commit()
+        
+        stats = AnalyticsService.get_dashboard_stats(days=30)
+        start = datetime.utcnow() - timedelta(days=30)
+        orders = Order.query.all()
+        all_users = User.query.all()
+        assert stats == {
+            'total_users': len(all_users),
+            'new_users': sum(u.created_at >= start for u in all_users),
+            'total_products': Product.query.filter_by(is_active=True).count(),
+            'total_orders': len(orders),
+            'orders_in_period': sum(o.created_at >= start for o in orders),
+            'pending_orders': sum(o.status == 'pending' for o in orders),
+            'revenue': pytest.approx(float(sum(o.total for o in orders
+                                               if o.payment_status == 'paid' and o.created_at >= start))),
+            'unread_feedback': Feedback.query.filter_by(is_read=False).count(),
+            'period_days': 30,
+        }
+
+
 def test_order_service_insufficient_stock(app):
     """Test OrderService.create_order with insufficient stock."""
     with app.app_context():
@@ -204,3 +272,699 @@ def test_order_service_insufficient_stock(app):
                 payment_method='card'
             )
 
+
+def test_maintenance_service_purge_otps(app):
+    """Test MaintenanceService.purge_otps removes only stale codes."""
+    with app.app_context():
+        now = datetime.utcnow()
+        for i in range(5):
+            expired = PhoneOTP(phone=f'7999000000{i}', expires_at=now - timedelta(minutes=1))
+            expired.set_code('123456')
+            db.session.add(expired)
+        used = PhoneOTP(phone='79990000010', expires_at=now + timedelta(minutes=5), used_at=now)
+        used.set_code('123456')
+        live = PhoneOTP(phone='79990000011', expires_at=now + timedelta(minutes=5))
+        live.set_code('123456')
+        db.session.add_all([used, live])
+        db.session.commit()
+        
+        deleted = MaintenanceService.purge_otps(batch_size=2)
+        
+        assert deleted == 6
+        assert PhoneOTP.query.count() == 1
+        assert PhoneOTP.query.first().phone == '79990000011'
+        assert MaintenanceService.get_table_sizes()['phone_otps']['rows'] == 1
+
+
+def test_sales_rollup_tracks_payment_status(app):
+    """Test payment status changes keep the daily sales rollup in sync."""
+    with app.app_context():
+        user = User(email='rollup@example.com', is_active=True)
+        user.set_password('password123')
+        category = Category(name='Rollup', slug='rollup', is_active=True)
+        db.session.add_all([user, category])
+        db.session.commit()
+        product = Product(name='Rollup Product', slug='rollup-product', sku='ROL-001',
+                          price=100.0, stock_quantity=10, category_id=category.id, is_active=True)
+        db.session.add(product)
+        db.session.commit()
+        
+        order = OrderService.create_order(
+            user_id=user.id,
+            items=[{'product_id': product.id, 'quantity': 2}],
+            delivery_cost=50
+        )
+        OrderService.update_payment_status(order.id, 'paid')
+        
+        assert AnalyticsService.get_sales_by_day(days=1)[-1]['revenue'] == 250.0
+        assert AnalyticsService.get_top_products(days=1)[0]['total_quantity'] == 2
+        assert AnalyticsService.get_revenue_by_category(days=1) == [{'category': 'Rollup', 'revenue': 200.0}]
+        assert SalesRollupService.reconcile(order.created_at.date()) == []
+        
+        OrderService.update_payment_status(order.id, 'refunded')
+        assert AnalyticsService.get_top_products(days=1) == []
+        assert SalesRollupService.reconcile(order.created_at.date()) == []
+        
+        SalesRollupService.backfill(order.created_at.date())
+        assert all(day['orders'] == 0 for day in AnalyticsService.get_sales_by_day(days=1))
+
+
+def test_analytics_view_backend_matches_rollup(app):
+    """Test the view-backed reports return the same data as the rollup."""
+    with app.app_context():
+        user = User(email='views@example.com', is_active=True)
+        user.set_password('password123')
+        category = Category(name='Views', slug='views', is_active=True)
+        db.session.add_all([user, category])
+        db.session.commit()
+        product = Product(name='View Product', slug='view-product', sku='VIEW-001',
+                          price=40.0, stock_quantity=10, category_id=category.id, is_active=True)
+        db.session.add(product)
+        db.session.commit()
+        order = OrderService.create_order(user_id=user.id, items=[{'product_id': product.id, 'quantity': 3}])
+        OrderService.update_payment_status(order.id, 'paid')
+        
+        assert AnalyticsViewService.backend() == 'rollup'
+        rollup = (AnalyticsService.get_top_products(days=1), AnalyticsService.get_revenue_by_category(days=1))
+        
+        AnalyticsViewService.create_views()
+        app.config['ANALYTICS_BACKEND'] = 'matview'
+        try:
+            views = (AnalyticsService.get_top_products(days=1), AnalyticsService.get_revenue_by_category(days=1))
+        finally:
+            app.config['ANALYTICS_BACKEND'] = 'auto'
+        
+        assert views == rollup
+        assert views[0][0]['total_quantity'] == 3
+        assert AnalyticsService.get_refreshed_at() is not None
+        assert AnalyticsViewService.refresh() == {}  # plain views are always live
+
+
+def test_sales_by_day_buckets_in_local_time(app):
+    """Test sales buckets follow the local timezone and include empty days."""
+    with app.app_context():
+        user = User(email='buckets@example.com', is_active=True)
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.commit()
+        def orders_by_date(**kwargs):
+            return {d['date']: d['orders'] for d in AnalyticsService.get_sales_by_day(days=7, **kwargs)}
+        
+        utc_before, moscow_before = orders_by_date(tz='UTC'), orders_by_date()
+        now = datetime.utcnow()
+        # 22:30 UTC is already the next day in Moscow (UTC+3)
+        late = (now - timedelta(days=3)).replace(hour=22, minute=30)
+        db.session.add(Order(order_number='BKT-001', user_id=user.id, subtotal=100,
+                             total=100, payment_status='paid', created_at=late))
+        db.session.commit()
+        
+        utc_days, moscow_days = orders_by_date(tz='UTC'), orders_by_date()
+        
+        assert len(utc_days) == 8
+        utc_day, moscow_day = late.date().isoformat(), (late + timedelta(days=1)).date().isoformat()
+        assert utc_days[utc_day] == utc_before[utc_day] + 1
+        assert moscow_days[moscow_day] == moscow_before[moscow_day] + 1
+        
+        months = AnalyticsService.get_sales_by_day(days=7, granularity='month')
+        assert sum(m['orders'] for m in months) == sum(moscow_days.values())
+        assert all(m['date'].endswith('-01') for m in months)
+        with pytest.raises(ValueError):
+            AnalyticsService.get_sales_by_day(granularity='hour')
+        for days in (0, -5):
+            with pytest.raises(ValueError):
+                AnalyticsService.get_sales_by_day(days=days)
+
+
+def test_live_counters_push_deltas_to_admins(app):
+    """Test order events push counter deltas to the admins room."""
+    with app.app_context():
+        admin = User(email='live-admin@example.com', role='admin', is_active=True)
+        admin.set_password('password123')
+        db.session.add(admin)
+        product = Product(name='Live Product', slug='live-product', sku='LIVE-001',
+                          price=10.0, stock_quantity=10, is_active=True)
+        db.session.add(product)
+        db.session.commit()
+        
+        from flask_jwt_extended import create_access_token
+        ws = socketio.test_client(app)
+        ws.emit('authenticate', {'token': create_access_token(identity=str(admin.id))})
+        initial = next(e['args'][0] for e in ws.get_received() if e['name'] == 'dashboard_counters')
+        
+        order = OrderService.create_order(user_id=admin.id, items=[{'product_id': product.id, 'quantity': 2}])
+        OrderService.update_payment_status(order.id, 'paid')
+        OrderService.cancel_order(order.id, admin.id)
+        
+        deltas = [e['args'][0]['delta'] for e in ws.get_received() if e['name'] == 'dashboard_counters_delta']
+        assert deltas == [
+            {'orders_today': 1, 'pending_orders': 1},
+            {'revenue_today': 20.0},
+            {'pending_orders': -1}
+        ]
+        counters = LiveCountersService.get_counters()
+        assert counters['orders_today'] == initial['orders_today'] + 1
+        assert counters['revenue_today'] == initial['revenue_today'] + 20.0
+        assert counters['pending_orders'] == initial['pending_orders']
+        ws.disconnect()
+
+
+def test_customer_analytics_rebuild(app):
+    """Test customer summaries and cohorts are rebuilt from orders."""
+    with app.app_context():
+        early = User(email='cohort-early@example.com', is_active=True)
+        late = User(email='cohort-late@example.com', is_active=True)
+        for user in (early, late):
+            user.set_password('password123')
+        db.session.add_all([early, late])
+        db.session.commit()
+        
+        def add_order(user, created_at, total, payment_status='paid', status='delivered'):
+            db.session.add(Order(order_number=f'CLV-{user.id}-{created_at:%Y%m%d}-{total}', user_id=user.id,
+                                 subtotal=total, total=total, status=status,
+                                 payment_status=payment_status, created_at=created_at))
+        
+        add_order(early, datetime(2020, 1, 15, 12), 100)
+        add_order(early, datetime(2020, 3, 2, 12), 50)
+        add_order(early, datetime(2020, 3, 9, 12), 70, payment_status='pending')
+        add_order(early, datetime(2020, 4, 1, 12), 999, status='cancelled')
+        add_order(late, datetime(2020, 3, 20, 12), 30)
+        db.session.commit()
+        
+        result = CustomerAnalyticsService.rebuild(chunk_size=1)
+        assert result['customers'] >= 2
+        
+        summary = CustomerSummary.query.get(early.id)
+        assert (summary.order_count, summary.paid_order_count, float(summary.total_spent)) == (3, 2, 150.0)
+        assert summary.first_order_at == datetime(2020, 1, 15, 12)
+        assert summary.last_order_at == datetime(2020, 3, 9, 12)
+        assert summary.cohort_month.isoformat() == '2020-01-01'
+        
+        cohorts = {c['cohort_month']: c for c in CustomerAnalyticsService.get_cohorts()}
+        january = {p['period']: p for p in cohorts['2020-01-01']['periods']}
+        assert cohorts['2020-01-01']['customers'] == 1
+        assert (january[2]['orders'], january[2]['revenue']) == (2, 50.0)
+        assert cohorts['2020-03-01']['customers'] == 1
+        
+        page = CustomerAnalyticsService.get_customers(per_page=50, cohort_month=summary.cohort_month)
+        assert [c.user_id for c in page.items] == [early.id]
+        
+        stats = UserService.get_user_stats(late.id)
+        assert (stats['total_orders'], stats['completed_orders'], stats['total_spent']) == (1, 1, 30.0)
+        
+        # Orders placed after the rebuild are added live on top of the summary
+        db.session.add(Order(order_number=f'CLV-{late.id}-after-rebuild', user_id=late.id, subtotal=45, total=45,
+                             status='pending', payment_status='paid'))
+        db.session.commit()
+        stats = UserService.get_user_stats(late.id)
+        assert (stats['total_orders'], stats['completed_orders'], stats['total_spent']) == (2, 2, 75.0)
+        assert stats['first_order_at'] == datetime(2020, 3, 20, 12).isoformat()
+        assert stats['last_order_at'] > datetime(2020, 3, 20, 12).isoformat()
+        assert CustomerSummary.query.get(late.id).order_count == 1
+
+
+
+def test_sketch_helpers_and_redis_fallback(app):
+    """Test Count-Min hashing, Top-K merging and sketch queries without Redis."""
+    sketch = CountMinTopK(width=64, depth=3)
+    fields = sketch.fields(42)
+    assert fields == sketch.fields('42')
+    assert [f.split(':')[0] for f in fields] == ['0', '1', '2']
+    assert all(0 <= int(f.split(':')[1]) < 64 for f in fields)
+    
+    merged = CountMinTopK.merge_top([[('1', 5.0), ('2', 3.0)], [('2', 4.0), ('3', 1.0)]], limit=2)
+    assert merged == [('2', 7), ('1', 5)]
+    
+    with app.app_context():
+        assert SketchService.unique_visitors(7) is None
+        assert AnalyticsService.get_unique_buyers_approx(1) is None
+        with pytest.raises(ValueError):
+            AnalyticsService.get_top_products_approx('clicks')
+
+
+def test_sketch_add_on_pipeline(app, monkeypatch, redis_server):
+    """Test Count-Min / Top-K updates queued on a pipeline run, and Redis errors never escape the service."""
+    import vavip.extensions
+    from vavip.utils.circuit_breaker import CircuitBreaker, GuardedRedis
+    monkeypatch.setattr(vavip.extensions, 'redis_client', GuardedRedis(redis_server.client, CircuitBreaker('test')))
+    client = vavip.extensions.get_redis()
+    sketch = CountMinTopK(width=8, depth=2, k=3)
+    
+    pipe = client.pipeline(transaction=False)
+    assert sketch.add(client, 'cms', 'topk', 7, pipe=pipe) is pipe
+    assert sketch.add(client, 'cms', 'topk', 8, count=2, pipe=pipe) is pipe
+    assert pipe.execute() == [1, 1]  # Loaded on a server that had never seen it
+    assert len(redis_server.scripts) == 1
+    assert sketch.add(client, 'cms', 'topk', 7) == 1
+    
+    with app.app_context():
+        assert SketchService._execute(client, lambda p: sketch.add(client, 'cms', 'topk', 9, pipe=p))
+        redis_server.wrong_type.add('cms')
+        assert not SketchService._execute(client, lambda p: sketch.add(client, 'cms', 'topk', 9, pipe=p))
+        redis_server.scripts.clear()
+        redis_server.wrong_type.clear()
+        SketchService.record_product_views({(1, 'visitor-a'): 2, (2, 'visitor-b'): 1})
+        assert len(redis_server.scripts) == 1
+
+
+def test_product_views_and_ranking_scores(app):
+    """Test buffered views are flushed in one batch and feed the ranking scores."""
+    with app.app_context():
+        quiet = Product(name='Quiet', slug='views-quiet', price=10, is_active=True)
+        busy = Product(name='Busy', slug='views-busy', price=10, is_active=True)
+        db.session.add_all([quiet, busy])
+        db.session.commit()
+        
+        ViewTrackingService.flush()
+        for visitor in ('a', 'b', 'a'):
+            ViewTrackingService.record_view(busy.id, visitor)
+        ViewTrackingService.record_view(quiet.id, 'a')
+        assert ViewTrackingService.pending() == 3
+        assert busy.id not in [p['product_id'] for p in AnalyticsService.get_popular_products(limit=50)]
+        
+        assert ViewTrackingService.flush() == 4
+        assert ViewTrackingService.pending() == 0
+        ViewTrackingService.record_view(busy.id, 'c')
+        ViewTrackingService.flush()
+        
+        popular = {p['product_id']: p['views'] for p in AnalyticsService.get_popular_products(limit=50)}
+        assert (popular[busy.id], popular[quiet.id]) == (4, 1)
+        conversion = {p['product_id']: p for p in AnalyticsService.get_product_conversion(limit=50)}
+        assert (conversion[busy.id]['views'], conversion[busy.id]['conversion_rate']) == (4, 0)
+        
+        
+        # One recent sale outweighs the extra views (RANKING_SALE_WEIGHT)
+        db.session.add(DailySalesRollup(day=datetime.utcnow().date(), category_id=0, product_id=quiet.id,
+                                        quantity=1, revenue=10, orders=1))
+        db.session.commit()
+        assert ProductRankingService.recompute() >= 2
+        db.session.refresh(busy)
+        assert (busy.popularity_score, busy.sales_score) == (4.0, 0.0)
+        
+        for sort, first in (('popular', quiet), ('bestsellers', quiet)):
+            products, _ = ProductService.get_products(per_page=100, sort_by=sort)
+            ids = [p.id for p in products]
+            assert ids.index(first.id) < ids.index(busy.id)
+        assert ProductRankingService.recompute() == 0
+        
+        # Workers skip a recompute another one has just done; the next run picks up the new data
+        db.session.add(DailySalesRollup(day=datetime.utcnow().date(), category_id=0, product_id=busy.id,
+                                        quantity=1, revenue=10, orders=1))
+        db.session.commit()
+        assert ProductRankingService.recompute(min_age=60) == 0
+        db.session.query(DailyProductViews).filter(DailyProductViews.product_id == busy.id).delete()
+        db.session.commit()
+        assert ProductRankingService.recompute() >= 1
+        db.session.refresh(busy)
+        assert (busy.popularity_score, busy.sales_score) == (20.0, 1.0)
+
+
+
+def test_product_listing_query_plans(app):
+    """Test each catalog sort is an index range scan with no sort step (SQLite EXPLAIN)."""
+    with app.app_context():
+        category = CategoryService.create_category({'name': 'Plans', 'slug': 'plans', 'is_active': True})
+        db.session.add_all([
+            Product(name=f'Plan {i}', slug=f'plan-{i}', price=i, category_id=category.id, is_active=True)
+            for i in range(5)
+        ])
+        db.session.commit()
+        
+        cases = [
+            ({}, 'ix_products_active_created_at'),
+            ({'sort_by': 'price', 'sort_order': 'asc'}, 'ix_products_active_price'),
+            ({'sort_by': 'popular'}, 'ix_products_active_popularity'),
+            ({'sort_by': 'bestsellers'}, 'ix_products_active_sales'),
+            ({'category_slug': 'plans', 'sort_by': 'price'}, 'ix_products_active_category_price'),
+            ({'category_slug': 'plans'}, 'ix_products_active_category_created_at'),
+        ]
+        for kwargs, index in cases:
+            with count_queries(keep_parameters=True) as stats:
+                ProductService.get_products(per_page=3, **kwargs)
+            
+            statement, parameters = [(s, p) for s, p in stats.queries
+                                     if 'ORDER BY' in s and 'FROM products' in s][-1]
+            plan = ' | '.join(row[-1] for row in db.session.connection().exec_driver_sql(
+                f'EXPLAIN QUERY PLAN {statement}', parameters
+            ))
+            assert f'SEARCH products USING INDEX {index}' in plan, plan
+            assert 'TEMP B-TREE' not in plan, plan
+        
+        with pytest.raises(ValueError):
+            ProductService.get_products(sort_by='description')
+        with pytest.raises(ValueError):
+            ProductService.get_products(sort_order='sideways')
+
+
+def test_catalog_facets(app):
+    """Test facet filtering and counts come from the posting lists and follow product writes."""
+    with app.app_context():
+        category = CategoryService.create_category({'name': 'Boilers', 'slug': 'facet-boilers', 'is_active': True})
+        
+        def add(slug, price, power):
+            product = Product(name=slug, slug=slug, price=price, category_id=category.id, is_active=True)
+            product.attributes.append(ProductAttribute(name='Power', value=power))
+            db.session.add(product)
+            return product
+        
+        add('facet-small', 500, '2 kW')
+        add('facet-medium', 3000, '2 kW')
+        large = add('facet-large', 3000, '6 kW')
+        db.session.commit()
+        FacetService.rebuild()
+        
+        facets = ProductService.get_facets('facet-boilers', attributes={'Power': ['2 kW']})
+        assert facets['attributes']['Power'] == {'2 kW': 2, '6 kW': 1}
+        assert facets['price'] == {'0-1000': 1, '1000-5000': 1}
+        assert facets['categories'][str(category.id)] == 2
+        
+        products, pagination = ProductService.get_products(
+            category_slug='facet-boilers', price_buckets=['1000-5000'], attributes={'Power': ['2 kW']}
+        )
+        assert [p.slug for p in products] == ['facet-medium'] and pagination.total == 1
+        
+        # Writes swap in a new index; readers holding the old one are unaffected
+        before = FacetService.get_index()
+        before_counts = before.counts({})
+        ProductService.update_product(large.id, {'is_active': False})
+        assert FacetService.get_index() is not before and before.counts({}) == before_counts
+        facets = ProductService.get_facets('facet-boilers')
+        assert facets['attributes']['Power'] == {'2 kW': 2}
+
+
+
+def test_typed_attribute_filters(app):
+    """Test numeric range, enum and boolean spec filters compile to index-backed SQL."""
+    with app.app_context():
+        AttributeService.create_definition({'code': 'power', 'name': 'Power', 'type': 'numeric', 'unit': 'kW'})
+        AttributeService.create_definition({'code': 'fuel', 'name': 'Fuel', 'type': 'enum', 'options': ['gas', 'electric']})
+        AttributeService.create_definition({'code': 'wifi', 'name': 'Wi-Fi', 'type': 'boolean'})
+        with pytest.raises(ValueError):
+            AttributeService.create_definition({'code': 'power', 'name': 'Again', 'type': 'numeric'})
+        
+        products = {}
+        for slug, specs in (('spec-small', {'power': 1.5, 'fuel': 'electric', 'wifi': 'no'}),
+                            ('spec-mid', {'power': '2.4', 'fuel': 'gas', 'wifi': True}),
+                            ('spec-big', {'power': 24, 'fuel': 'gas', 'wifi': 'yes'})):
+            product = Product(name=slug, slug=slug, price=100, is_active=True)
+            db.session.add(product)
+            db.session.commit()
+            products[slug] = AttributeService.set_product_values(product.id, specs)
+        with pytest.raises(ValueError):
+            AttributeService.set_product_values(products['spec-big'].id, {'fuel': 'coal'})
+        
+        def slugs(specs):
+            items, _ = ProductService.get_products(per_page=100, specs=specs)
+            return sorted(p.slug for p in items if p.slug.startswith('spec-'))
+        
+        assert slugs({'power': {'min': 2}}) == ['spec-big', 'spec-mid']
+        assert slugs({'power': {'min': 2, 'max': 10}, 'wifi': {'eq': ['true']}}) == ['spec-mid']
+        assert slugs({'fuel': {'eq': ['electric', 'gas']}, 'power': {'max': 2}}) == ['spec-small']
+        with pytest.raises(ValueError):
+            slugs({'fuel': {'min': 1}})
+        
+        AttributeService.set_product_values(products['spec-mid'].id, {'power': None})
+        assert slugs({'power': {'min': 2}}) == ['spec-big']
+        assert [s['code'] for s in products['spec-big'].to_dict(include_details=True)['specs']] == ['fuel', 'power', 'wifi']
+        
+        clause = AttributeService.filter_clauses({'power': {'min': 2}})[0]
+        statement = db.select(Product.id).where(clause).compile(db.engine, compile_kwargs={'literal_binds': True})
+        plan = ' | '.join(row[-1] for row in db.session.connection().exec_driver_sql(
+            f'EXPLAIN QUERY PLAN {statement}'
+        ))
+        assert 'ix_attribute_values_numeric' in plan, plan
+
+
+def test_category_subtree_filtering(app):
+    """Test products of subcategories are included and the closure follows tree edits."""
+    with app.app_context():
+        root = CategoryService.create_category({'name': 'Heating', 'slug': 'tree-heating'})
+        boilers = CategoryService.create_category({'name': 'Boilers', 'slug': 'tree-boilers', 'parent_id': root.id})
+        gas = CategoryService.create_category({'name': 'Gas', 'slug': 'tree-gas', 'parent_id': boilers.id})
+        pumps = CategoryService.create_category({'name': 'Pumps', 'slug': 'tree-pumps'})
+        for slug, category in (('tree-p-boiler', boilers), ('tree-p-gas', gas), ('tree-p-pump', pumps)):
+            db.session.add(Product(name=slug, slug=slug, price=1, category_id=category.id, is_active=True))
+        db.session.commit()
+        
+        def slugs(category_slug):
+            items, _ = ProductService.get_products(per_page=100, category_slug=category_slug)
+            return sorted(p.slug for p in items)
+        
+        def assert_closure_matches_parents():
+            # Only this test's categories: rows inserted around the service have no closure rows
+            parents = dict(db.session.query(Category.id, Category.parent_id).filter(Category.slug.like('tree-%')))
+            expected = set()
+            for category_id in parents:
+                node, depth = category_id, 0
+                while node is not None:
+                    expected.add((node, category_id, depth))
+                    node, depth = parents[node], depth + 1
+            rows = db.session.query(CategoryClosure.ancestor_id, CategoryClosure.descendant_id, CategoryClosure.depth)\
+                .filter(CategoryClosure.descendant_id.in_(parents))
+            assert set(map(tuple, rows)) == expected
+        
+        assert slugs('tree-heating') == ['tree-p-boiler', 'tree-p-gas']
+        assert slugs('tree-gas') == ['tree-p-gas']
+        assert slugs('tree-missing') == []
+        assert_closure_matches_parents()
+        
+        with pytest.raises(ValueError):
+            CategoryService.update_category(root.id, {'parent_id': gas.id})
+        CategoryService.update_category(gas.id, {'parent_id': pumps.id})
+        assert slugs('tree-heating') == ['tree-p-boiler']
+        assert slugs('tree-pumps') == ['tree-p-gas', 'tree-p-pump']
+        leaf = CategoryService.create_category({'name': 'Leaf', 'slug': 'tree-leaf', 'parent_id': gas.id})
+        CategoryService.update_category(pumps.id, {'parent_id': boilers.id})
+        assert_closure_matches_parents()
+        
+        CategoryService.delete_category(pumps.id)
+        assert db.session.get(Category, gas.id).parent_id == boilers.id
+        assert_closure_matches_parents()
+        CategoryService.delete_category(leaf.id)
+        CategoryService.delete_category(boilers.id)
+        assert db.session.get(Category, gas.id).parent_id == root.id
+        assert_closure_matches_parents()
+        
+        tree = {c['slug']: c for c in CategoryService.get_all_categories()}
+        assert [c['slug'] for c in tree['tree-heating']['children']] == ['tree-gas']
+        assert slugs('tree-heating') == ['tree-p-gas']
+
+
+def test_category_tree_snapshot(app):
+    """Test slug resolution and subtree expansion are served from the snapshot without queries."""
+    with app.app_context():
+        root = CategoryService.create_category({'name': 'Snapshot', 'slug': 'snap-root'})
+        child = CategoryService.create_category({'name': 'Child', 'slug': 'snap-child', 'parent_id': root.id})
+        
+        app.config['CATEGORY_TREE_MAX_AGE'] = 300
+        try:
+            with count_queries() as stats:
+                tree = CategoryService.get_tree()
+                assert tree.subtree_ids('snap-root') == {root.id, child.id}
+                assert tree.resolve('snap-child') == child.id
+                assert tree.ancestor_ids(child.id) == [root.id]
+                assert 'snap-root' in {c['slug'] for c in CategoryService.get_all_categories()}
+                assert [c['slug'] for c in CategoryService.get_category('snap-root')['children']] == ['snap-child']
+                assert CategoryService.get_category('snap-missing') is None
+            assert stats.count == 0
+            
+            # Direct inserts bypass the version bump; a service write rebuilds the snapshot
+            db.session.add(Category(name='Direct', slug='snap-direct', parent_id=root.id, is_active=True))
+            db.session.commit()
+            assert 'snap-direct' not in CategoryService.get_tree()
+            CategoryService.update_category(child.id, {'sort_order': 5})
+            assert 'snap-direct' in CategoryService.get_tree()
+        finally:
+            app.config['CATEGORY_TREE_MAX_AGE'] = 0
+
+
+
+def test_bulk_product_import(app):
+    """Test CSV / NDJSON upserts by SKU, image and attribute diffs and the row error report."""
+    import io
+    with app.app_context():
+        CategoryService.create_category({'name': 'Import', 'slug': 'import-cat'})
+        csv_data = (
+            'sku,name,slug,price,category,images,attr.Power\n'
+            'IMP-1,Boiler,imp-boiler,100,import-cat,https://x/1.jpg|https://x/2.jpg,2 kW\n'
+            'IMP-2,Pump,imp-pump,50,,,\n'
+            'IMP-3,,,10,,,\n'
+            'IMP-4,Clash,imp-boiler,5,,,\n'
+            'IMP-5,Bad,imp-bad,abc,,,\n'
+        )
+        report = ProductImportService.import_stream(io.BytesIO(csv_data.encode()), 'csv', chunk_size=2)
+        assert (report['processed'], report['inserted'], report['updated'], report['failed']) == (5, 2, 0, 3)
+        assert [e['row'] for e in report['errors']] == [4, 5, 6]
+        assert 'price' in report['errors'][2]['error']
+        
+        ndjson = (
+            b'{"sku": "IMP-1", "price": "120", "images": ["https://x/2.jpg", "https://x/3.jpg"],'
+            b' "attributes": {"Color": "red"}}\n'
+            b'{"sku": "IMP-2", "stock_quantity": 4}\n'
+            b'not json\n'
+        )
+        report = ProductImportService.import_stream(io.BytesIO(ndjson), 'ndjson')
+        assert (report['updated'], report['failed']) == (2, 1)
+        
+        boiler = Product.query.filter_by(sku='IMP-1').one()
+        assert (boiler.name, float(boiler.price), boiler.category.slug) == ('Boiler', 120.0, 'import-cat')
+        assert [(i.url, i.is_main) for i in boiler.images] == [
+            ('https://x/2.jpg', True), ('https://x/3.jpg', False)
+        ]
+        assert [(a.name, a.value) for a in boiler.attributes] == [('Color', 'red')]
+        assert Product.query.filter_by(sku='IMP-2').one().stock_quantity == 4
+
+
+
+def test_bulk_price_stock_update(app):
+    """Test batched price / stock changes run as one UPDATE ... FROM (VALUES ...)."""
+    with app.app_context():
+        products = [
+            Product(name=f'Bulk {i}', slug=f'bulk-{i}', sku=f'BULK-{i}', price=100, old_price=150,
+                    stock_quantity=5, is_active=True)
+            for i in range(3)
+        ]
+        db.session.add_all(products)
+        db.session.commit()
+        first, second, third = products
+        
+        with count_queries() as stats:
+            result = ProductService.bulk_update_prices_stock([
+                {'id': first.id, 'price': Decimal('90'), 'old_price': None},
+                {'sku': 'BULK-1', 'stock_quantity': 0},
+                {'sku': 'BULK-2', 'price': Decimal('100')},
+                {'sku': 'missing', 'price': Decimal('1')},
+            ])
+        
+        assert result['updated'] == 2 and result['unchanged'] == 1
+        assert result['not_found'] == ['missing']
+        assert (result['price_changes'], result['stock_changes']) == (1, 1)
+        updates = [s for s in stats.statements if 'UPDATE products' in s]
+        assert len(updates) == 1 and 'VALUES' in updates[0] and 'FROM changes' in updates[0]
+        
+        db.session.expire_all()
+        assert (float(first.price), first.old_price, first.stock_quantity) == (90.0, None, 5)
+        assert (float(second.price), float(second.old_price), second.stock_quantity) == (100.0, 150.0, 0)
+
+
+
+class _DictRedis:
+    """Just enough of GuardedRedis for the product detail cache."""
+    
+    class breaker:
+        is_open = False
+    
+    def __init__(self):
+        self.data = {}
+    
+    def get(self, key):
+        return self.data.get(key)
+    
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+    
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+    
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+    
+    def scan(self, cursor=0, match='*', count=10):
+        # One key per page over a snapshot, so callers must follow the cursor to the end
+        if cursor == 0:
+            self.scanned = sorted(key for key in self.data if fnmatch.fnmatchcase(key, match))
+        page = self.scanned[cursor:cursor + 1]
+        return (cursor + 1 if cursor + 1 < len(self.scanned) else 0), page
+    
+    def pipeline(self, transaction=True):
+        return self
+    
+    def execute(self):
+        return []
+
+
+def test_product_detail_cache(app, monkeypatch):
+    """Test detail payloads are cached by slug and id and invalidated by product writes."""
+    import vavip.extensions
+    fake = _DictRedis()
+    monkeypatch.setattr(vavip.extensions, 'redis_client', fake)
+    with app.app_context():
+        product = Product(name='Detail', slug='detail-cache', sku='DETAIL-1', price=10, stock_quantity=3,
+                          is_active=True)
+        db.session.add(product)
+        db.session.commit()
+        
+        cached = lambda: {key for key in fake.data if key.startswith('cache:product_detail:')}
+        payload = ProductDetailService.get_by_slug('detail-cache')
+        assert payload['stock_quantity'] == 3 and payload['images'] == []
+        assert cached() == {'cache:product_detail:slug:detail-cache', f'cache:product_detail:id:{product.id}'}
+        
+        with count_queries() as stats:
+            assert ProductDetailService.get_by_id(product.id)['slug'] == 'detail-cache'
+        assert stats.count == 0
+        
+        ProductService.update_product(product.id, {'slug': 'detail-renamed'})
+        assert cached() == set()
+        assert ProductDetailService.get_by_slug('detail-cache') is None
+        ProductService.bulk_update_prices_stock([{'sku': 'DETAIL-1', 'stock_quantity': 7}])
+        assert ProductDetailService.get_by_slug('detail-renamed')['stock_quantity'] == 7
+        ProductService.update_stock(product.id, -2)
+        assert ProductDetailService.get_by_id(product.id)['stock_quantity'] == 5
+        
+        # Category changes drop every payload through SCAN, leaving other caches alone
+        other = Product(name='Detail 2', slug='detail-cache-2', price=10, is_active=True)
+        db.session.add(other)
+        db.session.commit()
+        ProductDetailService.get_by_slug('detail-cache-2')
+        fake.data['cache:featured_products:x'] = '[]'
+        assert len(cached()) == 4
+        category = CategoryService.create_category({'name': 'Detail', 'slug': 'detail-cache-cat'})
+        CategoryService.update_category(category.id, {'name': 'Detail renamed'})
+        assert cached() == set()
+        assert 'cache:featured_products:x' in fake.data
+
+
+
+def test_user_orders_use_preloaded_items(app):
+    """Test the user order history query count does not grow with orders or order items."""
+    with app.app_context():
+        user = User(email='counted@example.com', password_hash='x')
+        product = Product(name='Counted', slug='counted-0', price=10, is_active=True)
+        db.session.add_all([user, product])
+        db.session.commit()
+        
+        def add_order(i):
+            order = Order(order_number=f'COUNTED-{i}', user_id=user.id, subtotal=1, total=1)
+            order.items = [OrderItem(product=product, product_name=product.name, quantity=1, price=1, total=1)
+                           for _ in range(2)]
+            db.session.add(order)
+            db.session.commit()
+        
+        def query_count():
+            with count_queries() as stats:
+                orders = UserService.get_user_orders(user.id, limit=50)
+            db.session.expire_all()
+            assert all(len(o['items']) == 2 for o in orders)
+            return stats.count
+        
+        add_order(0)
+        budget = query_count()
+        for i in range(1, 4):
+            add_order(i)
+        assert query_count() == budget
+
+
+def test_background_tasks_start_only_when_serving(monkeypatch):
+    """Test create_app (as used by `flask db upgrade`) starts no loops; the server entry point does."""
+    from vavip import start_background_tasks
+    started = []
+    monkeypatch.setattr(socketio, 'start_background_task', lambda target, *args: started.append(target.__name__))
+    
+    class ServingConfig(TestingConfig):
+        TESTING = False
+    
+    serving_app = create_app(ServingConfig)
+    assert started == []
+    start_background_tasks(serving_app)
+    assert sorted(started) == ['_flush_loop', '_recompute_loop']  # View refresh is PostgreSQL only
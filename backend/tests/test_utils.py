@@ -0,0 +1,309 @@
+"""
+Utility tests
+"""
+import json
+import logging
+import pytest
+import redis
+import vavip.extensions
+from sqlalchemy import update
+from vavip import create_app
+from vavip.config import TestingConfig
+from vavip.extensions import db
+from vavip.models import Category, Product
+from vavip.services.product_service import CategoryService, ProductService
+from vavip.utils import circuit_breaker, query_stats, rate_limit_storage, request_body, slow_query_log
+from vavip.utils.circuit_breaker import CircuitBreaker, CircuitOpenError, GuardedRedis
+from vavip.utils.errors import ValidationError
+from vavip.utils.rate_limit_storage import HybridRedisStorage
+
+
+def test_get_json_body(app, monkeypatch):
+    """Test the request body is decoded once per request, with errors and non-JSON bodies handled."""
+    # APIError logs `message` in `extra`, which LogRecord rejects; keep the error log quiet here
+    monkeypatch.setattr(logging.getLogger('vavip.utils.errors'), 'disabled', True)
+    
+    with app.test_request_context(method='POST', data='{"name": "Pump", "qty": 2}', content_type='application/json'):
+        assert request_body.get_json_body() == {'name': 'Pump', 'qty': 2}
+        assert request_body.get_json_field('qty') == 2
+        assert request_body.get_json_field('missing', 'x') == 'x'
+        # Served from g afterwards: the raw body is not decoded again
+        calls = []
+        original = request_body._loads
+        monkeypatch.setattr(request_body, '_loads', lambda raw: calls.append(raw) or original(raw))
+        assert request_body.get_json_body()['name'] == 'Pump'
+        assert calls == []
+    
+    # A new request sharing the same app context (and so the same g) is decoded afresh
+    with app.test_request_context(method='POST', data='{"name": ', content_type='application/json'):
+        with pytest.raises(ValidationError) as error:
+            request_body.get_json_body()
+        assert error.value.status_code == 400
+        assert request_body.get_json_body(silent=True) is None
+        assert request_body.get_json_field('name', 'default') == 'default'
+    
+    with app.test_request_context(method='POST', data='{"name": "Pump"}', content_type='text/plain'):
+        assert request_body.get_json_body() is None
+        assert request_body.get_json_field('name') is None
+    
+    with app.test_request_context(method='POST', data='', content_type='application/json'):
+        assert request_body.get_json_body() is None
+    
+    with app.test_request_context(method='POST', data='[1, 2]', content_type='application/json'):
+        assert request_body.get_json_body() == [1, 2]
+        assert request_body.get_json_field('name', 'default') == 'default'
+
+
+class _CountingRedis:
+    """Redis stand-in for the hybrid rate limit storage (INCRBY / TTL / EXPIRE)."""
+    
+    def __init__(self, storage):
+        self.storage = storage
+        self.down = False
+        self.values = {}
+        self.ttls = {}
+        self.syncs = []
+    
+    def pipeline(self):
+        fake = self
+        
+        class Pipe:
+            def __init__(self):
+                self.ops = []
+            
+            def incrby(self, key, amount):
+                self.ops.append(('incrby', key, amount))
+            
+            def ttl(self, key):
+                self.ops.append(('ttl', key))
+            
+            def execute(self):
+                # The storage lock must not be held during the round-trip
+                assert not fake.storage._lock.locked()
+                if fake.down:
+                    raise redis.ConnectionError('down')
+                results = []
+                for op in self.ops:
+                    if op[0] == 'incrby':
+                        fake.values[op[1]] = fake.values.get(op[1], 0) + op[2]
+                        fake.syncs.append(op[2])
+                        results.append(fake.values[op[1]])
+                    else:
+                        results.append(fake.ttls.get(op[1], -1))
+                return results
+        
+        return Pipe()
+    
+    def expire(self, key, seconds):
+        self.ttls[key] = seconds
+
+
+def test_hybrid_rate_limit_storage(monkeypatch):
+    """Test batched syncs, window expiry and local counting while Redis is down."""
+    clock = [1000.0]
+    monkeypatch.setattr(rate_limit_storage.time, 'time', lambda: clock[0])
+    monkeypatch.setattr(rate_limit_storage.time, 'monotonic', lambda: clock[0])
+    storage = HybridRedisStorage('hybrid+redis://localhost:6379/0', sync_interval=60, sync_batch=3,
+                                 breaker_threshold=2, breaker_reset_timeout=30)
+    fake = storage._redis = _CountingRedis(storage)
+    
+    # Batching: the first hit syncs (never synced), then every third hit
+    assert [storage.incr('login', 60) for _ in range(4)] == [1, 2, 3, 4]
+    assert fake.syncs == [1, 3]
+    assert fake.ttls['LIMITS:login'] == 60
+    
+    # Other workers' hits show up after the next sync
+    fake.values['LIMITS:login'] += 10
+    assert [storage.incr('login', 60) for _ in range(3)] == [5, 6, 17]
+    assert storage.get('login') == 17
+    
+    # Expiry: the window ends locally and in Redis, the next hit starts a new one
+    clock[0] += 61
+    del fake.values['LIMITS:login'], fake.ttls['LIMITS:login']
+    assert storage.get('login') == 0
+    assert storage.incr('login', 60) == 1
+    assert storage.get_expiry('login') == clock[0] + 60
+    
+    # Redis down: hits keep counting locally and the delta is retried later
+    fake.down = True
+    storage.incr('search', 60)
+    for _ in range(5):
+        storage.incr('search', 60)
+    assert storage.get('search') == 6
+    assert storage.breaker.is_open
+    fake.down = False
+    clock[0] += 30
+    assert storage.incr('search', 60) == 7
+    assert fake.values['LIMITS:search'] == 7
+
+
+def test_circuit_breaker_transitions(monkeypatch, redis_server):
+    """Test closed -> open -> half-open -> closed, with a pre-check not using up the trial call."""
+    clock = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', lambda: clock[0])
+    
+    redis_server.data['k'] = b'1'
+    breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=30)
+    client = GuardedRedis(redis_server.client, breaker)
+    assert breaker.state == CircuitBreaker.CLOSED and not breaker.is_open
+    
+    redis_server.down = True
+    for _ in range(2):
+        with pytest.raises(redis.ConnectionError):
+            client.get('k')
+    assert breaker.state == CircuitBreaker.OPEN and breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        client.get('k')
+    assert redis_server.connects == 2  # Failing fast, Redis not called
+    
+    # Half-open: the trial fails and re-opens the breaker
+    clock[0] += 30
+    assert breaker.state == CircuitBreaker.HALF_OPEN and not breaker.is_open
+    with pytest.raises(redis.ConnectionError):
+        client.get('k')
+    assert breaker.is_open
+    
+    # Redis is back: checking is_open first (as services do) leaves the trial to the real call
+    redis_server.down = False
+    clock[0] += 30
+    assert not breaker.is_open and not breaker.is_open
+    assert client.get('k') == b'1'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_guarded_redis_pipeline(redis_server):
+    """Test pipeline execute() counts towards the breaker and fails fast while open."""
+    breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=30)
+    client = GuardedRedis(redis_server.client, breaker)
+    
+    pipe = client.pipeline(transaction=False)
+    assert pipe.incr('a').incr('b') is pipe  # Chained commands stay guarded
+    assert pipe.execute() == [1, 1]
+    
+    redis_server.down = True
+    with pytest.raises(redis.ConnectionError):
+        client.pipeline().incr('a').execute()
+    assert breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        client.pipeline().incr('a').execute()
+    assert redis_server.connects == 2
+
+
+def test_guarded_pipeline_loads_scripts(monkeypatch, redis_server):
+    """Test Lua scripts queued on get_redis().pipeline() are loaded before their EVALSHA runs."""
+    monkeypatch.setattr(vavip.extensions, 'redis_client', GuardedRedis(redis_server.client, CircuitBreaker('test')))
+    client = vavip.extensions.get_redis()
+    script = client.register_script('return 1')
+    
+    pipe = client.pipeline(transaction=False)
+    script(keys=['k'], args=[1], client=pipe)
+    assert pipe.incr('n').execute() == [1, 1]
+    assert script.sha in redis_server.scripts
+    
+    # After SCRIPT FLUSH (or a restart) the next pipeline loads it again; so do direct calls
+    redis_server.scripts.clear()
+    assert script(keys=['k'], args=[1], client=client.pipeline(transaction=False)).execute() == [1]
+    redis_server.scripts.clear()
+    assert script(keys=['k'], args=[1]) == 1
+    assert script.sha in redis_server.scripts
+
+
+def test_get_redis_recovers_after_outage(monkeypatch, redis_server):
+    """Test services get the client back once the breaker's reset timeout has passed."""
+    clock = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', lambda: clock[0])
+    redis_server.data['k'] = b'1'
+    client = GuardedRedis(redis_server.client, CircuitBreaker('test', failure_threshold=1, reset_timeout=30))
+    monkeypatch.setattr(vavip.extensions, 'redis_client', client)
+    
+    redis_server.down = True
+    with pytest.raises(redis.ConnectionError):
+        vavip.extensions.get_redis().get('k')
+    assert vavip.extensions.get_redis() is None
+    
+    redis_server.down = False
+    clock[0] += 30
+    assert vavip.extensions.get_redis().get('k') == b'1'
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_replica_routing_reads_and_writes():
+    """Test replica_read sends catalog reads to the replica bind."""
+    class ReplicaConfig(TestingConfig):
+        SQLALCHEMY_REPLICA_URIS = ['sqlite:///:memory:']
+    
+    replica_app = create_app(ReplicaConfig)
+    
+    with replica_app.app_context():
+        db.create_all()
+        db.metadata.create_all(bind=replica_app.extensions['vavip_replicas'].engines[0])
+        db.session.add(Category(name='Primary Only', slug='primary-only', is_active=True))
+        db.session.commit()
+    
+    with replica_app.app_context():
+        # Replica has not seen the row yet
+        assert CategoryService.get_category_by_slug('primary-only') is None
+        assert Category.query.filter_by(slug='primary-only').first() is not None
+        
+        # After a write in the same request, reads stay on the primary
+        db.session.add(Category(name='Other', slug='other-replica', is_active=True))
+        db.session.commit()
+        assert CategoryService.get_category_by_slug('primary-only') is not None
+    
+    with replica_app.app_context():
+        # Core DML never flushes, but still pins later reads to the primary
+        assert CategoryService.get_category_by_slug('primary-only') is None
+        db.session.execute(update(Category).where(Category.slug == 'primary-only').values(name='Renamed'))
+        assert CategoryService.get_category_by_slug('primary-only').name == 'Renamed'
+        db.session.rollback()
+
+
+def test_slow_query_log(app, monkeypatch):
+    """Test slow statements are logged normalized, with parameter shapes, call site and request."""
+    assert slow_query_log.normalize_sql(
+        "SELECT * FROM products WHERE id IN (?, ?, ?) AND name = 'it''s'\n  LIMIT 10"
+    ) == 'SELECT * FROM products WHERE id IN (...) AND name = ? LIMIT ?'
+    assert slow_query_log.normalize_sql('INSERT INTO t (a) VALUES (?), (?), (?)') == 'INSERT INTO t (a) VALUES (?), ...'
+    assert slow_query_log.parameter_shape({'id_1': 5, 'name': 'x'}) == {'id_1': 'int', 'name': 'str'}
+    assert slow_query_log.parameter_shape([(1, 'a'), (2, 'b')], executemany=True) == \
+        {'rows': 2, 'shape': ['int', 'str']}
+    
+    records = []
+    
+    class Capture(logging.Handler):
+        def emit(self, record):
+            records.append(json.loads(record.getMessage()))
+    
+    with app.app_context():
+        CategoryService.create_category({'name': 'Slow', 'slug': 'slow-log'})
+    
+    # TestingConfig leaves the log disabled: capture entries in memory instead of logs/
+    slow_query_log._install_listeners()
+    handler = Capture()
+    slow_query_log.slow_query_logger.addHandler(handler)
+    monkeypatch.setitem(slow_query_log._settings, 'threshold', 0)
+    try:
+        with app.test_request_context('/api/products/?category=slow-log'):
+            ProductService.get_products(category_slug='slow-log')
+    finally:
+        slow_query_log.slow_query_logger.removeHandler(handler)
+    
+    entry = next(r for r in records if 'FROM products' in r['statement'])
+    assert entry['call_site'].startswith('vavip.services.product_service:ProductService.get_products:')
+    assert entry['request'] == {'method': 'GET', 'path': '/api/products/', 'endpoint': 'products.get_products'}
+    assert entry['fingerprint'] == slow_query_log.fingerprint(entry['statement'])
+    assert "'" not in entry['statement'] and 'plan' not in entry
+    
+    # Only compiled SELECTs may be explained: the bulk update is WITH ... UPDATE
+    contexts = []
+    capture = lambda conn, cursor, statement, params, context, *args: contexts.append((statement, context))
+    monkeypatch.setattr(query_stats, '_callbacks', [capture])
+    with app.app_context():
+        db.session.add(Product(name='Slow bulk', slug='slow-bulk', sku='SLOW-BULK', price=10))
+        db.session.commit()
+        ProductService.bulk_update_prices_stock([{'sku': 'SLOW-BULK', 'price': 12}])
+        Product.query.filter_by(slug='slow-bulk').first()
+    bulk_update = next(c for s, c in contexts if s.lstrip().startswith('WITH') and 'UPDATE products' in s)
+    assert not slow_query_log._is_read_only(bulk_update)
+    assert any(slow_query_log._is_read_only(c) for s, c in contexts if s.lstrip().startswith('SELECT'))
+    assert not any(slow_query_log._is_read_only(c) for s, c in contexts if s.lstrip().startswith('INSERT'))
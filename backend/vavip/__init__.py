@@ -24,6 +24,12 @@ def create_app(config_class=None):
     # Initialize extensions
     # SQLAlchemy will use SQLALCHEMY_ENGINE_OPTIONS from config automatically
     db.init_app(app)
+    from .utils.db_routing import init_replicas
+    init_replicas(app)
+    from .utils.query_stats import init_query_stats
+    init_query_stats(app)
+    from .utils.slow_query_log import init_slow_query_log
+    init_slow_query_log(app)
     
     migrate.init_app(app, db)
     jwt.init_app(app)
@@ -40,7 +46,20 @@ def create_app(config_class=None):
     
     # Initialize rate limiter
     if app.config.get('RATELIMIT_ENABLED', True):
-        limiter.storage_uri = app.config.get('RATELIMIT_STORAGE_URL', app.config.get('REDIS_URL'))
+        storage_uri = app.config.get('RATELIMIT_STORAGE_URL', app.config.get('REDIS_URL'))
+        if app.config.get('RATELIMIT_HYBRID') and storage_uri.startswith('redis'):
+            storage_uri = f'hybrid+{storage_uri}'
+            app.config.setdefault('RATELIMIT_STORAGE_OPTIONS', {
+                'sync_interval': app.config.get('RATELIMIT_SYNC_INTERVAL', 1.0),
+                'sync_batch': app.config.get('RATELIMIT_SYNC_BATCH', 10),
+                'max_connections': app.config.get('REDIS_MAX_CONNECTIONS', 50),
+                'socket_timeout': app.config.get('REDIS_SOCKET_TIMEOUT', 0.5),
+                'socket_connect_timeout': app.config.get('REDIS_CONNECT_TIMEOUT', 0.5),
+                'health_check_interval': app.config.get('REDIS_HEALTH_CHECK_INTERVAL', 30),
+                'breaker_threshold': app.config.get('REDIS_BREAKER_THRESHOLD', 5),
+                'breaker_reset_timeout': app.config.get('REDIS_BREAKER_RESET_TIMEOUT', 30),
+            })
+        app.config.setdefault('RATELIMIT_STORAGE_URI', storage_uri)
         limiter.init_app(app)
 
     # Register blueprints
@@ -59,6 +78,10 @@ def create_app(config_class=None):
     # Register error handlers
     from .utils.errors import register_error_handlers
     register_error_handlers(app)
+
+    # Register CLI commands
+    from .cli import register_commands
+    register_commands(app)
     
     # Setup logging
     from .utils.logger import setup_logging, log_request
@@ -143,6 +166,26 @@ def create_app(config_class=None):
     return app
 
 
+def start_background_tasks(app):
+    """
+    Start the periodic jobs of a serving process.
+    
+    Called by the server entry point (run.py), never by create_app, so
+    Flask CLI commands such as `flask db upgrade` do not run them.
+    """
+    # Scheduled refresh of analytics materialized views
+    from .services.analytics_view_service import init_analytics_views
+    init_analytics_views(app)
+    
+    # Periodic flush of buffered product views
+    from .services.view_tracking_service import init_view_tracking
+    init_view_tracking(app)
+    
+    # Periodic recompute of catalog ranking scores
+    from .services.product_ranking_service import init_product_rankings
+    init_product_rankings(app)
+
+
 
 
 
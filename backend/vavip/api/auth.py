@@ -1,10 +1,13 @@
 """
 Authentication API
 """
+import logging
 import uuid
 import random
 from datetime import datetime, timedelta
-from flask import Blueprint, request
+from flask import Blueprint
+import redis
+from flask_limiter.util import get_remote_address
 from flask_jwt_extended import (
     create_access_token, create_refresh_token, 
     jwt_required, get_jwt_identity, get_jwt
@@ -15,6 +18,7 @@ from ..utils.validators import normalize_phone, validate_phone, validate_email,
 from ..utils.errors import ValidationError, NotFoundError, UnauthorizedError, ConflictError, RateLimitError
 from ..utils.response_utils import success_response, error_response
 from ..utils.schema_validator import validate_request
+from ..utils.request_body import get_json_body, get_json_field
 from ..schemas.auth_schemas import (
     RegisterSchema, LoginSchema, OTPSendSchema, OTPVerifySchema,
     UpdateProfileSchema, ChangePasswordSchema
@@ -22,13 +26,20 @@ from ..schemas.auth_schemas import (
 from ..services.auth_service import AuthService
 
 bp = Blueprint('auth', __name__)
+logger = logging.getLogger(__name__)
+
+
+def _otp_phone_key():
+    """Rate-limit OTP requests per phone number (falls back to client IP)."""
+    phone = get_json_field('phone')
+    return normalize_phone(phone) if phone else get_remote_address()
 
 
 @bp.route('/register', methods=['POST'])
 @limiter.limit("3 per hour")
 def register():
     """Register a new user."""
-    data = request.get_json() or {}
+    data = get_json_body() or {}
     
     # Validate with schema
     validated_data = validate_request(RegisterSchema, data)
@@ -69,7 +80,7 @@ def register():
 @limiter.limit("5 per minute")
 def login():
     """Login user and return JWT tokens."""
-    data = request.get_json() or {}
+    data = get_json_body() or {}
     
     # Validate with schema
     validated_data = validate_request(LoginSchema, data)
@@ -102,13 +113,13 @@ def login():
 
 
 @bp.route('/otp/send', methods=['POST'])
-@limiter.limit("3 per 10 minutes", key_func=lambda: request.get_json().get('phone') if request.get_json() else None)
+@limiter.limit("3 per 10 minutes", key_func=_otp_phone_key)
 def otp_send():
     """
     Generate OTP code for phone auth.
     Dev-mode: returns the code in response for testing (no SMS sending).
     """
-    data = request.get_json() or {}
+    data = get_json_body() or {}
     
     # Validate with schema
     validated_data = validate_request(OTPSendSchema, data)
@@ -148,7 +159,7 @@ def otp_verify():
     Verify OTP code and return JWT tokens.
     If user doesn't exist, auto-create by phone (email is generated).
     """
-    data = request.get_json() or {}
+    data = get_json_body() or {}
     
     # Validate with schema
     validated_data = validate_request(OTPVerifySchema, data)
@@ -216,13 +227,16 @@ def refresh():
     exp = get_jwt().get('exp')
     
     if jti and redis_client:
-        if exp:
-            ttl = exp - int(datetime.utcnow().timestamp())
-            if ttl > 0:
-                redis_client.setex(f'blacklist:{jti}', ttl, 'true')
-        else:
-            # Default TTL for refresh token (30 days)
-            redis_client.setex(f'blacklist:{jti}', 2592000, 'true')
+        try:
+            if exp:
+                ttl = exp - int(datetime.utcnow().timestamp())
+                if ttl > 0:
+                    redis_client.setex(f'blacklist:{jti}', ttl, 'true')
+            else:
+                # Default TTL for refresh token (30 days)
+                redis_client.setex(f'blacklist:{jti}', 2592000, 'true')
+        except redis.RedisError as e:
+            logger.warning(f'Failed to blacklist refresh token {jti}: {e}')
     
     identity = get_jwt_identity()
     access_token = create_access_token(identity=identity)
@@ -249,7 +263,7 @@ def update_current_user():
     if not user:
         raise NotFoundError('User not found', 'USER_NOT_FOUND')
     
-    data = request.get_json() or {}
+    data = get_json_body() or {}
     
     # Validate with schema
     validated_data = validate_request(UpdateProfileSchema, data)
@@ -277,7 +291,7 @@ def update_current_user():
 def change_password():
     """Change user password."""
     user_id = get_jwt_identity()
-    data = request.get_json() or {}
+    data = get_json_body() or {}
     
     # Validate with schema
     validated_data = validate_request(ChangePasswordSchema, data)
@@ -307,14 +321,17 @@ def logout():
     exp = get_jwt().get('exp')
     
     if jti and redis_client:
-        # Calculate TTL (time until token expires)
-        if exp:
-            ttl = exp - int(datetime.utcnow().timestamp())
-            if ttl > 0:
-                redis_client.setex(f'blacklist:{jti}', ttl, 'true')
-        else:
-            # Default TTL of 1 hour if exp is not available
-            redis_client.setex(f'blacklist:{jti}', 3600, 'true')
+        try:
+            # Calculate TTL (time until token expires)
+            if exp:
+                ttl = exp - int(datetime.utcnow().timestamp())
+                if ttl > 0:
+                    redis_client.setex(f'blacklist:{jti}', ttl, 'true')
+            else:
+                # Default TTL of 1 hour if exp is not available
+                redis_client.setex(f'blacklist:{jti}', 3600, 'true')
+        except redis.RedisError as e:
+            logger.warning(f'Failed to blacklist access token {jti}: {e}')
     
     return success_response(message='Logged out successfully')
 
@@ -1,18 +1,21 @@
 """
 Contacts API
 """
-from flask import Blueprint, request
+from flask import Blueprint
 from ..extensions import db
 from ..models import Contact
 from ..utils.errors import NotFoundError, ForbiddenError
 from ..utils.response_utils import success_response
 from ..utils.decorators import manager_required
 from ..utils.cache import cache_result
+from ..utils.db_routing import replica_read
+from ..utils.request_body import get_json_body
 
 bp = Blueprint('contacts', __name__)
 
 
 @bp.route('/', methods=['GET'])
+@replica_read()
 def get_contacts():
     """Get all active contacts grouped by country."""
     from ..utils.cache import cache_result
@@ -41,6 +44,7 @@ def get_contacts():
 
 
 @bp.route('/countries', methods=['GET'])
+@replica_read()
 def get_countries():
     """Get list of countries with offices."""
     from ..utils.cache import cache_result
@@ -62,6 +66,7 @@ def get_countries():
 
 
 @bp.route('/country/<country_code>', methods=['GET'])
+@replica_read()
 def get_contacts_by_country(country_code):
     """Get contacts for a specific country."""
     contacts = Contact.query.filter_by(
@@ -73,6 +78,7 @@ def get_contacts_by_country(country_code):
 
 
 @bp.route('/city/<city>', methods=['GET'])
+@replica_read()
 def get_contact_by_city(city):
     """Get contact for a specific city."""
     contact = Contact.query.filter_by(city=city, is_active=True).first()
@@ -88,7 +94,7 @@ def create_contact():
     """Create a new contact (admin/manager only)."""
     from ..utils.errors import ValidationError
     
-    data = request.get_json() or {}
+    data = get_json_body() or {}
     
     required = ['country', 'city', 'address']
     for field in required:
@@ -131,7 +137,7 @@ def update_contact(contact_id):
     if not contact:
         raise NotFoundError('Contact not found', 'CONTACT_NOT_FOUND')
     
-    data = request.get_json() or {}
+    data = get_json_body() or {}
     
     for field in ['country', 'country_code', 'city', 'address', 'phone', 'email',
                   'working_hours', 'map_lat', 'map_lng', 'photo_url', 'map_image_url',
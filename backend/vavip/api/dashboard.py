@@ -8,10 +8,44 @@ from ..extensions import db
 from ..models import User, Product, Order, OrderItem, Feedback
 from ..utils.decorators import manager_required, validate_pagination
 from ..utils.response_utils import success_response, paginated_response
+from ..utils.request_body import get_json_body
+from ..utils.helpers import parse_bool
+from ..utils.errors import ValidationError, ErrorCodes
 from ..services.analytics_service import AnalyticsService
+from ..services.live_counters_service import LiveCountersService
+from ..services.customer_analytics_service import CustomerAnalyticsService
 
 bp = Blueprint('dashboard', __name__)
 
+# Longest report period accepted through ?days=
+MAX_DAYS = 730
+
+
+def _days_arg(default):
+    """The ?days= period, validated to 1..MAX_DAYS."""
+    days = request.args.get('days', default, type=int)
+    if not 1 <= days <= MAX_DAYS:
+        raise ValidationError(f'days must be between 1 and {MAX_DAYS}', ErrorCodes.INVALID_FORMAT)
+    return days
+
+
+def _approximate(data):
+    """Wrap a sketch-based result; available is False when Redis is down."""
+    return {
+        'data': data,
+        'approximate': True,
+        'available': data is not None
+    }
+
+
+def _with_freshness(data, refreshed_at=None):
+    """Wrap report rows with the time the underlying data was refreshed."""
+    refreshed_at = refreshed_at or AnalyticsService.get_refreshed_at()
+    return {
+        'data': data,
+        'refreshed_at': refreshed_at.isoformat() if refreshed_at else None
+    }
+
 
 @bp.route('/stats', methods=['GET'])
 @manager_required
@@ -19,7 +53,7 @@ def get_stats():
     """Get dashboard statistics."""
     from ..utils.cache import cache_result
     
-    days = request.args.get('days', 30, type=int)
+    days = _days_arg(30)
     
     @cache_result(ttl=300, prefix=f'dashboard_stats_{days}')
     def _get_stats():
@@ -29,13 +63,28 @@ def get_stats():
     return success_response(stats)
 
 
+@bp.route('/live', methods=['GET'])
+@manager_required
+def get_live_counters():
+    """Get live counters (initial state; updates arrive over WebSocket)."""
+    return success_response(LiveCountersService.get_counters())
+
+
 @bp.route('/sales-chart', methods=['GET'])
 @manager_required
 def get_sales_chart():
     """Get sales data for chart."""
-    days = request.args.get('days', 30, type=int)
-    sales_data = AnalyticsService.get_sales_by_day(days)
-    return success_response(sales_data)
+    days = _days_arg(30)
+    granularity = request.args.get('granularity', 'day')
+    tz = request.args.get('tz')
+    
+    try:
+        sales_data = AnalyticsService.get_sales_by_day(days, granularity, tz)
+    except ValueError as e:
+        raise ValidationError(str(e), ErrorCodes.INVALID_FORMAT)
+    
+    # Computed from live orders
+    return success_response(_with_freshness(sales_data, datetime.utcnow()))
 
 
 @bp.route('/top-products', methods=['GET'])
@@ -43,9 +92,77 @@ def get_sales_chart():
 def get_top_products():
     """Get top selling products."""
     limit = request.args.get('limit', 10, type=int)
-    days = request.args.get('days', 30, type=int)
+    days = _days_arg(30)
+    
+    if parse_bool(request.args.get('approx')):
+        try:
+            top_products = AnalyticsService.get_top_products_approx(
+                request.args.get('metric', 'sales'), limit, days
+            )
+        except ValueError as e:
+            raise ValidationError(str(e), ErrorCodes.INVALID_FORMAT)
+        return success_response(_approximate(top_products))
+    
     top_products = AnalyticsService.get_top_products(limit, days)
-    return success_response(top_products)
+    return success_response(_with_freshness(top_products))
+
+
+@bp.route('/popular-products', methods=['GET'])
+@manager_required
+def get_popular_products():
+    """Get most viewed products."""
+    limit = request.args.get('limit', 10, type=int)
+    days = _days_arg(7)
+    return success_response(AnalyticsService.get_popular_products(limit, days))
+
+
+@bp.route('/conversion', methods=['GET'])
+@manager_required
+def get_product_conversion():
+    """Get views-to-orders conversion per product."""
+    limit = request.args.get('limit', 20, type=int)
+    days = _days_arg(30)
+    return success_response(AnalyticsService.get_product_conversion(limit, days))
+
+
+@bp.route('/products/<int:product_id>/buyers', methods=['GET'])
+@manager_required
+def get_product_buyers(product_id):
+    """Get distinct buyers of a product (exact, or approximate with ?approx=1)."""
+    days = _days_arg(30)
+    
+    if parse_bool(request.args.get('approx')):
+        return success_response(_approximate(AnalyticsService.get_unique_buyers_approx(product_id, days)))
+    
+    return success_response({
+        'data': AnalyticsService.get_unique_buyers(product_id, days),
+        'approximate': False
+    })
+
+
+@bp.route('/products/<int:product_id>/views', methods=['GET'])
+@manager_required
+def get_product_views(product_id):
+    """Get approximate page views of a product."""
+    days = _days_arg(30)
+    return success_response(_approximate(AnalyticsService.get_product_views_approx(product_id, days)))
+
+
+@bp.route('/visitors', methods=['GET'])
+@manager_required
+def get_unique_visitors():
+    """Get approximate unique visitors per day."""
+    days = _days_arg(7)
+    return success_response(_approximate(AnalyticsService.get_unique_visitors_approx(days)))
+
+
+@bp.route('/revenue-by-category', methods=['GET'])
+@manager_required
+def get_revenue_by_category():
+    """Get paid revenue by category."""
+    days = _days_arg(30)
+    revenue = AnalyticsService.get_revenue_by_category(days)
+    return success_response(_with_freshness(revenue))
 
 
 @bp.route('/recent-orders', methods=['GET'])
@@ -69,6 +186,31 @@ def get_order_status_breakdown():
     return success_response(breakdown)
 
 
+@bp.route('/customers', methods=['GET'])
+@manager_required
+@validate_pagination(max_per_page=100)
+def get_customers(page, per_page):
+    """Get customer lifetime value summaries (batch-computed)."""
+    sort = request.args.get('sort', 'total_spent')
+    cohort_month = request.args.get('cohort')
+    
+    try:
+        if cohort_month:
+            cohort_month = datetime.strptime(cohort_month, '%Y-%m-%d').date()
+        pagination = CustomerAnalyticsService.get_customers(page, per_page, sort, cohort_month)
+    except ValueError as e:
+        raise ValidationError(str(e), ErrorCodes.INVALID_FORMAT)
+    
+    return paginated_response([c.to_dict() for c in pagination.items], pagination, data_key='customers')
+
+
+@bp.route('/cohorts', methods=['GET'])
+@manager_required
+def get_cohorts():
+    """Get the monthly customer cohort matrix."""
+    return success_response(CustomerAnalyticsService.get_cohorts())
+
+
 @bp.route('/users', methods=['GET'])
 @manager_required
 @validate_pagination(max_per_page=100)
@@ -105,7 +247,7 @@ def update_user(user_id):
     if not user:
         raise NotFoundError('User not found', 'USER_NOT_FOUND')
     
-    data = request.get_json() or {}
+    data = get_json_body() or {}
     
     if 'role' in data:
         user.role = data['role']
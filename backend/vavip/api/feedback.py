@@ -8,7 +8,9 @@ from ..utils.errors import NotFoundError, ForbiddenError
 from ..utils.response_utils import success_response, paginated_response
 from ..utils.decorators import manager_required, validate_pagination
 from ..utils.schema_validator import validate_request
+from ..utils.request_body import get_json_body
 from ..schemas.feedback_schemas import CreateFeedbackSchema
+from ..services.live_counters_service import LiveCountersService
 
 bp = Blueprint('feedback', __name__)
 
@@ -16,7 +18,7 @@ bp = Blueprint('feedback', __name__)
 @bp.route('/', methods=['POST'])
 def create_feedback():
     """Submit feedback form (public endpoint)."""
-    data = request.get_json() or {}
+    data = get_json_body() or {}
     
     # Validate with schema
     validated_data = validate_request(CreateFeedbackSchema, data)
@@ -25,6 +27,7 @@ def create_feedback():
     
     db.session.add(feedback)
     db.session.commit()
+    LiveCountersService.unread_feedback_changed(0 if feedback.is_read else 1)
     
     # Notify admins via WebSocket
     socketio.emit('new_feedback', {
@@ -89,6 +92,7 @@ def get_feedback(feedback_id):
     if not feedback.is_read:
         feedback.is_read = True
         db.session.commit()
+        LiveCountersService.unread_feedback_changed(-1)
     
     return success_response(feedback.to_dict())
 
@@ -101,7 +105,8 @@ def update_feedback(feedback_id):
     if not feedback:
         raise NotFoundError('Feedback not found', 'FEEDBACK_NOT_FOUND')
     
-    data = request.get_json() or {}
+    data = get_json_body() or {}
+    was_read = bool(feedback.is_read)
     
     if 'status' in data:
         feedback.status = data['status']
@@ -113,6 +118,7 @@ def update_feedback(feedback_id):
         feedback.is_read = data['is_read']
     
     db.session.commit()
+    LiveCountersService.unread_feedback_changed(int(was_read) - int(bool(feedback.is_read)))
     
     return success_response(feedback.to_dict())
 
@@ -125,8 +131,10 @@ def delete_feedback(feedback_id):
     if not feedback:
         raise NotFoundError('Feedback not found', 'FEEDBACK_NOT_FOUND')
     
+    was_unread = not feedback.is_read
     db.session.delete(feedback)
     db.session.commit()
+    LiveCountersService.unread_feedback_changed(-1 if was_unread else 0)
     
     return success_response(message='Feedback deleted successfully')
 
@@ -11,12 +11,14 @@ from flask_jwt_extended import (
     create_access_token,
     create_refresh_token,
 )
+from sqlalchemy.orm import selectinload
 from ..extensions import db, socketio
 from ..models import Order, OrderItem, Product, User
 from ..utils.validators import normalize_phone
 from ..utils.errors import ValidationError, NotFoundError, ForbiddenError, ConflictError
 from ..utils.response_utils import success_response
 from ..utils.schema_validator import validate_request
+from ..utils.request_body import get_json_body
 from ..utils.decorators import manager_required
 from ..schemas.order_schemas import CreateOrderSchema, UpdateOrderStatusSchema
 from ..services.order_service import OrderService
@@ -34,7 +36,7 @@ def get_orders():
     # Admin can see all orders
     if user and user.role in ['admin', 'manager']:
         if request.args.get('all') == 'true':
-            orders = Order.query.order_by(Order.created_at.desc()).all()
+            orders = Order.query.options(selectinload(Order.items)).order_by(Order.created_at.desc()).all()
             return success_response([o.to_dict() for o in orders])
     
     # Regular users see only their orders
@@ -67,7 +69,7 @@ def create_order():
     # If not authenticated, we auto-create an account by phone (as requested by frontend UX).
     verify_jwt_in_request(optional=True)
     user_id = get_jwt_identity()
-    data = request.get_json()
+    data = get_json_body()
 
     auth_payload = None
     auto_account_created = False
@@ -152,7 +154,7 @@ def create_order():
 @manager_required
 def update_order_status(order_id):
     """Update order status (admin/manager only)."""
-    data = request.get_json() or {}
+    data = get_json_body() or {}
     
     # Validate with schema
     validated_data = validate_request(UpdateOrderStatusSchema, data)
@@ -239,7 +241,7 @@ def repeat_order(order_id):
     
     # Create items list from original order
     items = []
-    for item in original_order.items.all():
+    for item in original_order.items:
         items.append({
             'product_id': item.product_id,
             'quantity': item.quantity
@@ -2,61 +2,126 @@
 Products API
 Thin controller layer - delegates to ProductService for business logic
 """
-from flask import Blueprint, request
+import hashlib
+from flask import Blueprint, request, current_app
+from flask_limiter.util import get_remote_address
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from ..utils.errors import NotFoundError, ValidationError
+from ..extensions import limiter, socketio
+from ..utils.errors import NotFoundError, ValidationError, ErrorCodes
 from ..utils.response_utils import success_response, paginated_response
 from ..utils.decorators import manager_required, validate_pagination
 from ..utils.schema_validator import validate_request
-from ..schemas.product_schemas import CreateProductSchema, UpdateProductSchema
+from ..utils.request_body import get_json_body
+from ..utils.helpers import parse_bool
+from ..schemas.product_schemas import (
+    CreateProductSchema, UpdateProductSchema, CreateAttributeDefinitionSchema, BulkPriceStockSchema
+)
 from ..services.product_service import ProductService, CategoryService, FavoriteService
+from ..services.view_tracking_service import ViewTrackingService
+from ..services.attribute_service import AttributeService
+from ..services.product_import_service import ProductImportService
+from ..services.product_detail_service import ProductDetailService
 
 bp = Blueprint('products', __name__)
 
 
+def _catalog_limit():
+    """Per-route budget for public catalog reads."""
+    return current_app.config.get('RATELIMIT_CATALOG', '5000 per hour')
+
+
+def _visitor_id():
+    """Anonymous visitor key for view analytics (client-provided id, else IP + user agent)."""
+    visitor = request.headers.get('X-Visitor-Id')
+    if visitor:
+        return visitor[:64]
+    raw = f'{get_remote_address()}|{request.user_agent.string}'
+    return hashlib.blake2b(raw.encode(), digest_size=8).hexdigest()
+
+
+def _list_arg(name):
+    """Repeated or comma-separated query argument as a list."""
+    return [v.strip() for raw in request.args.getlist(name) for v in raw.split(',') if v.strip()]
+
+
+def _spec_filters():
+    """Typed attribute filters: spec.<code>=a,b (any of), spec.<code>.min / .max (numeric range)."""
+    specs = {}
+    for key in request.args:
+        if not key.startswith('spec.'):
+            continue
+        code, _, bound = key[len('spec.'):].rpartition('.')
+        if bound in ('min', 'max') and code:
+            specs.setdefault(code, {})[bound] = request.args.get(key)
+        else:
+            specs.setdefault(key[len('spec.'):], {})['eq'] = _list_arg(key)
+    return specs
+
+
 @bp.route('/', methods=['GET'])
+@limiter.limit(_catalog_limit)
 @validate_pagination(max_per_page=100)
 def get_products(page, per_page):
     """Get all products with filtering and pagination."""
     # Extract filters from request
-    products, pagination = ProductService.get_products(
-        page=page,
-        per_page=per_page,
-        category_slug=request.args.get('category'),
-        search=request.args.get('search'),
-        min_price=request.args.get('min_price', type=float),
-        max_price=request.args.get('max_price', type=float),
-        is_featured=request.args.get('featured', type=bool),
-        sort_by=request.args.get('sort', 'created_at'),
-        sort_order=request.args.get('order', 'desc'),
-    )
+    price_buckets = _list_arg('price_bucket')
+    attributes = {
+        key[len('attr.'):]: _list_arg(key)
+        for key in request.args if key.startswith('attr.')
+    }
+    try:
+        products, pagination = ProductService.get_products(
+            page=page,
+            per_page=per_page,
+            category_slug=request.args.get('category'),
+            search=request.args.get('search'),
+            min_price=request.args.get('min_price', type=float),
+            max_price=request.args.get('max_price', type=float),
+            is_featured=request.args.get('featured', type=bool),
+            sort_by=request.args.get('sort', 'created_at'),
+            sort_order=request.args.get('order', 'desc'),
+            price_buckets=price_buckets,
+            attributes=attributes,
+            specs=_spec_filters(),
+        )
+    except ValueError as e:
+        raise ValidationError(str(e), ErrorCodes.INVALID_FORMAT)
+    
+    extra = None
+    if parse_bool(request.args.get('facets')):
+        extra = {'facets': ProductService.get_facets(request.args.get('category'), price_buckets, attributes)}
     
-    return paginated_response([p.to_dict() for p in products], pagination, data_key='products')
+    return paginated_response([p.to_dict() for p in products], pagination, data_key='products', extra=extra)
 
 
 @bp.route('/<slug>', methods=['GET'])
+@limiter.limit(_catalog_limit)
 def get_product(slug):
     """Get product by slug."""
-    product = ProductService.get_product_by_slug(slug)
+    product = ProductDetailService.get_by_slug(slug)
     
-    if not product:
+    if not product or not product['is_active']:
         raise NotFoundError('Product not found', 'PRODUCT_NOT_FOUND')
     
-    return success_response(product.to_dict(include_details=True))
+    ViewTrackingService.record_view(product['id'], _visitor_id())
+    return success_response(product)
 
 
 @bp.route('/<int:product_id>', methods=['GET'])
+@limiter.limit(_catalog_limit)
 def get_product_by_id(product_id):
     """Get product by ID."""
-    product = ProductService.get_product_by_id(product_id)
+    product = ProductDetailService.get_by_id(product_id)
     
     if not product:
         raise NotFoundError('Product not found', 'PRODUCT_NOT_FOUND')
     
-    return success_response(product.to_dict(include_details=True))
+    ViewTrackingService.record_view(product['id'], _visitor_id())
+    return success_response(product)
 
 
 @bp.route('/featured', methods=['GET'])
+@limiter.limit(_catalog_limit)
 def get_featured_products():
     """Get featured products."""
     products = ProductService.get_featured_products(limit=10)
@@ -64,6 +129,7 @@ def get_featured_products():
 
 
 @bp.route('/categories', methods=['GET'])
+@limiter.limit(_catalog_limit)
 def get_categories():
     """Get all active categories."""
     categories = CategoryService.get_all_categories()
@@ -71,12 +137,20 @@ def get_categories():
 
 
 @bp.route('/categories/<slug>', methods=['GET'])
+@limiter.limit(_catalog_limit)
 def get_category(slug):
     """Get category by slug."""
-    category = CategoryService.get_category_by_slug(slug)
+    category = CategoryService.get_category(slug)
     if not category:
         raise NotFoundError('Category not found', 'CATEGORY_NOT_FOUND')
-    return success_response(category.to_dict(include_children=True))
+    return success_response(category)
+
+
+@bp.route('/attributes', methods=['GET'])
+@limiter.limit(_catalog_limit)
+def get_attribute_definitions():
+    """Get typed attribute definitions (for specification filters)."""
+    return success_response([d.to_dict() for d in AttributeService.get_definitions()])
 
 
 # Admin endpoints (protected)
@@ -84,7 +158,7 @@ def get_category(slug):
 @manager_required
 def create_product():
     """Create a new product (admin/manager only)."""
-    data = request.get_json() or {}
+    data = get_json_body() or {}
     
     # Validate with schema
     validated_data = validate_request(CreateProductSchema, data)
@@ -96,11 +170,46 @@ def create_product():
         raise ValidationError(str(e), 'SLUG_EXISTS')
 
 
+@bp.route('/import', methods=['POST'])
+@manager_required
+def import_products():
+    """
+    Bulk upsert products by SKU (admin/manager only).
+    
+    Body: CSV (text/csv) or NDJSON (application/x-ndjson), streamed in
+    chunks; ?format=csv|ndjson overrides the content type.
+    """
+    fmt = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'ndjson')
+    try:
+        report = ProductImportService.import_stream(request.stream, fmt)
+    except ValueError as e:
+        raise ValidationError(str(e), ErrorCodes.INVALID_FORMAT)
+    return success_response(report)
+
+
+@bp.route('/bulk', methods=['PATCH'])
+@manager_required
+def bulk_update_prices_stock():
+    """Apply a batch of price / stock changes by id or sku (admin/manager only)."""
+    validated_data = validate_request(BulkPriceStockSchema)
+    result = ProductService.bulk_update_prices_stock(validated_data['items'])
+    
+    if result['updated']:
+        # One event for the whole batch instead of one per product
+        socketio.emit('products_bulk_updated', {
+            'updated': result['updated'],
+            'price_changes': result['price_changes'],
+            'stock_changes': result['stock_changes'],
+            'product_ids': result['product_ids'],
+        }, room='admins')
+    return success_response(result)
+
+
 @bp.route('/<int:product_id>', methods=['PUT'])
 @manager_required
 def update_product(product_id):
     """Update a product (admin/manager only)."""
-    data = request.get_json() or {}
+    data = get_json_body() or {}
     
     # Validate with schema
     validated_data = validate_request(UpdateProductSchema, data)
@@ -160,10 +269,32 @@ def get_favorites():
     return success_response(products)
 
 
+@bp.route('/attributes', methods=['POST'])
+@manager_required
+def create_attribute_definition():
+    """Create a typed attribute definition (admin/manager only)."""
+    validated_data = validate_request(CreateAttributeDefinitionSchema, get_json_body() or {})
+    
+    try:
+        definition = AttributeService.create_definition(validated_data)
+        return success_response(definition.to_dict(), status_code=201)
+    except ValueError as e:
+        raise ValidationError(str(e), ErrorCodes.INVALID_FORMAT)
 
 
-
-
-
-
-
+@bp.route('/<int:product_id>/specs', methods=['PUT'])
+@manager_required
+def set_product_specs(product_id):
+    """Set typed attribute values of a product (admin/manager only)."""
+    data = get_json_body() or {}
+    if not isinstance(data, dict):
+        raise ValidationError('Expected an object of attribute code -> value', ErrorCodes.INVALID_FORMAT)
+    
+    try:
+        product = AttributeService.set_product_values(product_id, data)
+        return success_response(product.to_dict(include_details=True))
+    except ValueError as e:
+        error_msg = str(e)
+        if 'not found' in error_msg.lower():
+            raise NotFoundError(error_msg, 'PRODUCT_NOT_FOUND')
+        raise ValidationError(error_msg, ErrorCodes.INVALID_FORMAT)
@@ -53,6 +53,9 @@ def register_handlers(socketio):
             user = User.query.get(user_id)
             if user and user.role in ['admin', 'manager']:
                 join_room('admins')
+                # Initial live counters; later changes arrive as dashboard_counters_delta
+                from ..services.live_counters_service import LiveCountersService
+                emit('dashboard_counters', LiveCountersService.get_counters())
             
             logger.info(f'WebSocket authenticated for user {user_id}')
             emit('authenticated', {'user_id': user_id})
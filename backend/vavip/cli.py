@@ -0,0 +1,161 @@
+"""
+Flask CLI commands
+
+Usage:
+    flask maintenance purge-otps --batch-size 1000
+    flask maintenance table-sizes
+    flask analytics backfill-rollup --days 90
+    flask analytics check-rollup --days 7
+    flask analytics refresh-views
+    flask analytics rebuild-customers
+    flask analytics recompute-rankings
+    flask catalog import-products products.csv --errors errors.ndjson
+"""
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+maintenance_cli = AppGroup('maintenance', help='Database housekeeping commands.')
+analytics_cli = AppGroup('analytics', help='Analytics rollup commands.')
+catalog_cli = AppGroup('catalog', help='Catalog sync commands.')
+
+
+@maintenance_cli.command('purge-otps')
+@click.option('--batch-size', type=int, default=None, help='Rows deleted per transaction.')
+@click.option('--max-batches', type=int, default=None, help='Stop after N batches.')
+def purge_otps(batch_size, max_batches):
+    """Delete expired or used phone OTP codes."""
+    from .services.maintenance_service import MaintenanceService
+    
+    batch_size = batch_size or current_app.config.get('OTP_PURGE_BATCH_SIZE', 1000)
+    deleted = MaintenanceService.purge_otps(batch_size=batch_size, max_batches=max_batches)
+    click.echo(f'Deleted {deleted} OTP rows')
+    _echo_table_sizes(MaintenanceService.get_table_sizes())
+
+
+@maintenance_cli.command('table-sizes')
+@click.argument('tables', nargs=-1)
+def table_sizes(tables):
+    """Show row counts and sizes for auth tables."""
+    from .services.maintenance_service import MaintenanceService
+    
+    _echo_table_sizes(MaintenanceService.get_table_sizes(tables or ('phone_otps',)))
+
+
+def _echo_table_sizes(sizes):
+    for name, info in sizes.items():
+        line = f'{name}: {info["rows"]} rows'
+        if info['total_bytes'] is not None:
+            line += f', {info["total_bytes"] / 1024:.1f} KiB'
+        click.echo(line)
+
+
+def _start_day(days, since):
+    if since:
+        return since.date()
+    return (datetime.utcnow() - timedelta(days=days)).date()
+
+
+@analytics_cli.command('backfill-rollup')
+@click.option('--days', type=int, default=30, help='Rebuild the last N days.')
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Rebuild from this date (overrides --days).')
+def backfill_rollup(days, since):
+    """Rebuild the daily sales rollup from raw orders."""
+    from .services.sales_rollup_service import SalesRollupService
+    
+    start_day = _start_day(days, since)
+    written = SalesRollupService.backfill(start_day)
+    click.echo(f'Rebuilt daily sales rollup since {start_day}: {written} rows')
+
+
+@analytics_cli.command('check-rollup')
+@click.option('--days', type=int, default=7, help='Check the last N days.')
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Check from this date (overrides --days).')
+def check_rollup(days, since):
+    """Compare rollup day totals with raw orders; exits 1 on drift."""
+    from .services.sales_rollup_service import SalesRollupService
+    
+    mismatches = SalesRollupService.reconcile(_start_day(days, since))
+    for row in mismatches:
+        click.echo(
+            f'{row["day"]}: raw {row["raw_orders"]} orders / {row["raw_revenue"]:.2f}, '
+            f'rollup {row["rollup_orders"]} orders / {row["rollup_revenue"]:.2f}'
+        )
+    if mismatches:
+        raise SystemExit(1)
+    click.echo('Daily sales rollup is consistent')
+
+
+@analytics_cli.command('refresh-views')
+@click.option('--create', is_flag=True, help='Create missing views first.')
+@click.option('--blocking', is_flag=True, help='Refresh without CONCURRENTLY (locks readers).')
+def refresh_views(create, blocking):
+    """Refresh the analytics materialized views."""
+    from .services.analytics_view_service import AnalyticsViewService
+    
+    if create:
+        AnalyticsViewService.create_views()
+    durations = AnalyticsViewService.refresh(concurrently=not blocking)
+    if not durations:
+        click.echo('Nothing refreshed (not PostgreSQL, or another refresh is running)')
+    for name, ms in durations.items():
+        click.echo(f'{name}: {ms} ms')
+
+
+@analytics_cli.command('rebuild-customers')
+@click.option('--chunk-size', type=int, default=1000, help='Rows fetched and inserted per batch.')
+def rebuild_customers(chunk_size):
+    """Rebuild customer summaries and monthly cohorts."""
+    from .services.customer_analytics_service import CustomerAnalyticsService
+    
+    result = CustomerAnalyticsService.rebuild(chunk_size=chunk_size)
+    click.echo(f'Rebuilt {result["customers"]} customer summaries, {result["cohorts"]} cohort cells')
+
+
+@analytics_cli.command('recompute-rankings')
+def recompute_rankings():
+    """Recompute the popular / bestsellers catalog scores."""
+    from .services.product_ranking_service import ProductRankingService
+    
+    updated = ProductRankingService.recompute()
+    click.echo(f'Updated ranking scores of {updated} products')
+
+
+@catalog_cli.command('import-products')
+@click.argument('source', type=click.File('rb'))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default=None,
+              help='Input format (default: from the file extension).')
+@click.option('--chunk-size', type=int, default=None, help='Rows per transaction.')
+@click.option('--errors', 'errors_file', type=click.File('w'), default=None,
+              help='Write row errors as NDJSON to this file.')
+def import_products(source, fmt, chunk_size, errors_file):
+    """Upsert products by SKU from a CSV or NDJSON file ("-" for stdin); exits 1 on row errors."""
+    import json
+    from .services.product_import_service import ProductImportService
+    
+    fmt = fmt or ('csv' if source.name.lower().endswith('.csv') else 'ndjson')
+    report = ProductImportService.import_stream(source, fmt, chunk_size=chunk_size)
+    click.echo(
+        f'Processed {report["processed"]} rows: {report["inserted"]} inserted, '
+        f'{report["updated"]} updated, {report["failed"]} failed'
+    )
+    for error in report['errors']:
+        if errors_file:
+            errors_file.write(json.dumps(error, ensure_ascii=False) + '\n')
+        else:
+            click.echo(f'  row {error["row"]} ({error["sku"]}): {error["error"]}')
+    if report['errors_truncated']:
+        click.echo(f'  ... only the first {len(report["errors"])} errors are listed')
+    if report['failed']:
+        raise SystemExit(1)
+
+
+def register_commands(app):
+    """Register CLI command groups on the app."""
+    app.cli.add_command(maintenance_cli)
+    app.cli.add_command(analytics_cli)
+    app.cli.add_command(catalog_cli)
@@ -16,6 +16,18 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///vavip.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Read replicas (comma-separated URLs); catalog and analytics reads go there
+    SQLALCHEMY_REPLICA_URIS = [u.strip() for u in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if u.strip()]
+    REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG', 5))
+    REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('REPLICA_LAG_CHECK_INTERVAL', 5))
+    # Per-endpoint lag budget, e.g. "dashboard.get_stats=60,products.get_product=2"
+    REPLICA_ROUTE_MAX_LAG = {
+        endpoint.strip(): float(lag)
+        for endpoint, _, lag in (
+            item.partition('=') for item in os.environ.get('REPLICA_ROUTE_MAX_LAG', '').split(',') if '=' in item
+        )
+    }
+    
     # JWT
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-dev-secret')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(seconds=int(os.environ.get('JWT_ACCESS_TOKEN_EXPIRES', 3600)))
@@ -23,6 +35,13 @@ class Config:
     
     # Redis
     REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', 50))
+    REDIS_SOCKET_TIMEOUT = float(os.environ.get('REDIS_SOCKET_TIMEOUT', 0.5))
+    REDIS_CONNECT_TIMEOUT = float(os.environ.get('REDIS_CONNECT_TIMEOUT', 0.5))
+    REDIS_HEALTH_CHECK_INTERVAL = int(os.environ.get('REDIS_HEALTH_CHECK_INTERVAL', 30))
+    # Circuit breaker: open after N consecutive failures, retry after M seconds
+    REDIS_BREAKER_THRESHOLD = int(os.environ.get('REDIS_BREAKER_THRESHOLD', 5))
+    REDIS_BREAKER_RESET_TIMEOUT = float(os.environ.get('REDIS_BREAKER_RESET_TIMEOUT', 30))
     
     # CORS
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:5173')
@@ -34,9 +53,76 @@ class Config:
     # Logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
     
+    # Per-request SQL statement budget: requests running more are logged with their repeated statements
+    QUERY_STATS_ENABLED = os.environ.get('QUERY_STATS_ENABLED', 'true').lower() == 'true'
+    QUERY_BUDGET = int(os.environ.get('QUERY_BUDGET', 30))
+    # Per-endpoint budget, e.g. "products.get_products=6,dashboard.get_stats=20"
+    QUERY_BUDGETS = {
+        endpoint.strip(): int(budget)
+        for endpoint, _, budget in (
+            item.partition('=') for item in os.environ.get('QUERY_BUDGETS', '').split(',') if '=' in item
+        )
+    }
+    # X-Query-Count / X-Query-Time-Ms response headers (always sent in debug mode)
+    QUERY_STATS_HEADERS = os.environ.get('QUERY_STATS_HEADERS', 'false').lower() == 'true'
+    # Statements slower than the threshold go to logs/vavip_slow_queries.log (JSON lines)
+    SLOW_QUERY_LOG_ENABLED = os.environ.get('SLOW_QUERY_LOG_ENABLED', 'true').lower() == 'true'
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200))
+    # PostgreSQL: share of slow SELECTs captured with EXPLAIN (ANALYZE, BUFFERS), once per query per interval
+    SLOW_QUERY_EXPLAIN_SAMPLE = float(os.environ.get('SLOW_QUERY_EXPLAIN_SAMPLE', 0))
+    SLOW_QUERY_EXPLAIN_INTERVAL = float(os.environ.get('SLOW_QUERY_EXPLAIN_INTERVAL', 300))
+    
+    # Analytics: 'auto' (materialized views on PostgreSQL, daily rollup elsewhere), 'matview' or 'rollup'
+    ANALYTICS_BACKEND = os.environ.get('ANALYTICS_BACKEND', 'auto')
+    # Local timezone for chart buckets (day / week / month)
+    ANALYTICS_TIMEZONE = os.environ.get('ANALYTICS_TIMEZONE', 'Europe/Moscow')
+    ANALYTICS_VIEW_REFRESH_INTERVAL = float(os.environ.get('ANALYTICS_VIEW_REFRESH_INTERVAL', 300))
+    # Debounce for refreshes triggered by paid orders
+    ANALYTICS_VIEW_MIN_REFRESH_INTERVAL = float(os.environ.get('ANALYTICS_VIEW_MIN_REFRESH_INTERVAL', 60))
+    
+    # Approximate analytics sketches (Redis HyperLogLog / Count-Min / Top-K)
+    SKETCH_CMS_WIDTH = int(os.environ.get('SKETCH_CMS_WIDTH', 2048))
+    SKETCH_CMS_DEPTH = int(os.environ.get('SKETCH_CMS_DEPTH', 4))
+    SKETCH_TOPK = int(os.environ.get('SKETCH_TOPK', 50))
+    SKETCH_RETENTION_DAYS = int(os.environ.get('SKETCH_RETENTION_DAYS', 35))
+    # Product views are buffered per worker and flushed in batches
+    VIEW_FLUSH_INTERVAL = float(os.environ.get('VIEW_FLUSH_INTERVAL', 5))
+    VIEW_BUFFER_MAX_KEYS = int(os.environ.get('VIEW_BUFFER_MAX_KEYS', 10000))
+    # Catalog sort=popular / sort=bestsellers scores (time-decayed, recomputed periodically)
+    RANKING_REFRESH_INTERVAL = float(os.environ.get('RANKING_REFRESH_INTERVAL', 900))
+    RANKING_HALF_LIFE_DAYS = float(os.environ.get('RANKING_HALF_LIFE_DAYS', 14))
+    RANKING_WINDOW_DAYS = int(os.environ.get('RANKING_WINDOW_DAYS', 90))
+    # One unit sold counts as this many views in the popularity score
+    RANKING_SALE_WEIGHT = float(os.environ.get('RANKING_SALE_WEIGHT', 20))
+    
+    # Catalog facets (in-memory posting lists per worker)
+    FACET_PRICE_BOUNDS = os.environ.get('FACET_PRICE_BOUNDS', '1000,5000,10000,50000,100000')
+    FACET_VERSION_CHECK_INTERVAL = float(os.environ.get('FACET_VERSION_CHECK_INTERVAL', 1.0))
+    FACET_MAX_AGE = float(os.environ.get('FACET_MAX_AGE', 600))
+    
+    # Product detail payload cache (Redis, invalidated on product writes)
+    PRODUCT_DETAIL_CACHE_TTL = int(os.environ.get('PRODUCT_DETAIL_CACHE_TTL', 600))
+    
+    # Bulk product import (rows per transaction, row errors kept in the report)
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 1000))
+    IMPORT_MAX_ERRORS = int(os.environ.get('IMPORT_MAX_ERRORS', 1000))
+    
+    # Category tree snapshot (in memory per worker, versioned through Redis)
+    CATEGORY_VERSION_CHECK_INTERVAL = float(os.environ.get('CATEGORY_VERSION_CHECK_INTERVAL', 1.0))
+    CATEGORY_TREE_MAX_AGE = float(os.environ.get('CATEGORY_TREE_MAX_AGE', 300))
+    
+    # Maintenance
+    OTP_PURGE_BATCH_SIZE = int(os.environ.get('OTP_PURGE_BATCH_SIZE', 1000))
+    
     # Rate Limiting
     RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL', 'redis://localhost:6379/0')
     RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    # Count hits per worker and sync batched deltas to Redis (approximate limits)
+    RATELIMIT_HYBRID = os.environ.get('RATELIMIT_HYBRID', 'true').lower() == 'true'
+    RATELIMIT_SYNC_INTERVAL = float(os.environ.get('RATELIMIT_SYNC_INTERVAL', 1.0))
+    RATELIMIT_SYNC_BATCH = int(os.environ.get('RATELIMIT_SYNC_BATCH', 10))
+    # Separate budget for cheap catalog GETs (overrides the default limits)
+    RATELIMIT_CATALOG = os.environ.get('RATELIMIT_CATALOG', '5000 per hour;300 per minute')
     
     # Database connection pooling
     SQLALCHEMY_ENGINE_OPTIONS = {
@@ -70,6 +156,13 @@ class TestingConfig(Config):
     """Testing configuration."""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    # Tests run without Redis: skip the client and keep rate limits in memory
+    REDIS_URL = None
+    RATELIMIT_STORAGE_URL = 'memory://'
+    # Fixtures insert categories directly: reload the tree snapshot on every read
+    CATEGORY_TREE_MAX_AGE = 0
+    # Keep test runs from writing slow query entries into logs/
+    SLOW_QUERY_LOG_ENABLED = False
 
 
 config = {
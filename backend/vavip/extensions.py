@@ -11,8 +11,12 @@ from apispec import APISpec
 from apispec.ext.marshmallow import MarshmallowPlugin
 from apispec_webframeworks.flask import FlaskPlugin
 import redis
+from .utils.db_routing import RoutingSession
 
-db = SQLAlchemy()
+# Registers the hybrid+redis:// scheme with the limits storage registry
+from .utils import rate_limit_storage  # noqa: F401
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 jwt = JWTManager()
 socketio = SocketIO()
@@ -43,21 +47,57 @@ spec = APISpec(
 )
 
 # Redis client for caching and token blacklisting
+# (GuardedRedis proxy: fails fast while its circuit breaker is open)
 redis_client = None
 
 
 def init_redis(app):
-    """Initialize Redis client."""
+    """
+    Initialize the shared Redis connection pool.
+    
+    No connection is made here: the pool connects lazily on first use, so a
+    slow or absent Redis never delays startup. Timeouts keep individual
+    calls bounded and the circuit breaker short-circuits calls after
+    repeated failures.
+    """
     global redis_client
-    try:
-        redis_url = app.config.get('REDIS_URL', 'redis://localhost:6379/0')
-        redis_client = redis.from_url(redis_url, decode_responses=True)
-        # Test connection
-        redis_client.ping()
-        app.logger.info('Redis connection established')
-    except Exception as e:
-        app.logger.warning(f'Redis connection failed: {e}. Some features may be unavailable.')
+    from .utils.circuit_breaker import CircuitBreaker, GuardedRedis
+    
+    redis_url = app.config.get('REDIS_URL')
+    if not redis_url:
+        app.logger.warning('REDIS_URL is not set. Some features may be unavailable.')
         redis_client = None
+        return
+    
+    pool = redis.ConnectionPool.from_url(
+        redis_url,
+        decode_responses=True,
+        max_connections=app.config.get('REDIS_MAX_CONNECTIONS', 50),
+        socket_timeout=app.config.get('REDIS_SOCKET_TIMEOUT', 0.5),
+        socket_connect_timeout=app.config.get('REDIS_CONNECT_TIMEOUT', 0.5),
+        health_check_interval=app.config.get('REDIS_HEALTH_CHECK_INTERVAL', 30),
+        retry_on_timeout=False,
+    )
+    breaker = CircuitBreaker(
+        'redis',
+        failure_threshold=app.config.get('REDIS_BREAKER_THRESHOLD', 5),
+        reset_timeout=app.config.get('REDIS_BREAKER_RESET_TIMEOUT', 30),
+    )
+    redis_client = GuardedRedis(redis.Redis(connection_pool=pool), breaker)
+    app.logger.info('Redis connection pool configured')
+
+
+def get_redis():
+    """
+    The shared Redis client, or None when Redis is not configured or its breaker is open.
+    
+    The breaker is only inspected here (no side effects), so after an outage
+    the half-open trial is left to the command that follows and a success
+    closes the breaker again.
+    """
+    if redis_client is None or redis_client.breaker.is_open:
+        return None
+    return redis_client
 
 
 def setup_jwt_blacklist(app):
@@ -75,7 +115,10 @@ def setup_jwt_blacklist(app):
             return False
         
         # Check if token is blacklisted
-        blacklisted = redis_client.get(f'blacklist:{jti}')
+        try:
+            blacklisted = redis_client.get(f'blacklist:{jti}')
+        except redis.RedisError:
+            return False  # Fail open, same as when Redis is not configured
         return blacklisted is not None
     
     @jwt.revoked_token_loader
@@ -2,13 +2,17 @@
 Database Models
 """
 from .user import User
-from .product import Product, Category
+from .product import Product, Category, CategoryClosure, AttributeDefinition, ProductAttributeValue
 from .order import Order, OrderItem
 from .contact import Contact
 from .feedback import Feedback
 from .otp import PhoneOTP
+from .analytics import DailySalesRollup, AnalyticsViewRefresh, CustomerSummary, CustomerCohort, \
+    DailyProductViews
 
-__all__ = ['User', 'Product', 'Category', 'Order', 'OrderItem', 'Contact', 'Feedback', 'PhoneOTP']
+__all__ = ['User', 'Product', 'Category', 'Order', 'OrderItem', 'Contact', 'Feedback', 'PhoneOTP', 'DailySalesRollup',
+           'AnalyticsViewRefresh', 'CustomerSummary', 'CustomerCohort', 'DailyProductViews',
+           'CategoryClosure', 'AttributeDefinition', 'ProductAttributeValue']
 
 
 
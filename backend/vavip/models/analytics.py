@@ -0,0 +1,137 @@
+"""
+Analytics rollup models
+"""
+from ..extensions import db
+
+
+class DailySalesRollup(db.Model):
+    """
+    Paid sales aggregated per (day, category, product).
+    
+    Maintained incrementally when an order becomes paid (or stops being paid)
+    and rebuilt by `flask analytics backfill-rollup`. `category_id = 0` means
+    the product had no category. Rows with `product_id = 0` hold order-level
+    day totals (order count and order revenue including delivery/discount),
+    read only by `reconcile` as a per-day checksum against the orders table.
+    """
+    __tablename__ = 'daily_sales_rollup'
+
+    ORDER_TOTALS = 0  # product_id / category_id of the day-total row
+
+    day = db.Column(db.Date, primary_key=True)
+    category_id = db.Column(db.Integer, primary_key=True, default=0)
+    product_id = db.Column(db.Integer, primary_key=True)
+    product_name = db.Column(db.String(200))  # Latest snapshot from order items
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat() if self.day else None,
+            'category_id': self.category_id,
+            'product_id': self.product_id,
+            'product_name': self.product_name,
+            'quantity': self.quantity,
+            'revenue': float(self.revenue) if self.revenue else 0,
+            'orders': self.orders
+        }
+
+
+class AnalyticsViewRefresh(db.Model):
+    """
+    Last refresh of each analytics materialized view (freshness for the API).
+
+    Also records the last product ranking recompute under 'product_rankings'.
+    """
+    __tablename__ = 'analytics_view_refreshes'
+
+    name = db.Column(db.String(64), primary_key=True)
+    refreshed_at = db.Column(db.DateTime, nullable=False)
+    duration_ms = db.Column(db.Integer)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'refreshed_at': self.refreshed_at.isoformat() if self.refreshed_at else None,
+            'duration_ms': self.duration_ms
+        }
+
+
+class CustomerSummary(db.Model):
+    """
+    Per-customer order totals, rebuilt in batch by `flask analytics rebuild-customers`.
+    
+    Cancelled orders are ignored; total_spent counts paid orders only.
+    cohort_month is the local month of the customer's first order.
+    """
+    __tablename__ = 'customer_summaries'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    paid_order_count = db.Column(db.Integer, nullable=False, default=0)
+    total_spent = db.Column(db.Numeric(12, 2), nullable=False, default=0, index=True)
+    first_order_at = db.Column(db.DateTime)
+    last_order_at = db.Column(db.DateTime, index=True)
+    cohort_month = db.Column(db.Date, index=True)
+    computed_at = db.Column(db.DateTime, nullable=False)
+
+    user = db.relationship('User')
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'email': self.user.email if self.user else None,
+            'first_name': self.user.first_name if self.user else None,
+            'last_name': self.user.last_name if self.user else None,
+            'order_count': self.order_count,
+            'paid_order_count': self.paid_order_count,
+            'total_spent': float(self.total_spent) if self.total_spent else 0,
+            'first_order_at': self.first_order_at.isoformat() if self.first_order_at else None,
+            'last_order_at': self.last_order_at.isoformat() if self.last_order_at else None,
+            'cohort_month': self.cohort_month.isoformat() if self.cohort_month else None,
+            'computed_at': self.computed_at.isoformat() if self.computed_at else None
+        }
+
+
+class CustomerCohort(db.Model):
+    """
+    Monthly cohort matrix: activity of customers first seen in cohort_month,
+    `period` months later (period 0 = the cohort month itself).
+    """
+    __tablename__ = 'customer_cohorts'
+
+    cohort_month = db.Column(db.Date, primary_key=True)
+    period = db.Column(db.Integer, primary_key=True)
+    customers = db.Column(db.Integer, nullable=False, default=0)  # Customers with an order that month
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'period': self.period,
+            'customers': self.customers,
+            'orders': self.orders,
+            'revenue': float(self.revenue) if self.revenue else 0
+        }
+
+
+class DailyProductViews(db.Model):
+    """
+    Product page views per (UTC day, product), same day convention as
+    daily_sales_rollup so the two can be joined for conversion rates.
+    
+    Written in aggregated batches by ViewTrackingService, never per request.
+    """
+    __tablename__ = 'daily_product_views'
+
+    day = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.Integer, primary_key=True, index=True)
+    views = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat() if self.day else None,
+            'product_id': self.product_id,
+            'views': self.views
+        }
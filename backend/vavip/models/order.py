@@ -8,6 +8,10 @@ from ..extensions import db
 class Order(db.Model):
     """Order model."""
     __tablename__ = 'orders'
+    __table_args__ = (
+        # Range scans for paid-sales analytics
+        db.Index('ix_orders_payment_status_created_at', 'payment_status', 'created_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     order_number = db.Column(db.String(50), unique=True, nullable=False, index=True)
@@ -47,7 +51,7 @@ class Order(db.Model):
     delivered_at = db.Column(db.DateTime)
 
     # Relationships
-    items = db.relationship('OrderItem', backref='order', lazy='dynamic', cascade='all, delete-orphan')
+    items = db.relationship('OrderItem', backref='order', cascade='all, delete-orphan', order_by='OrderItem.id')
 
     def to_dict(self, include_items=True):
         data = {
@@ -76,7 +80,7 @@ class Order(db.Model):
             'delivered_at': self.delivered_at.isoformat() if self.delivered_at else None
         }
         if include_items:
-            data['items'] = [item.to_dict() for item in self.items.all()]
+            data['items'] = [item.to_dict() for item in self.items]
         return data
 
 
@@ -39,9 +39,38 @@ class Category(db.Model):
         return data
 
 
+class CategoryClosure(db.Model):
+    """
+    Category tree closure: one row per (ancestor, descendant) pair, including
+    each category paired with itself at depth 0.
+
+    The primary key answers "all categories under X" with an index range
+    scan; the descendant index answers "all ancestors of X" (breadcrumbs).
+    Maintained incrementally by CategoryService: a create adds the new
+    node's rows, a move re-links only the moved subtree.
+    """
+    __tablename__ = 'category_closure'
+
+    ancestor_id = db.Column(db.Integer, db.ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True)
+    descendant_id = db.Column(db.Integer, db.ForeignKey('categories.id', ondelete='CASCADE'),
+                              primary_key=True, index=True)
+    depth = db.Column(db.Integer, nullable=False)
+
+
 class Product(db.Model):
     """Product model."""
     __tablename__ = 'products'
+    __table_args__ = (
+        # Catalog listings: equality on is_active (and category), ordered by the
+        # sort column, so each page is an index range scan (see SORT_KEYS)
+        db.Index('ix_products_active_created_at', 'is_active', 'created_at'),
+        db.Index('ix_products_active_price', 'is_active', 'price'),
+        db.Index('ix_products_active_name', 'is_active', 'name'),
+        db.Index('ix_products_active_popularity', 'is_active', 'popularity_score'),
+        db.Index('ix_products_active_sales', 'is_active', 'sales_score'),
+        db.Index('ix_products_active_category_created_at', 'is_active', 'category_id', 'created_at'),
+        db.Index('ix_products_active_category_price', 'is_active', 'category_id', 'price'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
@@ -59,12 +88,26 @@ class Product(db.Model):
     sort_order = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Time-decayed ranking scores, recomputed periodically by ProductRankingService
+    popularity_score = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    sales_score = db.Column(db.Float, nullable=False, default=0, server_default='0')
 
     # Relationships
-    images = db.relationship('ProductImage', backref='product', lazy='dynamic', cascade='all, delete-orphan')
-    attributes = db.relationship('ProductAttribute', backref='product', lazy='dynamic', cascade='all, delete-orphan')
+    # Plain collections (not lazy='dynamic') so listings can selectinload them
+    images = db.relationship('ProductImage', backref='product', cascade='all, delete-orphan',
+                             order_by='(ProductImage.sort_order, ProductImage.id)')
+    attributes = db.relationship('ProductAttribute', backref='product', cascade='all, delete-orphan',
+                                 order_by='(ProductAttribute.sort_order, ProductAttribute.id)')
+    attribute_values = db.relationship('ProductAttributeValue', backref='product', cascade='all, delete-orphan',
+                                       passive_deletes=True)
+
+    @property
+    def main_image(self):
+        """The image flagged as main, picked from the (preloadable) images collection."""
+        return next((img for img in self.images if img.is_main), None)
 
     def to_dict(self, include_details=False):
+        main_image = self.main_image
         data = {
             'id': self.id,
             'name': self.name,
@@ -78,12 +121,15 @@ class Product(db.Model):
             'is_active': self.is_active,
             'is_featured': self.is_featured,
             'short_description': self.short_description,
-            'main_image': self.images.filter_by(is_main=True).first().url if self.images.filter_by(is_main=True).first() else None
+            'main_image': main_image.url if main_image else None
         }
         if include_details:
             data['description'] = self.description
-            data['images'] = [img.to_dict() for img in self.images.all()]
-            data['attributes'] = [attr.to_dict() for attr in self.attributes.all()]
+            data['images'] = [img.to_dict() for img in self.images]
+            data['attributes'] = [attr.to_dict() for attr in self.attributes]
+            data['specs'] = [value.to_dict() for value in sorted(
+                self.attribute_values, key=lambda v: (v.attribute.sort_order or 0, v.attribute.name)
+            )]
             if self.category:
                 data['category'] = self.category.to_dict()
         return data
@@ -138,3 +184,77 @@ class ProductAttribute(db.Model):
 
 
 
+
+
+class AttributeDefinition(db.Model):
+    """
+    Typed attribute (specification) definition.
+
+    Types: numeric (value_numeric, optional unit), enum (value_enum, one of
+    options) and boolean (value_bool).
+    """
+    __tablename__ = 'attribute_definitions'
+
+    TYPES = ('numeric', 'enum', 'boolean')
+
+    id = db.Column(db.Integer, primary_key=True)
+    code = db.Column(db.String(50), unique=True, nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=False)
+    type = db.Column(db.String(20), nullable=False)
+    unit = db.Column(db.String(20))
+    options = db.Column(db.JSON)  # Allowed enum values
+    sort_order = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'code': self.code,
+            'name': self.name,
+            'type': self.type,
+            'unit': self.unit,
+            'options': self.options,
+            'sort_order': self.sort_order
+        }
+
+
+class ProductAttributeValue(db.Model):
+    """
+    One typed attribute value of a product (one row per product and attribute).
+
+    Only the column matching the definition's type is set. The
+    (attribute_id, value_*, product_id) indexes turn equality and range
+    filters into index range scans that yield product ids directly.
+    """
+    __tablename__ = 'product_attribute_values'
+    __table_args__ = (
+        db.Index('ix_attribute_values_numeric', 'attribute_id', 'value_numeric', 'product_id'),
+        db.Index('ix_attribute_values_enum', 'attribute_id', 'value_enum', 'product_id'),
+        db.Index('ix_attribute_values_bool', 'attribute_id', 'value_bool', 'product_id'),
+    )
+
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    attribute_id = db.Column(db.Integer, db.ForeignKey('attribute_definitions.id', ondelete='CASCADE'),
+                             primary_key=True)
+    value_numeric = db.Column(db.Numeric(14, 4))
+    value_enum = db.Column(db.String(100))
+    value_bool = db.Column(db.Boolean)
+
+    attribute = db.relationship('AttributeDefinition', lazy='joined')
+
+    @property
+    def value(self):
+        if self.attribute.type == 'numeric':
+            return float(self.value_numeric) if self.value_numeric is not None else None
+        if self.attribute.type == 'boolean':
+            return self.value_bool
+        return self.value_enum
+
+    def to_dict(self):
+        return {
+            'code': self.attribute.code,
+            'name': self.attribute.name,
+            'type': self.attribute.type,
+            'unit': self.attribute.unit,
+            'value': self.value
+        }
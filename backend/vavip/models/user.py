@@ -22,7 +22,7 @@ class User(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
-    orders = db.relationship('Order', backref='user', lazy='dynamic')
+    orders = db.relationship('Order', backref='user')
     addresses = db.relationship('Address', backref='user', lazy='dynamic')
     favorites = db.relationship('Favorite', backref='user', lazy='dynamic')
 
@@ -1,7 +1,7 @@
 """
 Product schemas for request validation.
 """
-from marshmallow import Schema, fields, validate
+from marshmallow import Schema, fields, validate, validates_schema, ValidationError
 
 
 class CreateProductSchema(Schema):
@@ -36,5 +36,33 @@ class UpdateProductSchema(Schema):
     is_featured = fields.Bool(allow_none=True)
 
 
+class CreateAttributeDefinitionSchema(Schema):
+    """Schema for typed attribute definition creation."""
+    code = fields.Str(required=True, validate=validate.Regexp(r'^[a-z0-9_-]{1,50}$'), error_messages={'required': 'Code is required'})
+    name = fields.Str(required=True, validate=validate.Length(min=1, max=100), error_messages={'required': 'Name is required'})
+    type = fields.Str(required=True, validate=validate.OneOf(['numeric', 'enum', 'boolean']), error_messages={'required': 'Type is required'})
+    unit = fields.Str(allow_none=True, validate=validate.Length(max=20))
+    options = fields.List(fields.Str(validate=validate.Length(min=1, max=100)), allow_none=True)
+    sort_order = fields.Int(allow_none=True, missing=0)
 
 
+class BulkPriceStockItemSchema(Schema):
+    """One price / stock change, addressed by id or sku."""
+    id = fields.Int()
+    sku = fields.Str(validate=validate.Length(min=1, max=50))
+    price = fields.Decimal(validate=validate.Range(min=0))
+    old_price = fields.Decimal(allow_none=True, validate=validate.Range(min=0))
+    stock_quantity = fields.Int(validate=validate.Range(min=0))
+    
+    @validates_schema
+    def validate_item(self, data, **kwargs):
+        if ('id' in data) == ('sku' in data):
+            raise ValidationError('Give exactly one of id or sku')
+        if not {'price', 'old_price', 'stock_quantity'} & set(data):
+            raise ValidationError('Nothing to update: give price, old_price or stock_quantity')
+
+
+class BulkPriceStockSchema(Schema):
+    """Schema for batched price / stock updates."""
+    items = fields.List(fields.Nested(BulkPriceStockItemSchema), required=True,
+                        validate=validate.Length(min=1, max=5000), error_messages={'required': 'Items are required'})
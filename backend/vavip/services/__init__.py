@@ -8,7 +8,17 @@ from .auth_service import AuthService
 from .order_service import OrderService
 from .analytics_service import AnalyticsService
 from .product_service import ProductService, CategoryService, FavoriteService
+from .product_ranking_service import ProductRankingService
+from .facet_service import FacetService
+from .attribute_service import AttributeService
 from .user_service import UserService
+from .maintenance_service import MaintenanceService
+from .sales_rollup_service import SalesRollupService
+from .analytics_view_service import AnalyticsViewService
+from .live_counters_service import LiveCountersService
+from .customer_analytics_service import CustomerAnalyticsService
+from .sketch_service import SketchService
+from .view_tracking_service import ViewTrackingService
 
 __all__ = [
     # Authentication
@@ -24,9 +34,21 @@ __all__ = [
     'ProductService',
     'CategoryService',
     'FavoriteService',
+    'ProductRankingService',
+    'FacetService',
+    'AttributeService',
     
     # Analytics
     'AnalyticsService',
+    'SalesRollupService',
+    'AnalyticsViewService',
+    'LiveCountersService',
+    'CustomerAnalyticsService',
+    'SketchService',
+    'ViewTrackingService',
+    
+    # Maintenance
+    'MaintenanceService',
 ]
 
 
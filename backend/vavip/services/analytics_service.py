@@ -4,68 +4,143 @@ Analytics Service
 from datetime import datetime, timedelta
 from sqlalchemy import func
 from ..extensions import db
-from ..models import User, Product, Order, OrderItem, Feedback
+from ..models import User, Product, Order, OrderItem, Feedback, DailySalesRollup, DailyProductViews
+from ..utils.db_routing import replica_read
+from ..utils.time_buckets import make_buckets, get_timezone, bucket_index, fill_gaps
+from .analytics_view_service import AnalyticsViewService
+from .sketch_service import SketchService
 
 
 class AnalyticsService:
     """Analytics and reporting business logic."""
     
     @staticmethod
+    @replica_read()
     def get_dashboard_stats(days=30):
-        """Get main dashboard statistics."""
+        """
+        Get main dashboard statistics.
+        
+        All counters come from one round-trip: each table is aggregated once
+        with FILTER (WHERE ...) clauses, and the one-row results are combined
+        in a single SELECT.
+        """
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        return {
-            'total_users': User.query.count(),
-            'total_products': Product.query.filter_by(is_active=True).count(),
-            'total_orders': Order.query.count(),
-            'orders_in_period': Order.query.filter(Order.created_at >= start_date).count(),
-            'revenue': float(db.session.query(func.sum(Order.total)).filter(
+        users = db.session.query(
+            func.count(User.id).label('total'),
+            func.count(User.id).filter(User.created_at >= start_date).label('new')
+        ).subquery()
+        
+        products = db.session.query(
+            func.count(Product.id).filter(Product.is_active.is_(True)).label('active')
+        ).subquery()
+        
+        orders = db.session.query(
+            func.count(Order.id).label('total'),
+            func.count(Order.id).filter(Order.created_at >= start_date).label('in_period'),
+            func.count(Order.id).filter(Order.status == 'pending').label('pending'),
+            func.sum(Order.total).filter(
                 Order.payment_status == 'paid',
                 Order.created_at >= start_date
-            ).scalar() or 0),
-            'pending_orders': Order.query.filter_by(status='pending').count(),
-            'unread_feedback': Feedback.query.filter_by(is_read=False).count(),
-            'new_users': User.query.filter(User.created_at >= start_date).count(),
+            ).label('revenue')
+        ).subquery()
+        
+        feedback = db.session.query(
+            func.count(Feedback.id).filter(Feedback.is_read.is_(False)).label('unread')
+        ).subquery()
+        
+        row = db.session.query(
+            users.c.total, users.c.new,
+            products.c.active,
+            orders.c.total, orders.c.in_period, orders.c.pending, orders.c.revenue,
+            feedback.c.unread
+        ).select_from(users).join(products, db.true()).join(orders, db.true())\
+         .join(feedback, db.true()).one()
+        
+        (total_users, new_users, total_products, total_orders,
+         orders_in_period, pending_orders, revenue, unread_feedback) = row
+        
+        return {
+            'total_users': total_users,
+            'total_products': total_products,
+            'total_orders': total_orders,
+            'orders_in_period': orders_in_period,
+            'revenue': float(revenue or 0),
+            'pending_orders': pending_orders,
+            'unread_feedback': unread_feedback,
+            'new_users': new_users,
             'period_days': days
         }
     
     @staticmethod
-    def get_sales_by_day(days=30):
-        """Get daily sales data."""
-        start_date = datetime.utcnow() - timedelta(days=days)
+    @replica_read()
+    def get_sales_by_day(days=30, granularity='day', tz=None):
+        """
+        Get paid sales per day, week or month in the local timezone.
+        
+        Orders are selected with range predicates on (payment_status,
+        created_at), so the composite index is used, and bucketed in SQL.
+        Buckets without sales are returned with zeros.
+        
+        Args:
+            days: Period length in days
+            granularity: 'day', 'week' or 'month'
+            tz: Timezone name (defaults to ANALYTICS_TIMEZONE)
+        
+        Returns:
+            List of {'date', 'revenue', 'orders'}; date is the local bucket start
         
-        sales_data = db.session.query(
-            func.date(Order.created_at).label('date'),
-            func.sum(Order.total).label('revenue'),
-            func.count(Order.id).label('orders')
+        Raises:
+            ValueError: On a period under one day, unknown granularity or timezone
+        """
+        if days < 1:
+            raise ValueError('days must be at least 1')
+        now = datetime.utcnow()
+        buckets = make_buckets(now - timedelta(days=days), now, granularity, get_timezone(tz))
+        dialect = db.session.get_bind().dialect.name
+        
+        paid = db.session.query(
+            bucket_index(Order.created_at, buckets, dialect).label('bucket'),
+            Order.id,
+            Order.total
         ).filter(
-            Order.created_at >= start_date,
-            Order.payment_status == 'paid'
-        ).group_by(func.date(Order.created_at)).all()
+            Order.payment_status == 'paid',
+            Order.created_at >= buckets[0].start,
+            Order.created_at < buckets[-1].end
+        ).subquery()
         
-        return [{
-            'date': str(row.date),
-            'revenue': float(row.revenue) if row.revenue else 0,
-            'orders': row.orders
-        } for row in sales_data]
+        rows = db.session.query(
+            paid.c.bucket,
+            func.count(paid.c.id).label('orders'),
+            func.sum(paid.c.total).label('revenue')
+        ).group_by(paid.c.bucket).all()
+        
+        return fill_gaps(buckets, {row.bucket: row for row in rows}, lambda bucket, row: {
+            'date': bucket.label.isoformat(),
+            'revenue': float(row.revenue) if row and row.revenue else 0,
+            'orders': row.orders if row else 0
+        })
     
     @staticmethod
+    @replica_read()
     def get_top_products(limit=10, days=30):
-        """Get top selling products."""
-        start_date = datetime.utcnow() - timedelta(days=days)
+        """Get top selling products (materialized view or daily sales rollup)."""
+        start_day = (datetime.utcnow() - timedelta(days=days)).date()
+        if AnalyticsViewService.backend() == 'matview':
+            return AnalyticsViewService.get_top_products(start_day, limit)
         
+        total_quantity = func.sum(DailySalesRollup.quantity)
         top_products = db.session.query(
-            OrderItem.product_id,
-            OrderItem.product_name,
-            func.sum(OrderItem.quantity).label('total_quantity'),
-            func.sum(OrderItem.total).label('total_revenue')
-        ).join(Order).filter(
-            Order.created_at >= start_date,
-            Order.payment_status == 'paid'
+            DailySalesRollup.product_id,
+            func.max(DailySalesRollup.product_name).label('product_name'),
+            total_quantity.label('total_quantity'),
+            func.sum(DailySalesRollup.revenue).label('total_revenue')
+        ).filter(
+            DailySalesRollup.product_id != DailySalesRollup.ORDER_TOTALS,
+            DailySalesRollup.day >= start_day
         ).group_by(
-            OrderItem.product_id, OrderItem.product_name
-        ).order_by(func.sum(OrderItem.quantity).desc()).limit(limit).all()
+            DailySalesRollup.product_id
+        ).having(total_quantity > 0).order_by(total_quantity.desc()).limit(limit).all()
         
         return [{
             'product_id': row.product_id,
@@ -75,6 +150,71 @@ class AnalyticsService:
         } for row in top_products]
     
     @staticmethod
+    @replica_read()
+    def get_popular_products(limit=10, days=7):
+        """Get most viewed products (batched view counts)."""
+        start_day = (datetime.utcnow() - timedelta(days=days)).date()
+        total_views = func.sum(DailyProductViews.views)
+        
+        rows = db.session.query(
+            Product.id, Product.name, total_views.label('views')
+        ).join(Product, Product.id == DailyProductViews.product_id)\
+         .filter(DailyProductViews.day >= start_day)\
+         .group_by(Product.id, Product.name)\
+         .order_by(total_views.desc()).limit(limit).all()
+        
+        return [{
+            'product_id': row.id,
+            'product_name': row.name,
+            'views': row.views
+        } for row in rows]
+    
+    @staticmethod
+    @replica_read()
+    def get_product_conversion(limit=20, days=30):
+        """
+        Views-to-orders conversion per product.
+        
+        View counts and the daily sales rollup are each aggregated once and
+        joined on product; conversion_rate is paid orders per 100 views.
+        
+        Returns:
+            Most viewed products with views, orders, quantity and conversion_rate
+        """
+        start_day = (datetime.utcnow() - timedelta(days=days)).date()
+        
+        views = db.session.query(
+            DailyProductViews.product_id,
+            func.sum(DailyProductViews.views).label('views')
+        ).filter(DailyProductViews.day >= start_day)\
+         .group_by(DailyProductViews.product_id).subquery()
+        
+        sales = db.session.query(
+            DailySalesRollup.product_id,
+            func.sum(DailySalesRollup.orders).label('orders'),
+            func.sum(DailySalesRollup.quantity).label('quantity')
+        ).filter(
+            DailySalesRollup.product_id != DailySalesRollup.ORDER_TOTALS,
+            DailySalesRollup.day >= start_day
+        ).group_by(DailySalesRollup.product_id).subquery()
+        
+        rows = db.session.query(
+            views.c.product_id, Product.name, views.c.views, sales.c.orders, sales.c.quantity
+        ).join(Product, Product.id == views.c.product_id)\
+         .outerjoin(sales, sales.c.product_id == views.c.product_id)\
+         .order_by(views.c.views.desc()).limit(limit).all()
+        
+        return [{
+            'product_id': row.product_id,
+            'product_name': row.name,
+            'views': row.views,
+            'orders': row.orders or 0,
+            'quantity': row.quantity or 0,
+            'conversion_rate': round(100 * (row.orders or 0) / row.views, 2) if row.views else 0
+        } for row in rows]
+    
+    @staticmethod
+    @replica_read()
     def get_order_status_breakdown():
         """Get order count by status."""
         status_counts = db.session.query(
@@ -85,36 +225,75 @@ class AnalyticsService:
         return {row.status: row.count for row in status_counts}
     
     @staticmethod
+    @replica_read()
     def get_revenue_by_category(days=30):
-        """Get revenue breakdown by category."""
-        start_date = datetime.utcnow() - timedelta(days=days)
+        """Get revenue breakdown by category (materialized view or daily sales rollup)."""
+        start_day = (datetime.utcnow() - timedelta(days=days)).date()
+        if AnalyticsViewService.backend() == 'matview':
+            return AnalyticsViewService.get_revenue_by_category(start_day)
         
         from ..models import Category
         
         revenue_data = db.session.query(
             Category.name,
-            func.sum(OrderItem.total).label('revenue')
-        ).join(Product, Product.category_id == Category.id)\
-         .join(OrderItem, OrderItem.product_id == Product.id)\
-         .join(Order, Order.id == OrderItem.order_id)\
+            func.sum(DailySalesRollup.revenue).label('revenue')
+        ).join(Category, Category.id == DailySalesRollup.category_id)\
          .filter(
-            Order.created_at >= start_date,
-            Order.payment_status == 'paid'
+            DailySalesRollup.product_id != DailySalesRollup.ORDER_TOTALS,
+            DailySalesRollup.day >= start_day
         ).group_by(Category.name).all()
         
         return [{
             'category': row.name,
             'revenue': float(row.revenue) if row.revenue else 0
         } for row in revenue_data]
-
-
-
-
-
-
-
-
-
-
-
-
+    
+    @staticmethod
+    @replica_read()
+    def get_refreshed_at():
+        """
+        Freshness of the top products / revenue by category data.
+        
+        Returns:
+            Last materialized view refresh (None if never refreshed); the
+            rollup is maintained transactionally, so it is always current
+        """
+        if AnalyticsViewService.backend() == 'matview':
+            return AnalyticsViewService.get_refreshed_at()
+        return datetime.utcnow()
+    
+    @staticmethod
+    @replica_read()
+    def get_unique_buyers(product_id, days=30):
+        """Exact number of distinct customers with a paid order for a product."""
+        start_date = datetime.utcnow() - timedelta(days=days)
+        
+        return db.session.query(func.count(func.distinct(Order.user_id)))\
+            .join(OrderItem, OrderItem.order_id == Order.id)\
+            .filter(
+                OrderItem.product_id == product_id,
+                Order.payment_status == 'paid',
+                Order.created_at >= start_date
+            ).scalar() or 0
+    
+    # Approximate counterparts (Redis sketches, O(1) per query; None without Redis)
+    
+    @staticmethod
+    def get_unique_buyers_approx(product_id, days=30):
+        """Approximate distinct buyers of a product (HyperLogLog)."""
+        return SketchService.unique_buyers(product_id, days)
+    
+    @staticmethod
+    def get_unique_visitors_approx(days=7):
+        """Approximate unique visitors per day and for the period (HyperLogLog)."""
+        return SketchService.unique_visitors(days)
+    
+    @staticmethod
+    def get_product_views_approx(product_id, days=30):
+        """Approximate product page views (Count-Min sketch)."""
+        return SketchService.product_count('views', product_id, days)
+    
+    @staticmethod
+    def get_top_products_approx(metric='views', limit=10, days=7):
+        """Approximate most viewed or most sold products (Top-K)."""
+        return SketchService.top_products(metric, limit, days)
@@ -0,0 +1,240 @@
+"""
+Analytics View Service - Materialized views for dashboard reports
+
+On PostgreSQL the top products and revenue by category reports are served
+from materialized views that are refreshed CONCURRENTLY (readers are never
+blocked) by a background loop and shortly after an order is paid. On other databases (SQLite in tests and local
+development) the same SELECTs are installed as plain views, so the query path
+is identical and the data is always live.
+"""
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from flask import current_app
+from sqlalchemy import Date, Integer, Numeric, String, column, func, table, text
+from ..extensions import db, socketio
+from ..models import AnalyticsViewRefresh
+
+logger = logging.getLogger(__name__)
+
+# Paid sales per (day, product) / (day, category). The unique index
+# columns are required by REFRESH MATERIALIZED VIEW CONCURRENTLY.
+VIEW_DEFINITIONS = {
+    'mv_product_sales_by_day': (
+        """
+        SELECT date(o.created_at) AS day, oi.product_id AS product_id,
+               MAX(oi.product_name) AS product_name,
+               SUM(oi.quantity) AS quantity, SUM(oi.total) AS revenue
+        FROM order_items oi
+        JOIN orders o ON o.id = oi.order_id
+        WHERE o.payment_status = 'paid'
+        GROUP BY date(o.created_at), oi.product_id
+        """,
+        ('day', 'product_id')
+    ),
+    'mv_category_revenue_by_day': (
+        """
+        SELECT date(o.created_at) AS day, c.id AS category_id, c.name AS category_name,
+               SUM(oi.total) AS revenue
+        FROM order_items oi
+        JOIN orders o ON o.id = oi.order_id
+        JOIN products p ON p.id = oi.product_id
+        JOIN categories c ON c.id = p.category_id
+        WHERE o.payment_status = 'paid'
+        GROUP BY date(o.created_at), c.id, c.name
+        """,
+        ('day', 'category_id')
+    ),
+}
+
+mv_product_sales_by_day = table(
+    'mv_product_sales_by_day',
+    column('day', Date), column('product_id', Integer), column('product_name', String),
+    column('quantity', Integer), column('revenue', Numeric(12, 2))
+)
+mv_category_revenue_by_day = table(
+    'mv_category_revenue_by_day',
+    column('day', Date), column('category_id', Integer), column('category_name', String),
+    column('revenue', Numeric(12, 2))
+)
+
+# Arbitrary constant for pg_try_advisory_xact_lock: one refresher at a time
+_REFRESH_LOCK_KEY = 0x76617669
+
+
+def _is_postgres() -> bool:
+    return db.engine.dialect.name == 'postgresql'
+
+
+class AnalyticsViewService:
+    """Materialized analytics views: creation, refresh and reads."""
+
+    @staticmethod
+    def backend() -> str:
+        """
+        Storage backing the dashboard reports.
+
+        Returns:
+            'matview' or 'rollup'; ANALYTICS_BACKEND=auto picks materialized
+            views on PostgreSQL and the daily sales rollup elsewhere
+        """
+        configured = current_app.config.get('ANALYTICS_BACKEND', 'auto')
+        if configured != 'auto':
+            return configured
+        return 'matview' if _is_postgres() else 'rollup'
+
+    @staticmethod
+    def create_views() -> None:
+        """Create the views if missing (materialized on PostgreSQL, plain elsewhere)."""
+        postgres = _is_postgres()
+        for name, (select, unique_columns) in VIEW_DEFINITIONS.items():
+            if postgres:
+                db.session.execute(text(f'CREATE MATERIALIZED VIEW IF NOT EXISTS {name} AS {select}'))
+                db.session.execute(text(
+                    f'CREATE UNIQUE INDEX IF NOT EXISTS ix_{name}_key ON {name} ({", ".join(unique_columns)})'
+                ))
+            else:
+                db.session.execute(text(f'CREATE VIEW IF NOT EXISTS {name} AS {select}'))
+        db.session.commit()
+
+    @staticmethod
+    def refresh(concurrently: bool = True, min_age: Optional[float] = None) -> Dict[str, int]:
+        """
+        Refresh all materialized views.
+
+        Args:
+            concurrently: Use REFRESH ... CONCURRENTLY (keeps the views readable)
+            min_age: Skip if the views were refreshed less than this many seconds ago
+
+        Returns:
+            Dict of view name -> refresh duration in ms; empty if nothing was refreshed
+        """
+        if not _is_postgres():
+            return {}
+
+        if min_age:
+            last = AnalyticsViewService.get_refreshed_at()
+            if last and last > datetime.utcnow() - timedelta(seconds=min_age):
+                return {}
+
+        # Another worker already refreshing: its result is as fresh as ours would be
+        if not db.session.execute(text('SELECT pg_try_advisory_xact_lock(:key)'),
+                                  {'key': _REFRESH_LOCK_KEY}).scalar():
+            db.session.rollback()
+            return {}
+
+        durations = {}
+        mode = 'CONCURRENTLY ' if concurrently else ''
+        for name in VIEW_DEFINITIONS:
+            started = time.perf_counter()
+            db.session.execute(text(f'REFRESH MATERIALIZED VIEW {mode}{name}'))
+            durations[name] = int((time.perf_counter() - started) * 1000)
+            db.session.merge(AnalyticsViewRefresh(
+                name=name, refreshed_at=datetime.utcnow(), duration_ms=durations[name]
+            ))
+        db.session.commit()
+        return durations
+
+    @staticmethod
+    def request_refresh() -> bool:
+        """
+        Refresh the views in the background (called after an order is paid).
+
+        Debounced by ANALYTICS_VIEW_MIN_REFRESH_INTERVAL so a burst of payments
+        costs one refresh.
+
+        Returns:
+            True if a background refresh was scheduled
+        """
+        if AnalyticsViewService.backend() != 'matview' or not _is_postgres():
+            return False
+        app = current_app._get_current_object()
+        socketio.start_background_task(
+            _refresh_in_background, app, app.config.get('ANALYTICS_VIEW_MIN_REFRESH_INTERVAL', 60)
+        )
+        return True
+
+    @staticmethod
+    def get_refreshed_at() -> Optional[datetime]:
+        """
+        Freshness of the view data.
+
+        Returns:
+            Time of the oldest view refresh; now for live (non-materialized)
+            views; None if the views were never refreshed
+        """
+        if not _is_postgres():
+            return datetime.utcnow()
+        refreshes = AnalyticsViewRefresh.query.filter(
+            AnalyticsViewRefresh.name.in_(list(VIEW_DEFINITIONS))
+        ).all()
+        if len(refreshes) < len(VIEW_DEFINITIONS):
+            return None
+        return min(r.refreshed_at for r in refreshes)
+
+    @staticmethod
+    def get_top_products(start_day: date, limit: int = 10) -> List[dict]:
+        """Best-selling products by quantity since start_day."""
+        v = mv_product_sales_by_day
+        total_quantity = func.sum(v.c.quantity)
+        rows = db.session.execute(
+            db.select(
+                v.c.product_id,
+                func.max(v.c.product_name).label('product_name'),
+                total_quantity.label('total_quantity'),
+                func.sum(v.c.revenue).label('total_revenue')
+            ).where(v.c.day >= start_day)
+            .group_by(v.c.product_id)
+            .order_by(total_quantity.desc())
+            .limit(limit)
+        ).all()
+        return [{
+            'product_id': row.product_id,
+            'product_name': row.product_name,
+            'total_quantity': int(row.total_quantity or 0),
+            'total_revenue': float(row.total_revenue) if row.total_revenue else 0
+        } for row in rows]
+
+    @staticmethod
+    def get_revenue_by_category(start_day: date) -> List[dict]:
+        """Paid revenue per category since start_day."""
+        v = mv_category_revenue_by_day
+        rows = db.session.execute(
+            db.select(v.c.category_name, func.sum(v.c.revenue).label('revenue'))
+            .where(v.c.day >= start_day)
+            .group_by(v.c.category_name)
+        ).all()
+        return [{
+            'category': row.category_name,
+            'revenue': float(row.revenue) if row.revenue else 0
+        } for row in rows]
+
+
+def _refresh_in_background(app, min_age: float) -> None:
+    with app.app_context():
+        try:
+            AnalyticsViewService.refresh(min_age=min_age)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f'Analytics view refresh failed: {e}')
+
+
+def _refresh_loop(app, interval: float) -> None:
+    while True:
+        socketio.sleep(interval)
+        with app.app_context():
+            if AnalyticsViewService.backend() != 'matview':
+                continue
+        # Slightly under the interval so the loop never skips a beat
+        _refresh_in_background(app, interval * 0.9)
+
+
+def init_analytics_views(app) -> None:
+    """Start the scheduled view refresh (PostgreSQL only, not in tests)."""
+    interval = app.config.get('ANALYTICS_VIEW_REFRESH_INTERVAL', 0)
+    if app.testing or interval <= 0:
+        return
+    if not app.config.get('SQLALCHEMY_DATABASE_URI', '').startswith('postgres'):
+        return
+    socketio.start_background_task(_refresh_loop, app, interval)
@@ -0,0 +1,157 @@
+"""
+Attribute Service - Typed product attributes and specification filters
+
+Filters compile to `products.id IN (SELECT product_id FROM
+product_attribute_values WHERE attribute_id = ? AND value_* ...)`, one per
+attribute, which the (attribute_id, value_*, product_id) indexes answer
+with a range scan.
+"""
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List
+from sqlalchemy import select
+from ..extensions import db
+from ..models import Product, AttributeDefinition, ProductAttributeValue
+from .product_detail_service import ProductDetailService
+
+_TRUE = ('1', 'true', 'yes', 'on')
+_FALSE = ('0', 'false', 'no', 'off')
+
+
+def _coerce(definition: AttributeDefinition, value) -> Any:
+    """Convert a raw value to the definition's type (ValueError if invalid)."""
+    if definition.type == 'numeric':
+        try:
+            return Decimal(str(value))
+        except (InvalidOperation, ValueError):
+            raise ValueError(f'{definition.code}: expected a number, got {value!r}')
+    if definition.type == 'boolean':
+        if isinstance(value, bool):
+            return value
+        text = str(value).strip().lower()
+        if text in _TRUE:
+            return True
+        if text in _FALSE:
+            return False
+        raise ValueError(f'{definition.code}: expected a boolean, got {value!r}')
+    text = str(value)
+    if definition.options and text not in definition.options:
+        raise ValueError(f'{definition.code}: {text!r} is not one of {", ".join(definition.options)}')
+    return text
+
+
+def _value_column(definition: AttributeDefinition):
+    return {
+        'numeric': ProductAttributeValue.value_numeric,
+        'enum': ProductAttributeValue.value_enum,
+        'boolean': ProductAttributeValue.value_bool,
+    }[definition.type]
+
+
+class AttributeService:
+    """Attribute definitions, product values and specification filters."""
+
+    @staticmethod
+    def get_definitions() -> List[AttributeDefinition]:
+        """All attribute definitions in display order."""
+        return AttributeDefinition.query.order_by(AttributeDefinition.sort_order, AttributeDefinition.name).all()
+
+    @staticmethod
+    def create_definition(data: Dict[str, Any]) -> AttributeDefinition:
+        """
+        Create an attribute definition.
+
+        Raises:
+            ValueError: On duplicate code, unknown type or enum without options
+        """
+        if data.get('type') not in AttributeDefinition.TYPES:
+            raise ValueError(f'Unsupported attribute type. Use one of: {", ".join(AttributeDefinition.TYPES)}')
+        if data['type'] == 'enum' and not data.get('options'):
+            raise ValueError('Enum attributes need options')
+        if AttributeDefinition.query.filter_by(code=data['code']).first():
+            raise ValueError('Attribute with this code already exists')
+
+        definition = AttributeDefinition(**data)
+        db.session.add(definition)
+        db.session.commit()
+        return definition
+
+    @staticmethod
+    def _definitions(codes) -> Dict[str, AttributeDefinition]:
+        """Definitions by code (one query); ValueError on unknown codes."""
+        codes = set(codes)
+        found = {d.code: d for d in AttributeDefinition.query.filter(AttributeDefinition.code.in_(codes))}
+        missing = codes - set(found)
+        if missing:
+            raise ValueError(f'Unknown attribute: {", ".join(sorted(missing))}')
+        return found
+
+    @staticmethod
+    def set_product_values(product_id: int, values: Dict[str, Any]) -> Product:
+        """
+        Set typed attribute values of a product; None removes a value.
+
+        Args:
+            product_id: Product ID
+            values: attribute code -> value
+
+        Raises:
+            ValueError: If the product or an attribute is unknown, or a value has the wrong type
+        """
+        product = db.session.get(Product, product_id)
+        if not product:
+            raise ValueError('Product not found')
+
+        definitions = AttributeService._definitions(values)
+        existing = {v.attribute_id: v for v in product.attribute_values}
+        for code, raw in values.items():
+            definition = definitions[code]
+            row = existing.get(definition.id)
+            if raw is None:
+                if row is not None:
+                    product.attribute_values.remove(row)
+                continue
+            if row is None:
+                row = ProductAttributeValue(attribute_id=definition.id, attribute=definition)
+                product.attribute_values.append(row)
+            row.value_numeric = row.value_enum = row.value_bool = None
+            setattr(row, _value_column(definition).key, _coerce(definition, raw))
+
+        db.session.commit()
+        ProductDetailService.invalidate([product.id], [product.slug])
+        return product
+
+    @staticmethod
+    def filter_clauses(filters: Dict[str, Dict[str, Any]]) -> list:
+        """
+        Compile specification filters to SQL criteria on Product.
+
+        Args:
+            filters: code -> {'eq': [values]} (any of) and/or {'min': x, 'max': y}
+                (inclusive, numeric only)
+
+        Returns:
+            List of criteria to AND into a Product query
+
+        Raises:
+            ValueError: On unknown attributes, bad values or ranges on non-numeric attributes
+        """
+        if not filters:
+            return []
+        definitions = AttributeService._definitions(filters)
+        clauses = []
+        for code, spec in filters.items():
+            definition = definitions[code]
+            column = _value_column(definition)
+            conditions = [ProductAttributeValue.attribute_id == definition.id]
+
+            if spec.get('eq'):
+                conditions.append(column.in_([_coerce(definition, v) for v in spec['eq']]))
+            for bound, op in (('min', column.__ge__), ('max', column.__le__)):
+                if spec.get(bound) is None:
+                    continue
+                if definition.type != 'numeric':
+                    raise ValueError(f'{code}: range filters need a numeric attribute')
+                conditions.append(op(_coerce(definition, spec[bound])))
+
+            clauses.append(Product.id.in_(select(ProductAttributeValue.product_id).where(*conditions)))
+        return clauses
@@ -0,0 +1,184 @@
+"""
+Customer Analytics Service - Customer summaries and monthly cohorts
+
+Both tables are rebuilt from one grouped SQL pass over orders, aggregated
+per (customer, local month) and streamed in customer order, so memory use
+is bounded by a single customer's history plus one insert chunk.
+"""
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from ..extensions import db
+from ..models import Order, CustomerSummary, CustomerCohort
+from ..utils.time_buckets import make_buckets, bucket_index
+
+SORT_COLUMNS = {
+    'total_spent': CustomerSummary.total_spent,
+    'order_count': CustomerSummary.order_count,
+    'last_order_at': CustomerSummary.last_order_at,
+    'first_order_at': CustomerSummary.first_order_at,
+}
+
+
+class CustomerAnalyticsService:
+    """Batch customer lifetime value and cohort analytics."""
+
+    @staticmethod
+    def rebuild(chunk_size: int = 1000) -> Dict[str, int]:
+        """
+        Recompute customer_summaries and customer_cohorts from orders.
+
+        Runs in one transaction, so readers see either the old or the new
+        tables.
+
+        Args:
+            chunk_size: Rows fetched and inserted per batch
+
+        Returns:
+            Dict with the number of customers and cohort cells written
+        """
+        computed_at = datetime.utcnow()
+        live = Order.status != 'cancelled'
+
+        db.session.execute(CustomerSummary.__table__.delete())
+        db.session.execute(CustomerCohort.__table__.delete())
+
+        first, last = db.session.query(func.min(Order.created_at), func.max(Order.created_at))\
+            .filter(live).one()
+        if first is None:
+            db.session.commit()
+            return {'customers': 0, 'cohorts': 0}
+
+        months = make_buckets(first, last, 'month')
+        dialect = db.session.get_bind().dialect.name
+        paid = Order.payment_status == 'paid'
+
+        orders = db.session.query(
+            Order.user_id,
+            bucket_index(Order.created_at, months, dialect).label('month'),
+            Order.id,
+            Order.created_at,
+            Order.total,
+            paid.label('paid')
+        ).filter(live).subquery()
+
+        grouped = db.session.query(
+            orders.c.user_id,
+            orders.c.month,
+            func.count(orders.c.id).label('orders'),
+            func.count(orders.c.id).filter(orders.c.paid).label('paid_orders'),
+            func.coalesce(func.sum(orders.c.total).filter(orders.c.paid), 0).label('revenue'),
+            func.min(orders.c.created_at).label('first_at'),
+            func.max(orders.c.created_at).label('last_at')
+        ).group_by(orders.c.user_id, orders.c.month)\
+         .order_by(orders.c.user_id, orders.c.month)
+
+        cohorts: Dict[tuple, list] = defaultdict(lambda: [0, 0, Decimal('0')])
+        pending: List[dict] = []
+        customers = 0
+        current: Optional[dict] = None
+        cohort = 0
+
+        def flush(force=False):
+            if pending and (force or len(pending) >= chunk_size):
+                db.session.execute(CustomerSummary.__table__.insert(), pending)
+                pending.clear()
+
+        rows = db.session.execute(grouped.statement, execution_options={'yield_per': chunk_size})
+        for row in rows:
+            if current is None or current['user_id'] != row.user_id:
+                if current is not None:
+                    pending.append(current)
+                    customers += 1
+                    flush()
+                # Rows arrive month-ascending, so the first one is the cohort
+                current = {
+                    'user_id': row.user_id,
+                    'order_count': 0,
+                    'paid_order_count': 0,
+                    'total_spent': Decimal('0'),
+                    'first_order_at': row.first_at,
+                    'last_order_at': row.last_at,
+                    'cohort_month': months[row.month].label,
+                    'computed_at': computed_at,
+                }
+                cohort = row.month
+            revenue = Decimal(str(row.revenue or 0))
+            current['order_count'] += row.orders
+            current['paid_order_count'] += row.paid_orders
+            current['total_spent'] += revenue
+            current['last_order_at'] = row.last_at
+
+            cell = cohorts[(cohort, row.month - cohort)]
+            cell[0] += 1
+            cell[1] += row.orders
+            cell[2] += revenue
+
+        if current is not None:
+            pending.append(current)
+            customers += 1
+        flush(force=True)
+
+        if cohorts:
+            db.session.execute(CustomerCohort.__table__.insert(), [
+                {
+                    'cohort_month': months[cohort_index].label,
+                    'period': period,
+                    'customers': cell[0],
+                    'orders': cell[1],
+                    'revenue': cell[2],
+                }
+                for (cohort_index, period), cell in sorted(cohorts.items())
+            ])
+
+        db.session.commit()
+        return {'customers': customers, 'cohorts': len(cohorts)}
+
+    @staticmethod
+    def get_customers(page: int = 1, per_page: int = 20, sort: str = 'total_spent',
+                      cohort_month=None):
+        """
+        Page through customer summaries.
+
+        Args:
+            page: Page number
+            per_page: Items per page
+            sort: One of SORT_COLUMNS (descending)
+            cohort_month: Optional cohort (first day of month) filter
+
+        Returns:
+            Flask-SQLAlchemy pagination of CustomerSummary
+
+        Raises:
+            ValueError: On unknown sort key
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f'Unsupported sort: {sort}. Use one of: {", ".join(SORT_COLUMNS)}')
+
+        query = CustomerSummary.query.options(joinedload(CustomerSummary.user))
+        if cohort_month:
+            query = query.filter(CustomerSummary.cohort_month == cohort_month)
+        query = query.order_by(SORT_COLUMNS[sort].desc(), CustomerSummary.user_id)
+        return query.paginate(page=page, per_page=per_page, error_out=False)
+
+    @staticmethod
+    def get_cohorts() -> List[Dict[str, Any]]:
+        """
+        Monthly cohort matrix.
+
+        Returns:
+            List of {'cohort_month', 'customers', 'periods'} ordered by cohort;
+            customers is the cohort size (period 0)
+        """
+        result: List[Dict[str, Any]] = []
+        for cell in CustomerCohort.query.order_by(CustomerCohort.cohort_month, CustomerCohort.period):
+            cohort_month = cell.cohort_month.isoformat()
+            if not result or result[-1]['cohort_month'] != cohort_month:
+                result.append({'cohort_month': cohort_month, 'customers': 0, 'periods': []})
+            if cell.period == 0:
+                result[-1]['customers'] = cell.customers
+            result[-1]['periods'].append(cell.to_dict())
+        return result
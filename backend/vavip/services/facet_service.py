@@ -0,0 +1,159 @@
+"""
+Facet Service - Catalog facet filtering and counts from in-memory posting lists
+
+Each worker keeps one FacetIndex (see utils/facets.py) built from two
+queries (active products, their attributes). Product writes swap in an
+updated copy of the local index (readers never see it change under them)
+and bump the Redis key `facets:version`; other
+workers notice the bump (checked at most every FACET_VERSION_CHECK_INTERVAL
+seconds) and rebuild. Without Redis each worker only sees its own writes
+until FACET_MAX_AGE forces a rebuild.
+"""
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+import redis
+from flask import current_app
+from ..extensions import db, get_redis
+from ..models import Product
+from ..models.product import ProductAttribute
+from ..utils.facets import FacetIndex, CATEGORY, PRICE, ATTRIBUTE_PREFIX, bitmap_ids, price_bounds_from_config
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'facets:version'
+
+_lock = threading.Lock()
+_state = {'index': None, 'version': None, 'built_at': 0.0, 'checked_at': 0.0}
+
+
+def _remote_version() -> Optional[int]:
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        return int(client.get(VERSION_KEY) or 0)
+    except (redis.ConnectionError, redis.TimeoutError) as e:
+        logger.warning(f'Facet version check failed: {e}')
+        return None
+
+
+def _load(index: FacetIndex, product_ids: Optional[List[int]] = None) -> None:
+    """Index active products (all, or only the given ids) in two queries."""
+    products = db.session.query(Product.id, Product.category_id, Product.price)\
+        .filter(Product.is_active.is_(True))
+    attributes = db.session.query(ProductAttribute.product_id, ProductAttribute.name, ProductAttribute.value)\
+        .join(Product, Product.id == ProductAttribute.product_id)\
+        .filter(Product.is_active.is_(True))
+    if product_ids is not None:
+        products = products.filter(Product.id.in_(product_ids))
+        attributes = attributes.filter(ProductAttribute.product_id.in_(product_ids))
+
+    by_product: Dict[int, list] = {}
+    for product_id, name, value in attributes:
+        by_product.setdefault(product_id, []).append((name, value))
+    for product_id, category_id, price in products:
+        index.add(product_id, category_id, price, by_product.get(product_id, ()))
+
+
+class FacetService:
+    """Facet filtering and counts for the storefront catalog."""
+
+    @staticmethod
+    def get_index() -> FacetIndex:
+        """The current index, rebuilt when missing, stale or outdated by another worker."""
+        config = current_app.config
+        now = time.monotonic()
+        index = _state['index']
+
+        if index is not None and now - _state['checked_at'] >= config.get('FACET_VERSION_CHECK_INTERVAL', 1.0):
+            _state['checked_at'] = now
+            version = _remote_version()
+            if version is not None and version != _state['version']:
+                index = None
+        if index is not None and now - _state['built_at'] >= config.get('FACET_MAX_AGE', 600):
+            index = None
+
+        if index is None:
+            index = FacetService.rebuild()
+        return index
+
+    @staticmethod
+    def rebuild() -> FacetIndex:
+        """Build a fresh index from the database and swap it in."""
+        with _lock:
+            version = _remote_version()
+            index = FacetIndex(price_bounds_from_config(current_app.config.get('FACET_PRICE_BOUNDS', '')))
+            _load(index)
+            now = time.monotonic()
+            _state.update(index=index, version=version, built_at=now, checked_at=now)
+        return index
+
+    @staticmethod
+    def products_changed(product_ids: Iterable[int]) -> None:
+        """
+        Reindex products after a write (call after commit).
+
+        Swaps in an updated copy of this worker's index and bumps the shared
+        version so other workers rebuild.
+        """
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+
+        with _lock:
+            # Readers use the current index without the lock: change a copy and swap it in
+            index = _state['index']
+            if index is not None:
+                index = index.copy()
+                for product_id in product_ids:
+                    index.remove(product_id)
+                _load(index, product_ids)
+                _state['index'] = index
+
+            client = get_redis()
+            if client is None:
+                return
+            try:
+                version = client.incr(VERSION_KEY)
+            except (redis.ConnectionError, redis.TimeoutError) as e:
+                logger.warning(f'Facet version bump failed: {e}')
+                return
+            # Keep our own bump from forcing a rebuild, unless we were already behind
+            if _state['version'] is not None and version == _state['version'] + 1:
+                _state['version'] = version
+
+    @staticmethod
+    def make_filters(category_ids: Optional[Iterable[int]] = None, price_buckets: Optional[List[str]] = None,
+                     attributes: Optional[Dict[str, List[str]]] = None) -> Dict[str, List[str]]:
+        """Facet selections in FacetIndex form (category_ids: a category subtree, any of)."""
+        filters: Dict[str, List[str]] = {}
+        if category_ids is not None:
+            filters[CATEGORY] = [str(category_id) for category_id in category_ids]
+        if price_buckets:
+            filters[PRICE] = list(price_buckets)
+        for name, values in (attributes or {}).items():
+            if values:
+                filters[ATTRIBUTE_PREFIX + name] = list(values)
+        return filters
+
+    @staticmethod
+    def matching_ids(filters: Dict[str, List[str]]) -> List[int]:
+        """Ids of active products matching the facet selections."""
+        return bitmap_ids(FacetService.get_index().matching(filters))
+
+    @staticmethod
+    def facet_counts(filters: Dict[str, List[str]]) -> Dict[str, Dict[str, int]]:
+        """
+        Counts per category, price bucket and attribute value.
+
+        Returns:
+            {'categories': {id: n}, 'price': {bucket: n}, 'attributes': {name: {value: n}}}
+        """
+        counts = FacetService.get_index().counts(filters)
+        return {
+            'categories': counts.pop(CATEGORY, {}),
+            'price': counts.pop(PRICE, {}),
+            'attributes': {group[len(ATTRIBUTE_PREFIX):]: values for group, values in counts.items()}
+        }
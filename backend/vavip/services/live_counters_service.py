@@ -0,0 +1,184 @@
+"""
+Live Counters Service - Real-time dashboard counters
+
+Orders today, revenue today, pending orders and unread feedback are kept in
+Redis hashes and adjusted on order and feedback events; every change is
+pushed to the `admins` Socket.IO room as a delta, so the dashboard does not
+poll aggregate queries.
+
+Hashes:
+    dashboard:live:<local date>  orders, revenue_kopecks (expire after 2 days)
+    dashboard:live               pending_orders, unread_feedback
+
+A hash without the `seeded` field (new day, Redis restart) is rebuilt from
+the database on the next read; events committed while it is being rebuilt
+may be counted twice or missed until the next rebuild.
+"""
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Optional
+import redis
+from sqlalchemy import func
+from ..extensions import db, get_redis
+from ..models import Order, Feedback
+from ..utils.time_buckets import local_date, make_buckets
+
+logger = logging.getLogger(__name__)
+
+DAY_KEY = 'dashboard:live:{day}'
+GLOBAL_KEY = 'dashboard:live'
+DAY_TTL = 2 * 86400
+
+
+def _kopecks(amount) -> int:
+    return int((Decimal(str(amount or 0)) * 100).to_integral_value())
+
+
+class LiveCountersService:
+    """Redis-backed dashboard counters with Socket.IO delta pushes."""
+
+    @staticmethod
+    def order_created(order: Order) -> None:
+        """Count a newly created order."""
+        LiveCountersService._apply(
+            day=local_date(order.created_at),
+            orders=1,
+            pending=1 if order.status == 'pending' else 0
+        )
+
+    @staticmethod
+    def order_status_changed(old_status: str, new_status: str) -> None:
+        """Track orders entering or leaving the pending status."""
+        pending = (new_status == 'pending') - (old_status == 'pending')
+        if pending:
+            LiveCountersService._apply(pending=pending)
+
+    @staticmethod
+    def order_payment_changed(order: Order, is_paid: bool) -> None:
+        """Add (or remove) a paid order's total to the revenue of its day."""
+        amount = _kopecks(order.total)
+        LiveCountersService._apply(
+            day=local_date(order.created_at),
+            revenue_kopecks=amount if is_paid else -amount
+        )
+
+    @staticmethod
+    def unread_feedback_changed(delta: int) -> None:
+        """Adjust the unread feedback counter (+1 new/unread, -1 read/deleted)."""
+        if delta:
+            LiveCountersService._apply(unread=delta)
+
+    @staticmethod
+    def get_counters() -> Dict[str, float]:
+        """
+        Current counter values.
+
+        Returns:
+            Dict with orders_today, revenue_today, pending_orders and
+            unread_feedback; read from Redis, seeded from the database when a
+            hash is missing (or computed from the database without Redis)
+        """
+        day = local_date()
+        client = get_redis()
+        if client is None:
+            return LiveCountersService._count_from_db()
+
+        day_key = DAY_KEY.format(day=day.isoformat())
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.hgetall(day_key)
+            pipe.hgetall(GLOBAL_KEY)
+            day_hash, global_hash = pipe.execute()
+
+            if not day_hash.get('seeded') or not global_hash.get('seeded'):
+                counters = LiveCountersService._count_from_db()
+                pipe = client.pipeline(transaction=False)
+                pipe.hset(day_key, mapping={
+                    'orders': counters['orders_today'],
+                    'revenue_kopecks': _kopecks(counters['revenue_today']),
+                    'seeded': 1
+                })
+                pipe.expire(day_key, DAY_TTL)
+                pipe.hset(GLOBAL_KEY, mapping={
+                    'pending_orders': counters['pending_orders'],
+                    'unread_feedback': counters['unread_feedback'],
+                    'seeded': 1
+                })
+                pipe.execute()
+                return counters
+        except (redis.ConnectionError, redis.TimeoutError) as e:
+            logger.warning(f'Live counters unavailable, falling back to SQL: {e}')
+            return LiveCountersService._count_from_db()
+
+        return {
+            'orders_today': int(day_hash.get('orders', 0)),
+            'revenue_today': int(day_hash.get('revenue_kopecks', 0)) / 100,
+            'pending_orders': int(global_hash.get('pending_orders', 0)),
+            'unread_feedback': int(global_hash.get('unread_feedback', 0))
+        }
+
+    @staticmethod
+    def _count_from_db() -> Dict[str, float]:
+        """Compute all counters in one query (today = local calendar day)."""
+        now = datetime.utcnow()
+        today = make_buckets(now, now, 'day')[0]
+        in_today = (Order.created_at >= today.start, Order.created_at < today.end)
+
+        orders = db.session.query(
+            func.count(Order.id).filter(*in_today).label('today'),
+            func.sum(Order.total).filter(Order.payment_status == 'paid', *in_today).label('revenue'),
+            func.count(Order.id).filter(Order.status == 'pending').label('pending')
+        ).subquery()
+        feedback = db.session.query(
+            func.count(Feedback.id).filter(Feedback.is_read.is_(False)).label('unread')
+        ).subquery()
+
+        row = db.session.query(
+            orders.c.today, orders.c.revenue, orders.c.pending, feedback.c.unread
+        ).select_from(orders).join(feedback, db.true()).one()
+
+        return {
+            'orders_today': row.today,
+            'revenue_today': float(row.revenue or 0),
+            'pending_orders': row.pending,
+            'unread_feedback': row.unread
+        }
+
+    @staticmethod
+    def _apply(day: Optional[date] = None, orders: int = 0, revenue_kopecks: int = 0,
+               pending: int = 0, unread: int = 0) -> None:
+        """Increment the Redis hashes and push the delta to admins."""
+        client = get_redis()
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                if day and (orders or revenue_kopecks):
+                    day_key = DAY_KEY.format(day=day.isoformat())
+                    if orders:
+                        pipe.hincrby(day_key, 'orders', orders)
+                    if revenue_kopecks:
+                        pipe.hincrby(day_key, 'revenue_kopecks', revenue_kopecks)
+                    pipe.expire(day_key, DAY_TTL)
+                if pending:
+                    pipe.hincrby(GLOBAL_KEY, 'pending_orders', pending)
+                if unread:
+                    pipe.hincrby(GLOBAL_KEY, 'unread_feedback', unread)
+                pipe.execute()
+            except (redis.ConnectionError, redis.TimeoutError) as e:
+                logger.warning(f'Failed to update live counters: {e}')
+
+        # Only today's bucket is shown; changes to past days are not pushed
+        delta = {}
+        if day == local_date():
+            if orders:
+                delta['orders_today'] = orders
+            if revenue_kopecks:
+                delta['revenue_today'] = revenue_kopecks / 100
+        if pending:
+            delta['pending_orders'] = pending
+        if unread:
+            delta['unread_feedback'] = unread
+        if delta:
+            from ..api.websocket import emit_to_admins
+            emit_to_admins('dashboard_counters_delta', {'date': local_date().isoformat(), 'delta': delta})
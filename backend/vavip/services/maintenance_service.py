@@ -0,0 +1,85 @@
+"""
+Maintenance Service - Housekeeping for short-lived auth artefacts
+"""
+from datetime import datetime
+from typing import Optional, Dict, Any, Iterable
+from sqlalchemy import or_, func
+from ..extensions import db
+from ..models import PhoneOTP
+
+
+class MaintenanceService:
+    """Periodic cleanup and storage reporting."""
+    
+    @staticmethod
+    def purge_otps(
+        batch_size: int = 1000,
+        max_batches: Optional[int] = None,
+        now: Optional[datetime] = None
+    ) -> int:
+        """
+        Delete expired or already used OTP codes in bounded batches.
+        
+        Each batch is committed separately, so the job never holds long
+        locks on `phone_otps` while `otp_send`/`otp_verify` are running.
+        
+        Args:
+            batch_size: Maximum rows deleted per transaction
+            max_batches: Stop after this many batches (None = until done)
+            now: Reference time for expiry (defaults to utcnow)
+            
+        Returns:
+            Total number of deleted rows
+        """
+        now = now or datetime.utcnow()
+        stale = or_(PhoneOTP.expires_at <= now, PhoneOTP.used_at.isnot(None))
+        
+        deleted = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            ids = [row.id for row in db.session.query(PhoneOTP.id)
+                   .filter(stale).order_by(PhoneOTP.id).limit(batch_size).all()]
+            if not ids:
+                break
+            
+            deleted += PhoneOTP.query.filter(PhoneOTP.id.in_(ids))\
+                .delete(synchronize_session=False)
+            db.session.commit()
+            batches += 1
+            
+            if len(ids) < batch_size:
+                break
+        
+        return deleted
+    
+    @staticmethod
+    def get_table_sizes(tables: Iterable[str] = ('phone_otps',)) -> Dict[str, Dict[str, Any]]:
+        """
+        Report row counts (and on-disk size on PostgreSQL) for tables.
+        
+        Args:
+            tables: Table names to inspect
+            
+        Returns:
+            Mapping of table name to {'rows': int, 'total_bytes': int | None}
+        """
+        is_postgres = db.engine.dialect.name == 'postgresql'
+        metadata_tables = db.metadata.tables
+        
+        sizes = {}
+        for name in tables:
+            table = metadata_tables.get(name)
+            if table is None:
+                continue
+            
+            rows = db.session.query(func.count()).select_from(table).scalar() or 0
+            total_bytes = None
+            if is_postgres:
+                total_bytes = db.session.execute(
+                    db.text('SELECT pg_total_relation_size(CAST(:name AS regclass))'),
+                    {'name': name}
+                ).scalar()
+            
+            sizes[name] = {'rows': rows, 'total_bytes': total_bytes}
+        
+        return sizes
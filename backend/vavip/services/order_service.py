@@ -3,8 +3,13 @@ Order Service
 """
 import uuid
 from datetime import datetime
+from sqlalchemy.orm import selectinload
 from ..extensions import db
 from ..models import Order, OrderItem, Product
+from .sales_rollup_service import SalesRollupService
+from .analytics_view_service import AnalyticsViewService
+from .live_counters_service import LiveCountersService
+from .sketch_service import SketchService
 
 
 class OrderService:
@@ -80,7 +85,7 @@ class OrderService:
         
         for item_data in validated_items:
             product = item_data['product']
-            main_image = product.images.filter_by(is_main=True).first()
+            main_image = product.main_image
             
             order_item = OrderItem(
                 order_id=order.id,
@@ -95,6 +100,7 @@ class OrderService:
             db.session.add(order_item)
         
         db.session.commit()
+        LiveCountersService.order_created(order)
         return order
     
     @staticmethod
@@ -104,6 +110,7 @@ class OrderService:
         if not order:
             raise ValueError('Order not found')
         
+        old_status = order.status
         order.status = status
         
         if status == 'shipped':
@@ -112,6 +119,7 @@ class OrderService:
             order.delivered_at = datetime.utcnow()
         
         db.session.commit()
+        LiveCountersService.order_status_changed(old_status, status)
         return order
     
     @staticmethod
@@ -121,11 +129,23 @@ class OrderService:
         if not order:
             raise ValueError('Order not found')
         
+        was_paid = order.payment_status == 'paid'
         order.payment_status = payment_status
         if payment_status == 'paid':
             order.paid_at = datetime.utcnow()
         
+        # Keep the daily sales rollup in the same transaction
+        is_paid = payment_status == 'paid'
+        if was_paid != is_paid:
+            SalesRollupService.apply_order(order, sign=1 if is_paid else -1)
+        
         db.session.commit()
+        
+        if was_paid != is_paid:
+            AnalyticsViewService.request_refresh()
+            LiveCountersService.order_payment_changed(order, is_paid)
+            if is_paid:
+                SketchService.record_order_paid(order)
         return order
     
     @staticmethod
@@ -138,14 +158,17 @@ class OrderService:
         if order.status not in ['pending', 'confirmed']:
             raise ValueError('Cannot cancel order in current status')
         
+        old_status = order.status
         order.status = 'cancelled'
         db.session.commit()
+        LiveCountersService.order_status_changed(old_status, order.status)
         return order
     
     @staticmethod
     def get_user_orders(user_id):
         """Get all orders for a user."""
-        return Order.query.filter_by(user_id=user_id).order_by(Order.created_at.desc()).all()
+        return Order.query.filter_by(user_id=user_id).options(selectinload(Order.items))\
+            .order_by(Order.created_at.desc()).all()
 
 
 
@@ -0,0 +1,109 @@
+"""
+Product Detail Service - Cached product page payloads
+
+GET /api/products/<slug> and /<id> serve Product.to_dict(include_details=True).
+The serialized payload is stored in Redis twice, under
+`cache:product_detail:slug:<slug>` and `cache:product_detail:id:<id>`, so
+either lookup is one GET. Payloads are filled from the primary (a lagging
+replica could re-cache the old payload right after an invalidation) and
+live for PRODUCT_DETAIL_CACHE_TTL seconds at most.
+
+Writes invalidate precisely through ProductDetailService.invalidate (the
+product's id plus its old and new slugs); category updates drop every
+payload, since payloads embed the category.
+"""
+import json
+import logging
+from typing import Any, Dict, Iterable, Optional
+import redis
+from flask import current_app
+from sqlalchemy.orm import selectinload
+from ..extensions import get_redis
+from ..models import Product
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'product_detail'
+
+
+def _key(kind: str, value) -> str:
+    return f'cache:{PREFIX}:{kind}:{value}'
+
+
+class ProductDetailService:
+    """Product detail payloads with a write-invalidated Redis cache."""
+
+    @staticmethod
+    def get_by_slug(slug: str) -> Optional[Dict[str, Any]]:
+        """Detail payload of the product with this slug (active or not), or None."""
+        return ProductDetailService._get(_key('slug', slug), Product.slug == slug)
+
+    @staticmethod
+    def get_by_id(product_id: int) -> Optional[Dict[str, Any]]:
+        """Detail payload of the product with this id (active or not), or None."""
+        return ProductDetailService._get(_key('id', product_id), Product.id == product_id)
+
+    @staticmethod
+    def _get(key: str, criterion) -> Optional[Dict[str, Any]]:
+        client = get_redis()
+        if client is not None:
+            try:
+                cached = client.get(key)
+            except (redis.ConnectionError, redis.TimeoutError) as e:
+                logger.warning(f'Product detail cache read failed: {e}')
+                client = None
+            else:
+                if cached:
+                    return json.loads(cached)
+
+        payload = ProductDetailService._load(criterion)
+        if payload is not None and client is not None:
+            ProductDetailService._store(client, payload)
+        return payload
+
+    @staticmethod
+    def _load(criterion) -> Optional[Dict[str, Any]]:
+        """Load and serialize one product (one query per relationship, no row explosion)."""
+        product = Product.query.options(
+            selectinload(Product.category),
+            selectinload(Product.images),
+            selectinload(Product.attributes),
+            selectinload(Product.attribute_values)
+        ).filter(criterion).first()
+        return product.to_dict(include_details=True) if product else None
+
+    @staticmethod
+    def _store(client, payload: Dict[str, Any]) -> None:
+        ttl = current_app.config.get('PRODUCT_DETAIL_CACHE_TTL', 600)
+        raw = json.dumps(payload, default=str)
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.setex(_key('id', payload['id']), ttl, raw)
+            pipe.setex(_key('slug', payload['slug']), ttl, raw)
+            pipe.execute()
+        except (redis.ConnectionError, redis.TimeoutError) as e:
+            logger.warning(f'Product detail cache write failed: {e}')
+
+    @staticmethod
+    def invalidate(product_ids: Iterable[int] = (), slugs: Iterable[str] = ()) -> None:
+        """
+        Drop cached payloads (call after commit).
+
+        Args:
+            product_ids: Changed products
+            slugs: Their slugs, including the previous slug of a renamed product
+        """
+        keys = [_key('id', pid) for pid in product_ids] + [_key('slug', slug) for slug in slugs if slug]
+        client = get_redis()
+        if not keys or client is None:
+            return
+        try:
+            client.delete(*keys)
+        except (redis.ConnectionError, redis.TimeoutError) as e:
+            logger.warning(f'Product detail cache invalidation failed: {e}')
+
+    @staticmethod
+    def invalidate_all() -> None:
+        """Drop every cached payload (after category changes; SCANs the prefix, never KEYS)."""
+        from ..utils.cache import invalidate_cache
+        invalidate_cache(PREFIX)
@@ -0,0 +1,500 @@
+"""
+Product Import Service - Bulk catalog upsert keyed by SKU
+
+Input rows (CSV or NDJSON, see iter_rows) are validated one by one and
+written in chunks of IMPORT_CHUNK_SIZE rows, one transaction per chunk:
+
+- products: INSERT ... ON CONFLICT (sku) DO UPDATE, executed as one
+  batched statement per set of provided columns (absent fields are left
+  unchanged on existing products)
+- images / attributes: diffed against the stored rows of the whole chunk
+  in one SELECT each, then one DELETE, one INSERT and one UPDATE batch
+
+Invalid rows are skipped and reported with their line number; a chunk the
+database rejects is rolled back and all of its rows are reported.
+"""
+import csv
+import io
+import json
+import logging
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+from flask import current_app
+from sqlalchemy import bindparam, select
+from sqlalchemy.exc import SQLAlchemyError
+from ..extensions import db
+from ..models import Product
+from ..models.product import ProductImage, ProductAttribute
+from ..utils.cache import invalidate_cache
+from .facet_service import FacetService
+from .product_detail_service import ProductDetailService
+from .product_service import CategoryService
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'ndjson')
+# Needed to create a product that does not exist yet
+REQUIRED_FOR_INSERT = ('name', 'slug', 'price')
+_TRUE = ('1', 'true', 'yes', 'on')
+_FALSE = ('0', 'false', 'no', 'off')
+
+
+def _text(max_length: int, nullable: bool = False):
+    def convert(value):
+        if value is None and nullable:
+            return None
+        if not isinstance(value, str):
+            raise ValueError('Not a valid string.')
+        value = value.strip()
+        if not value and not nullable:
+            raise ValueError('Must not be empty.')
+        if len(value) > max_length:
+            raise ValueError(f'Longer than maximum length {max_length}.')
+        return value or None
+    return convert
+
+
+def _amount(nullable: bool = False):
+    def convert(value):
+        if value is None and nullable:
+            return None
+        try:
+            amount = Decimal(str(value).strip())
+        except InvalidOperation:
+            raise ValueError('Not a valid number.')
+        if not amount.is_finite() or amount < 0:
+            raise ValueError('Must be a non-negative number.')
+        return amount
+    return convert
+
+
+def _integer(value):
+    if isinstance(value, bool):
+        raise ValueError('Not a valid integer.')
+    try:
+        number = int(str(value).strip())
+    except ValueError:
+        raise ValueError('Not a valid integer.')
+    return number
+
+
+def _count(value):
+    number = _integer(value)
+    if number < 0:
+        raise ValueError('Must be greater than or equal to 0.')
+    return number
+
+
+def _boolean(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise ValueError('Not a valid boolean.')
+
+
+def _images(value):
+    if not isinstance(value, list):
+        raise ValueError('Not a valid list.')
+    return [_text(500)(url) for url in value]
+
+
+def _attributes(value):
+    if not isinstance(value, dict):
+        raise ValueError('Not a valid mapping.')
+    return {_text(100)(name): _text(500)(str(v) if isinstance(v, (int, float)) else v) for name, v in value.items()}
+
+
+# Importable fields and their converters (mirroring CreateProductSchema);
+# a hand-rolled table because per-row schema loading dominated import time
+FIELDS = {
+    'sku': _text(50),
+    'name': _text(200),
+    'slug': _text(200),
+    'description': _text(100000, nullable=True),
+    'short_description': _text(500, nullable=True),
+    'price': _amount(),
+    'old_price': _amount(nullable=True),
+    'currency': _text(3),
+    'category': _text(100),  # Category slug, resolved through the tree snapshot
+    'category_id': _integer,
+    'stock_quantity': _count,
+    'is_active': _boolean,
+    'is_featured': _boolean,
+    'sort_order': _integer,
+    'images': _images,
+    'attributes': _attributes,
+}
+
+
+def coerce_row(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate and convert one raw import row.
+
+    Raises:
+        ValueError: With "field: message" parts for every invalid field
+    """
+    values, errors = {}, []
+    if raw.get('sku') is None:
+        errors.append('sku: SKU is required.')
+    for key, value in raw.items():
+        convert = FIELDS.get(key)
+        if convert is None:
+            errors.append(f'{key}: Unknown field.')
+            continue
+        try:
+            values[key] = convert(value)
+        except ValueError as e:
+            errors.append(f'{key}: {e}')
+    if errors:
+        raise ValueError('; '.join(errors))
+    return values
+
+
+def iter_rows(stream: IO[str], fmt: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Parse an import stream lazily.
+
+    CSV: one column per product field, `category` as a category slug,
+    `images` as URLs separated by "|" (first is the main image) and one
+    `attr.<name>` column per attribute. Empty cells are treated as absent.
+
+    NDJSON: one JSON object per line with the same fields, `images` as a
+    list and `attributes` as a name -> value object.
+
+    Yields:
+        (line number, raw row); unparseable NDJSON lines yield the error
+        message under the '_error' key
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            raw = {}
+            attributes = {}
+            for key, value in row.items():
+                if key is None or value is None or value == '':
+                    continue
+                key = key.strip()
+                if key.startswith('attr.'):
+                    attributes[key[len('attr.'):]] = value
+                elif key == 'images':
+                    raw['images'] = [url.strip() for url in value.split('|') if url.strip()]
+                else:
+                    raw[key] = value
+            if attributes:
+                raw['attributes'] = attributes
+            yield reader.line_num, raw
+    elif fmt == 'ndjson':
+        for line_num, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                raw = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_num, {'_error': f'Invalid JSON: {e.msg}'}
+                continue
+            if not isinstance(raw, dict):
+                raw = {'_error': 'Expected a JSON object'}
+            yield line_num, raw
+    else:
+        raise ValueError(f'Unsupported import format: {fmt}. Use one of: {", ".join(FORMATS)}')
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class ImportReport:
+    """Running totals of an import plus the first IMPORT_MAX_ERRORS row errors."""
+
+    def __init__(self, max_errors: int):
+        self.max_errors = max_errors
+        self.processed = self.inserted = self.updated = self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def error(self, line: int, sku: Optional[str], message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': line, 'sku': sku, 'error': message})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'processed': self.processed,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': sorted(self.errors, key=lambda error: error['row']),
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+class ProductImportService:
+    """Bulk product upserts for catalog sync."""
+
+    @staticmethod
+    def import_stream(stream: IO, fmt: str, chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Import a CSV or NDJSON stream (text or bytes).
+
+        Raises:
+            ValueError: On an unsupported format
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f'Unsupported import format: {fmt}. Use one of: {", ".join(FORMATS)}')
+        if not isinstance(stream, io.TextIOBase):
+            stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        return ProductImportService.import_rows(iter_rows(stream, fmt), chunk_size)
+
+    @staticmethod
+    def import_rows(rows: Iterable[Tuple[int, Dict[str, Any]]], chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Upsert products from (line number, raw row) pairs.
+
+        Args:
+            rows: Parsed rows, e.g. from iter_rows
+            chunk_size: Rows per transaction (default IMPORT_CHUNK_SIZE)
+
+        Returns:
+            Report: processed / inserted / updated / failed counts and row errors
+        """
+        config = current_app.config
+        chunk_size = chunk_size or config.get('IMPORT_CHUNK_SIZE', 1000)
+        report = ImportReport(config.get('IMPORT_MAX_ERRORS', 1000))
+
+        for chunk in _chunks(rows, chunk_size):
+            report.processed += len(chunk)
+            valid = ProductImportService._validate(chunk, report)
+            if not valid:
+                continue
+            accepted = valid
+            try:
+                accepted, existing, old_slugs = ProductImportService._check_conflicts(valid, report)
+                inserted, updated, product_ids = ProductImportService._write_chunk(accepted, existing)
+                db.session.commit()
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                logger.warning(f'Product import chunk failed: {e}')
+                message = f'Chunk rejected by the database: {e.__class__.__name__}'
+                for line, values in accepted:
+                    report.error(line, values['sku'], message)
+                continue
+            report.inserted += inserted
+            report.updated += updated
+            FacetService.products_changed(product_ids)
+            # New products have nothing cached; updated ones may have been renamed
+            ProductDetailService.invalidate(old_slugs, old_slugs.values())
+
+        if report.inserted or report.updated:
+            invalidate_cache('featured_products')
+        return report.to_dict()
+
+    @staticmethod
+    def _validate(chunk: List[Tuple[int, Dict]], report: ImportReport) -> List[Tuple[int, Dict[str, Any]]]:
+        """Validate rows and resolve category slugs; later duplicates of a SKU win."""
+        tree = CategoryService.get_tree()
+        by_sku: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        for line, raw in chunk:
+            sku = raw.get('sku') if isinstance(raw.get('sku'), str) else None
+            if '_error' in raw:
+                report.error(line, sku, raw['_error'])
+                continue
+            try:
+                values = coerce_row(raw)
+            except ValueError as e:
+                report.error(line, sku, str(e))
+                continue
+
+            category_slug = values.pop('category', None)
+            if category_slug is not None:
+                category_id = tree.resolve(category_slug)
+                if category_id is None:
+                    report.error(line, values['sku'], f'Unknown category: {category_slug}')
+                    continue
+                values['category_id'] = category_id
+            if values['sku'] in by_sku:
+                report.error(by_sku[values['sku']][0], values['sku'], 'Superseded by a later row with the same SKU')
+            by_sku[values['sku']] = (line, values)
+        return list(by_sku.values())
+
+    @staticmethod
+    def _check_conflicts(rows: List[Tuple[int, Dict[str, Any]]], report: ImportReport
+                         ) -> Tuple[List[Tuple[int, Dict[str, Any]]], Dict[str, int], Dict[int, str]]:
+        """
+        Drop rows that cannot be written: new products without the required
+        fields, slugs owned by another SKU.
+
+        Returns:
+            (accepted rows, sku -> id of the chunk's existing products, their id -> current slug)
+        """
+        skus = [values['sku'] for _, values in rows]
+        slugs = [values['slug'] for _, values in rows if 'slug' in values]
+        existing = {}
+        old_slugs = {}
+        for pid, sku, slug in db.session.execute(
+                select(Product.id, Product.sku, Product.slug).where(Product.sku.in_(skus))):
+            existing[sku] = pid
+            old_slugs[pid] = slug
+        slug_owners = dict(db.session.execute(
+            select(Product.slug, Product.sku).where(Product.slug.in_(slugs))).all()) if slugs else {}
+
+        accepted = []
+        for line, values in rows:
+            sku = values['sku']
+            if sku not in existing:
+                missing = [field for field in REQUIRED_FOR_INSERT if values.get(field) is None]
+                if missing:
+                    report.error(line, sku, f'New product needs {", ".join(missing)}')
+                    continue
+            slug = values.get('slug')
+            if slug is not None:
+                owner = slug_owners.get(slug, sku)
+                if owner != sku:
+                    report.error(line, sku, f'Slug {slug} is taken by product {owner or "without SKU"}')
+                    continue
+                slug_owners[slug] = sku
+            accepted.append((line, values))
+        return accepted, existing, old_slugs
+
+    @staticmethod
+    def _write_chunk(rows: List[Tuple[int, Dict[str, Any]]], existing: Dict[str, int]) -> Tuple[int, int, List[int]]:
+        """Upsert one chunk of checked rows (caller commits). Returns (inserted, updated, product ids)."""
+        if not rows:
+            return 0, 0, []
+        by_sku = {values['sku']: values for _, values in rows}
+        product_ids = ProductImportService._upsert_products(list(by_sku.values()), existing)
+        ProductImportService._sync_images(
+            {product_ids[sku]: v['images'] for sku, v in by_sku.items() if 'images' in v})
+        ProductImportService._sync_attributes(
+            {product_ids[sku]: v['attributes'] for sku, v in by_sku.items() if 'attributes' in v})
+
+        inserted = sum(1 for sku in by_sku if sku not in existing)
+        return inserted, len(by_sku) - inserted, [product_ids[sku] for sku in by_sku]
+
+    @staticmethod
+    def _upsert_products(rows: List[Dict[str, Any]], existing: Dict[str, int]) -> Dict[str, int]:
+        """
+        Write product columns; returns sku -> product id.
+
+        Known SKUs get a batched UPDATE of the provided columns only (an
+        INSERT of a partial row would fail NOT NULL checks before reaching
+        ON CONFLICT). New SKUs are inserted with ON CONFLICT (sku) DO UPDATE,
+        so a concurrent import of the same SKU turns into an update.
+        """
+        table = Product.__table__
+        now = datetime.utcnow()
+        updates: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        inserts: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for values in rows:
+            record = {k: v for k, v in values.items() if k not in ('images', 'attributes')}
+            target = updates if record['sku'] in existing else inserts
+            target.setdefault(tuple(sorted(record)), []).append(record)
+
+        for columns, records in updates.items():
+            stmt = table.update().where(table.c.sku == bindparam('b_sku')).values(
+                updated_at=now, **{column: bindparam(f'b_{column}') for column in columns if column != 'sku'}
+            )
+            db.session.execute(stmt, [{f'b_{k}': v for k, v in record.items()} for record in records])
+
+        product_ids = dict(existing)
+        dialect = db.session.get_bind().dialect.name
+        for columns, records in inserts.items():
+            for record in records:
+                record.update(created_at=now, updated_at=now)
+            if dialect in ('postgresql', 'sqlite'):
+                if dialect == 'postgresql':
+                    from sqlalchemy.dialects.postgresql import insert
+                else:
+                    from sqlalchemy.dialects.sqlite import insert
+                stmt = insert(table)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[table.c.sku],
+                    set_={column: stmt.excluded[column] for column in columns + ('updated_at',) if column != 'sku'}
+                ).returning(table.c.id, table.c.sku)
+                product_ids.update((sku, pid) for pid, sku in db.session.execute(stmt, records))
+                continue
+
+            # Generic fallback: one INSERT per row
+            for record in records:
+                result = db.session.execute(table.insert().values(**record))
+                product_ids[record['sku']] = result.inserted_primary_key[0]
+        return product_ids
+
+    @staticmethod
+    def _sync_images(desired: Dict[int, List[str]]) -> None:
+        """Make each product's images match the URL list (first is main, list order is sort order)."""
+        if not desired:
+            return
+        stored: Dict[Tuple[int, str], Tuple[int, bool, int]] = {}
+        for image_id, product_id, url, is_main, sort_order in db.session.execute(
+            select(ProductImage.id, ProductImage.product_id, ProductImage.url,
+                   ProductImage.is_main, ProductImage.sort_order)
+            .where(ProductImage.product_id.in_(list(desired)))
+        ):
+            stored[(product_id, url)] = (image_id, bool(is_main), sort_order)
+
+        inserts, updates, keep = [], [], set()
+        for product_id, urls in desired.items():
+            for position, url in enumerate(dict.fromkeys(urls)):
+                wanted = (position == 0, position)
+                current = stored.get((product_id, url))
+                if current is None:
+                    inserts.append({'product_id': product_id, 'url': url,
+                                    'is_main': wanted[0], 'sort_order': wanted[1]})
+                    continue
+                keep.add(current[0])
+                if current[1:] != wanted:
+                    updates.append({'image_id': current[0], 'is_main': wanted[0], 'sort_order': wanted[1]})
+        deletes = [image_id for image_id, _, _ in stored.values() if image_id not in keep]
+
+        table = ProductImage.__table__
+        if deletes:
+            db.session.execute(table.delete().where(table.c.id.in_(deletes)))
+        if updates:
+            db.session.execute(table.update().where(table.c.id == bindparam('image_id'))
+                               .values(is_main=bindparam('is_main'), sort_order=bindparam('sort_order')), updates)
+        if inserts:
+            db.session.execute(table.insert(), inserts)
+
+    @staticmethod
+    def _sync_attributes(desired: Dict[int, Dict[str, str]]) -> None:
+        """Make each product's free-form attributes match the name -> value map (map order is sort order)."""
+        if not desired:
+            return
+        stored: Dict[Tuple[int, str], Tuple[int, str, int]] = {}
+        for attribute_id, product_id, name, value, sort_order in db.session.execute(
+            select(ProductAttribute.id, ProductAttribute.product_id, ProductAttribute.name,
+                   ProductAttribute.value, ProductAttribute.sort_order)
+            .where(ProductAttribute.product_id.in_(list(desired)))
+        ):
+            stored[(product_id, name)] = (attribute_id, value, sort_order)
+
+        inserts, updates, keep = [], [], set()
+        for product_id, attributes in desired.items():
+            for position, (name, value) in enumerate(attributes.items()):
+                current = stored.get((product_id, name))
+                if current is None:
+                    inserts.append({'product_id': product_id, 'name': name, 'value': value, 'sort_order': position})
+                    continue
+                keep.add(current[0])
+                if current[1:] != (value, position):
+                    updates.append({'attribute_id': current[0], 'value': value, 'sort_order': position})
+        deletes = [attribute_id for attribute_id, _, _ in stored.values() if attribute_id not in keep]
+
+        table = ProductAttribute.__table__
+        if deletes:
+            db.session.execute(table.delete().where(table.c.id.in_(deletes)))
+        if updates:
+            db.session.execute(table.update().where(table.c.id == bindparam('attribute_id'))
+                               .values(value=bindparam('value'), sort_order=bindparam('sort_order')), updates)
+        if inserts:
+            db.session.execute(table.insert(), inserts)
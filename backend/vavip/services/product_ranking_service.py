@@ -0,0 +1,148 @@
+"""
+Product Ranking Service - Precomputed "popular" and "bestsellers" scores
+
+Catalog sorts read two indexed columns on products instead of aggregating
+order items per listing request:
+
+    sales_score       units sold, each day weighted by 0.5 ** (age / half-life)
+    popularity_score  decayed views + RANKING_SALE_WEIGHT * sales_score
+
+Sold units come from the daily sales rollup (order_items quantities of paid
+orders, already grouped per day) and views from daily_product_views, over
+the last RANKING_WINDOW_DAYS days. A background task in every worker
+recomputes the scores at startup and then every RANKING_REFRESH_INTERVAL
+seconds; a PostgreSQL advisory lock plus the last run time (kept in
+analytics_view_refreshes under 'product_rankings') make one worker do the
+work per interval while the others skip.
+"""
+import logging
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+from flask import current_app
+from sqlalchemy import bindparam, func, or_, text
+from ..extensions import db, socketio
+from ..models import Product, DailySalesRollup, DailyProductViews, AnalyticsViewRefresh
+
+logger = logging.getLogger(__name__)
+
+REFRESH_NAME = 'product_rankings'
+# Arbitrary constant for pg_try_advisory_xact_lock: one recompute at a time
+_RANKING_LOCK_KEY = 0x76617672
+
+
+def _decayed(rows, today: date, half_life: float) -> Dict[int, float]:
+    """Sum (product_id, day, amount) rows with exponential time decay."""
+    scores: Dict[int, float] = defaultdict(float)
+    for product_id, day, amount in rows:
+        age = max((today - day).days, 0)
+        scores[product_id] += float(amount or 0) * 0.5 ** (age / half_life)
+    return scores
+
+
+class ProductRankingService:
+    """Recomputes the catalog ranking scores."""
+
+    @staticmethod
+    def recompute(min_age: Optional[float] = None) -> int:
+        """
+        Recompute popularity_score and sales_score for all products.
+
+        Only products whose score changed are written, in one executemany
+        UPDATE; updated_at is left untouched. Products that neither have a
+        score nor get one are never loaded.
+
+        Args:
+            min_age: Skip if the scores were recomputed less than this many
+                seconds ago (by any worker)
+
+        Returns:
+            Number of products updated (0 when skipped)
+        """
+        # Another worker already recomputing: its result is as fresh as ours would be
+        if db.session.get_bind().dialect.name == 'postgresql' and not db.session.execute(
+                text('SELECT pg_try_advisory_xact_lock(:key)'), {'key': _RANKING_LOCK_KEY}).scalar():
+            db.session.rollback()
+            return 0
+        if min_age:
+            last = db.session.get(AnalyticsViewRefresh, REFRESH_NAME)
+            if last and last.refreshed_at > datetime.utcnow() - timedelta(seconds=min_age):
+                db.session.rollback()
+                return 0
+
+        started = time.perf_counter()
+        config = current_app.config
+        half_life = float(config.get('RANKING_HALF_LIFE_DAYS', 14))
+        sale_weight = float(config.get('RANKING_SALE_WEIGHT', 20))
+        today = datetime.utcnow().date()
+        start_day = today - timedelta(days=int(config.get('RANKING_WINDOW_DAYS', 90)))
+
+        sales = _decayed(db.session.query(
+            DailySalesRollup.product_id,
+            DailySalesRollup.day,
+            func.sum(DailySalesRollup.quantity)
+        ).filter(
+            DailySalesRollup.product_id != DailySalesRollup.ORDER_TOTALS,
+            DailySalesRollup.day >= start_day
+        ).group_by(DailySalesRollup.product_id, DailySalesRollup.day), today, half_life)
+
+        views = _decayed(db.session.query(
+            DailyProductViews.product_id, DailyProductViews.day, DailyProductViews.views
+        ).filter(DailyProductViews.day >= start_day), today, half_life)
+
+        def new_scores(product_id):
+            sales_score = round(sales.get(product_id, 0.0), 4)
+            return round(views.get(product_id, 0.0) + sale_weight * sales_score, 4), sales_score
+
+        # Only products scored now can change; the rest (usually most) stay at zero
+        current = db.session.query(Product.id, Product.popularity_score, Product.sales_score)\
+            .filter(or_(Product.popularity_score != 0, Product.sales_score != 0))
+        changes = []
+        seen = set()
+        for product_id, old_popularity, old_sales in current:
+            seen.add(product_id)
+            popularity, sales_score = new_scores(product_id)
+            if (popularity, sales_score) != (old_popularity, old_sales):
+                changes.append({'pid': product_id, 'popularity': popularity, 'sales': sales_score})
+        for product_id in (sales.keys() | views.keys()) - seen:
+            popularity, sales_score = new_scores(product_id)
+            if popularity or sales_score:
+                changes.append({'pid': product_id, 'popularity': popularity, 'sales': sales_score})
+
+        if changes:
+            table = Product.__table__
+            db.session.execute(
+                table.update().where(table.c.id == bindparam('pid')).values(
+                    popularity_score=bindparam('popularity'),
+                    sales_score=bindparam('sales'),
+                    updated_at=table.c.updated_at
+                ),
+                changes
+            )
+        db.session.merge(AnalyticsViewRefresh(
+            name=REFRESH_NAME, refreshed_at=datetime.utcnow(),
+            duration_ms=int((time.perf_counter() - started) * 1000)
+        ))
+        db.session.commit()
+        return len(changes)
+
+
+def _recompute_loop(app, interval: float) -> None:
+    while True:
+        with app.app_context():
+            try:
+                # Slightly under the interval so the loop never skips a beat
+                ProductRankingService.recompute(min_age=interval * 0.9)
+            except Exception as e:
+                db.session.rollback()
+                logger.warning(f'Product ranking recompute failed: {e}')
+        socketio.sleep(interval)
+
+
+def init_product_rankings(app) -> None:
+    """Start the periodic ranking recompute, first run at startup (not in tests)."""
+    interval = app.config.get('RANKING_REFRESH_INTERVAL', 0)
+    if app.testing or interval <= 0:
+        return
+    socketio.start_background_task(_recompute_loop, app, interval)
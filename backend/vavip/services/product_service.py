@@ -1,17 +1,67 @@
 """
 Product Service - Business logic for products and categories
 """
+import logging
+import threading
+import time
+from datetime import datetime
 from typing import Optional, List, Dict, Any
-from sqlalchemy.orm import joinedload
-from ..extensions import db
-from ..models import Product, Category
+import redis
+from flask import current_app
+from sqlalchemy import Boolean, Integer, case, cast, column, literal, or_, select, update, values
+from sqlalchemy.orm import joinedload, selectinload
+from ..extensions import db, get_redis
+from ..models import Product, Category, CategoryClosure
 from ..models.user import Favorite
+from ..utils.cache import invalidate_cache
+from ..utils.category_tree import CategoryTree
+from ..utils.db_routing import replica_read
+from .facet_service import FacetService
+from .product_detail_service import ProductDetailService
+from .attribute_service import AttributeService
+
+# Public sort keys. Each column leads an (is_active, column) index, and
+# created_at / price also an (is_active, category_id, column) one, so listings
+# are index range scans; ties are broken by id (implicit in SQLite indexes).
+SORT_KEYS = {
+    'created_at': Product.created_at,
+    'price': Product.price,
+    'name': Product.name,
+    'popular': Product.popularity_score,  # Precomputed by ProductRankingService
+    'bestsellers': Product.sales_score,
+}
+SORT_ORDERS = ('asc', 'desc')
+
+# Columns a bulk price / stock update may set
+BULK_UPDATE_FIELDS = ('price', 'old_price', 'stock_quantity')
+
+logger = logging.getLogger(__name__)
+
+# Category tree snapshot shared by the worker's threads (see CategoryService.get_tree)
+CATEGORY_VERSION_KEY = 'categories:version'
+_category_lock = threading.Lock()
+_category_state = {'tree': None, 'version': None, 'built_at': 0.0, 'checked_at': 0.0}
+
+# Maintained row by row on category writes (see CategoryService._closure_*)
+_closure = CategoryClosure.__table__
+
+
+def _category_version() -> Optional[int]:
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        return int(client.get(CATEGORY_VERSION_KEY) or 0)
+    except (redis.ConnectionError, redis.TimeoutError) as e:
+        logger.warning(f'Category version check failed: {e}')
+        return None
 
 
 class ProductService:
     """Product business logic layer."""
     
     @staticmethod
+    @replica_read()
     def get_products(
         page: int = 1,
         per_page: int = 12,
@@ -22,7 +72,10 @@ class ProductService:
         is_featured: Optional[bool] = None,
         sort_by: str = 'created_at',
         sort_order: str = 'desc',
-        active_only: bool = True
+        active_only: bool = True,
+        price_buckets: Optional[List[str]] = None,
+        attributes: Optional[Dict[str, List[str]]] = None,
+        specs: Optional[Dict[str, Dict[str, Any]]] = None
     ) -> tuple:
         """
         Get paginated products with filters.
@@ -30,29 +83,48 @@ class ProductService:
         Args:
             page: Page number (1-indexed)
             per_page: Items per page
-            category_slug: Filter by category slug
+            category_slug: Filter by category slug (including subcategories)
             search: Search term for name/description/sku
             min_price: Minimum price filter
             max_price: Maximum price filter
             is_featured: Filter featured products only
-            sort_by: Column to sort by
+            sort_by: One of SORT_KEYS
             sort_order: 'asc' or 'desc'
             active_only: Only return active products
+            price_buckets: Facet price buckets (any of)
+            attributes: Facet attribute selections, name -> values (any of)
+            specs: Typed attribute filters, code -> {'eq': [...], 'min': x, 'max': y}
             
         Returns:
             Tuple of (products list, pagination info)
+            
+        Raises:
+            ValueError: On unknown sort key or order, or an invalid spec filter
         """
-        # Build query with eager loading
-        query = Product.query.options(joinedload(Product.category))
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f'Unsupported sort: {sort_by}. Use one of: {", ".join(SORT_KEYS)}')
+        if sort_order not in SORT_ORDERS:
+            raise ValueError(f'Unsupported order: {sort_order}. Use one of: {", ".join(SORT_ORDERS)}')
+        
+        # Build query with eager loading (images batch-loaded for main_image)
+        query = Product.query.options(joinedload(Product.category), selectinload(Product.images))
         
         if active_only:
             query = query.filter_by(is_active=True)
         
-        # Category filter
-        if category_slug:
-            category = Category.query.filter_by(slug=category_slug).first()
-            if category:
-                query = query.filter_by(category_id=category.id)
+        # Category filter: the category and all its subcategories (ids from the tree snapshot)
+        category_ids = CategoryService.get_tree().subtree_ids(category_slug) if category_slug else None
+        if category_ids is not None:
+            query = query.filter(Product.category_id.in_(sorted(category_ids)))
+        
+        # Facet filters: resolved to ids by set intersection in memory
+        if price_buckets or attributes:
+            filters = FacetService.make_filters(category_ids, price_buckets, attributes)
+            query = query.filter(Product.id.in_(FacetService.matching_ids(filters)))
+        
+        # Typed attribute filters (index range scans on product_attribute_values)
+        if specs:
+            query = query.filter(*AttributeService.filter_clauses(specs))
         
         # Search filter
         if search:
@@ -77,11 +149,11 @@ class ProductService:
             query = query.filter_by(is_featured=True)
         
         # Sorting
-        sort_column = getattr(Product, sort_by, Product.created_at)
+        sort_column = SORT_KEYS[sort_by]
         if sort_order == 'desc':
-            query = query.order_by(sort_column.desc())
+            query = query.order_by(sort_column.desc(), Product.id.desc())
         else:
-            query = query.order_by(sort_column.asc())
+            query = query.order_by(sort_column.asc(), Product.id.asc())
         
         # Paginate
         pagination = query.paginate(page=page, per_page=per_page, error_out=False)
@@ -89,6 +161,26 @@ class ProductService:
         return pagination.items, pagination
     
     @staticmethod
+    def get_facets(
+        category_slug: Optional[str] = None,
+        price_buckets: Optional[List[str]] = None,
+        attributes: Optional[Dict[str, List[str]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Facet counts for the storefront filters next to the product grid.
+        
+        Counts reflect the category, price bucket and attribute selections
+        (each group counted under the other groups' selections); search and
+        min/max price are not applied.
+        
+        Returns:
+            {'categories', 'price', 'attributes'} count maps
+        """
+        category_ids = CategoryService.get_tree().subtree_ids(category_slug) if category_slug else None
+        return FacetService.facet_counts(FacetService.make_filters(category_ids, price_buckets, attributes))
+    
+    @staticmethod
+    @replica_read()
     def get_product_by_slug(slug: str, active_only: bool = True) -> Optional[Product]:
         """
         Get product by slug with full details.
@@ -101,9 +193,10 @@ class ProductService:
             Product instance or None
         """
         query = Product.query.options(
-            joinedload(Product.category),
-            joinedload(Product.images),
-            joinedload(Product.attributes)
+            selectinload(Product.category),
+            selectinload(Product.images),
+            selectinload(Product.attributes),
+            selectinload(Product.attribute_values)
         )
         
         if active_only:
@@ -114,6 +207,7 @@ class ProductService:
         return query.first()
     
     @staticmethod
+    @replica_read()
     def get_product_by_id(product_id: int, active_only: bool = False) -> Optional[Product]:
         """
         Get product by ID with full details.
@@ -126,9 +220,10 @@ class ProductService:
             Product instance or None
         """
         query = Product.query.options(
-            joinedload(Product.category),
-            joinedload(Product.images),
-            joinedload(Product.attributes)
+            selectinload(Product.category),
+            selectinload(Product.images),
+            selectinload(Product.attributes),
+            selectinload(Product.attribute_values)
         )
         
         if active_only:
@@ -139,6 +234,7 @@ class ProductService:
         return query.first()
     
     @staticmethod
+    @replica_read()
     def get_featured_products(limit: int = 10) -> List[Product]:
         """
         Get featured products.
@@ -153,7 +249,7 @@ class ProductService:
         
         @cache_result(ttl=1800, prefix='featured_products')
         def _get_featured():
-            products = Product.query.options(joinedload(Product.category))\
+            products = Product.query.options(joinedload(Product.category), selectinload(Product.images))\
                 .filter_by(is_active=True, is_featured=True)\
                 .order_by(Product.sort_order).limit(limit).all()
             return [p.to_dict() for p in products]
@@ -183,6 +279,7 @@ class ProductService:
         db.session.add(product)
         db.session.commit()
         
+        FacetService.products_changed([product.id])
         return product
     
     @staticmethod
@@ -204,6 +301,8 @@ class ProductService:
         if not product:
             raise ValueError('Product not found')
         
+        old_slug = product.slug
+        
         # Check slug uniqueness if changed
         if 'slug' in data and data['slug'] != product.slug:
             existing = Product.query.filter_by(slug=data['slug']).first()
@@ -216,6 +315,8 @@ class ProductService:
                 setattr(product, field, value)
         
         db.session.commit()
+        FacetService.products_changed([product.id])
+        ProductDetailService.invalidate([product.id], {old_slug, product.slug})
         return product
     
     @staticmethod
@@ -236,8 +337,11 @@ class ProductService:
         if not product:
             raise ValueError('Product not found')
         
+        slug = product.slug
         db.session.delete(product)
         db.session.commit()
+        FacetService.products_changed([product_id])
+        ProductDetailService.invalidate([product_id], [slug])
         return True
     
     @staticmethod
@@ -287,8 +391,93 @@ class ProductService:
                 raise ValueError(f'Insufficient stock for product {product.name}')
             product.stock_quantity = new_quantity
             db.session.commit()
+            ProductDetailService.invalidate([product.id], [product.slug])
         
         return product
+    
+    @staticmethod
+    def bulk_update_prices_stock(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Apply a batch of price / stock changes in one UPDATE ... FROM (VALUES ...).
+        
+        Products are looked up by id or sku in one SELECT; items that change
+        nothing are skipped, and only the caches the changed rows feed are
+        invalidated (their detail payloads, facets for price changes,
+        featured products when a featured product changed).
+        
+        Args:
+            items: Validated items, {'id' | 'sku', 'price'?, 'old_price'?, 'stock_quantity'?};
+                later items for the same product win
+                
+        Returns:
+            {'updated', 'unchanged', 'not_found', 'product_ids', 'price_changes', 'stock_changes'}
+        """
+        ids = [item['id'] for item in items if 'id' in item]
+        skus = [item['sku'] for item in items if 'sku' in item]
+        current = {}
+        by_sku = {}
+        for row in db.session.execute(
+            select(Product.id, Product.sku, Product.slug, Product.is_featured, *(getattr(Product, f) for f in BULK_UPDATE_FIELDS))
+            .where(or_(Product.id.in_(ids), Product.sku.in_(skus)))
+        ):
+            current[row.id] = row
+            by_sku[row.sku] = row.id
+        
+        changes: Dict[int, Dict[str, Any]] = {}
+        matched = set()
+        not_found = []
+        for item in items:
+            product_id = item['id'] if 'id' in item else by_sku.get(item['sku'])
+            if product_id not in current:
+                not_found.append(item.get('id', item.get('sku')))
+                continue
+            matched.add(product_id)
+            changes.setdefault(product_id, {}).update((f, item[f]) for f in BULK_UPDATE_FIELDS if f in item)
+        for product_id in list(changes):
+            row = current[product_id]
+            changed = {f: v for f, v in changes[product_id].items() if getattr(row, f) != v}
+            if changed:
+                changes[product_id] = changed
+            else:
+                del changes[product_id]
+        
+        if changes:
+            fields = [f for f in BULK_UPDATE_FIELDS if any(f in c for c in changes.values())]
+            table = Product.__table__
+            # One flag column per field so rows can leave a field untouched (or set it to NULL)
+            source = values(
+                column('pid', Integer),
+                *(column(f, table.c[f].type) for f in fields),
+                *(column(f'set_{f}', Boolean) for f in fields),
+                name='changes'
+            ).data([
+                (product_id, *(c.get(f) for f in fields), *(f in c for f in fields))
+                for product_id, c in changes.items()
+            ]).cte('changes')  # WITH changes(pid, ...) AS (VALUES ...): SQLite cannot alias a VALUES subquery's columns
+            db.session.execute(
+                update(table).where(table.c.id == source.c.pid).values(
+                    updated_at=datetime.utcnow(),
+                    **{f: case((source.c[f'set_{f}'], cast(source.c[f], table.c[f].type)), else_=table.c[f])
+                       for f in fields}
+                )
+            )
+            db.session.commit()
+        
+        ProductDetailService.invalidate(changes, [current[pid].slug for pid in changes])
+        price_changed = [pid for pid, c in changes.items() if 'price' in c]
+        if price_changed:
+            FacetService.products_changed(price_changed)
+        if any(current[pid].is_featured for pid in changes):
+            invalidate_cache('featured_products')
+        
+        return {
+            'updated': len(changes),
+            'unchanged': len(matched) - len(changes),
+            'not_found': not_found,
+            'product_ids': sorted(changes),
+            'price_changes': len(price_changed),
+            'stock_changes': sum(1 for c in changes.values() if 'stock_quantity' in c),
+        }
 
 
 class CategoryService:
@@ -299,6 +488,8 @@ class CategoryService:
         """
         Get all categories.
         
+        Served from the in-memory tree snapshot (no database access).
+        
         Args:
             active_only: Only return active categories
             include_children: Include child categories
@@ -306,22 +497,120 @@ class CategoryService:
         Returns:
             List of category dictionaries
         """
-        from ..utils.cache import cache_result
+        return CategoryService.get_tree().to_list(active_only, include_children)
+    
+    @staticmethod
+    def get_tree() -> CategoryTree:
+        """
+        The worker's category tree snapshot.
         
-        @cache_result(ttl=3600, prefix='categories')
-        def _get_categories():
-            query = Category.query
-            if active_only:
-                query = query.filter_by(is_active=True, parent_id=None)
-            else:
-                query = query.filter_by(parent_id=None)
+        Rebuilt when missing, when another worker bumped the Redis version
+        (checked at most every CATEGORY_VERSION_CHECK_INTERVAL seconds) or
+        after CATEGORY_TREE_MAX_AGE seconds (the only refresh without Redis).
+        """
+        config = current_app.config
+        now = time.monotonic()
+        tree = _category_state['tree']
+        
+        if tree is not None and now - _category_state['checked_at'] >= config.get('CATEGORY_VERSION_CHECK_INTERVAL', 1.0):
+            _category_state['checked_at'] = now
+            version = _category_version()
+            if version is not None and version != _category_state['version']:
+                tree = None
+        if tree is not None and now - _category_state['built_at'] >= config.get('CATEGORY_TREE_MAX_AGE', 300):
+            tree = None
+        
+        if tree is None:
+            tree = CategoryService.refresh_tree()
+        return tree
+    
+    @staticmethod
+    def refresh_tree(bump: bool = False) -> CategoryTree:
+        """
+        Load all categories in one SELECT and swap in a new snapshot.
+        
+        Args:
+            bump: Also increment the shared version so other workers rebuild
+                (after a category write)
+        """
+        with _category_lock:
+            version = _category_version()
+            client = get_redis() if bump else None
+            if client is not None:
+                try:
+                    version = client.incr(CATEGORY_VERSION_KEY)
+                except (redis.ConnectionError, redis.TimeoutError) as e:
+                    logger.warning(f'Category version bump failed: {e}')
             
-            categories = query.order_by(Category.sort_order).all()
-            return [c.to_dict(include_children=include_children) for c in categories]
+            categories = Category.query.order_by(Category.sort_order, Category.id).all()
+            tree = CategoryTree(c.to_dict() for c in categories)
+            now = time.monotonic()
+            _category_state.update(tree=tree, version=version, built_at=now, checked_at=now)
+        return tree
+    
+    @staticmethod
+    def _closure_add(category_id: int, parent_id: Optional[int]) -> None:
+        """Closure rows of a new leaf: itself, plus the parent's ancestors one level deeper."""
+        db.session.execute(_closure.insert().values(ancestor_id=category_id, descendant_id=category_id, depth=0))
+        if parent_id is not None:
+            db.session.execute(_closure.insert().from_select(
+                ['ancestor_id', 'descendant_id', 'depth'],
+                select(_closure.c.ancestor_id, literal(category_id), _closure.c.depth + 1)
+                .where(_closure.c.descendant_id == parent_id)
+            ))
+    
+    @staticmethod
+    def _closure_move(category_id: int, parent_id: Optional[int]) -> None:
+        """Re-hang a subtree: unlink it from its old ancestors, link it below the new parent."""
+        subtree = _closure.alias('subtree')
+        subtree_ids = select(subtree.c.descendant_id).where(subtree.c.ancestor_id == category_id)
+        db.session.execute(_closure.delete().where(
+            _closure.c.descendant_id.in_(subtree_ids),
+            _closure.c.ancestor_id.not_in(subtree_ids)
+        ))
+        if parent_id is not None:
+            above, below = _closure.alias('above'), _closure.alias('below')
+            db.session.execute(_closure.insert().from_select(
+                ['ancestor_id', 'descendant_id', 'depth'],
+                select(above.c.ancestor_id, below.c.descendant_id, above.c.depth + below.c.depth + 1)
+                .select_from(above.join(below, db.true()))
+                .where(above.c.descendant_id == parent_id, below.c.ancestor_id == category_id)
+            ))
+    
+    @staticmethod
+    def _closure_remove(category_id: int) -> None:
+        """Drop a category from the closure; its descendants move one level up."""
+        above, below = _closure.alias('above'), _closure.alias('below')
+        db.session.execute(_closure.update().where(
+            _closure.c.ancestor_id.in_(
+                select(above.c.ancestor_id).where(above.c.descendant_id == category_id, above.c.depth > 0)
+            ),
+            _closure.c.descendant_id.in_(
+                select(below.c.descendant_id).where(below.c.ancestor_id == category_id, below.c.depth > 0)
+            )
+        ).values(depth=_closure.c.depth - 1))
+        db.session.execute(_closure.delete().where(
+            or_(_closure.c.ancestor_id == category_id, _closure.c.descendant_id == category_id)
+        ))
+    
+    @staticmethod
+    def get_category(slug: str, active_only: bool = True) -> Optional[Dict]:
+        """
+        Get a category with its direct children by slug.
+        
+        Served from the in-memory tree snapshot (no database access).
         
-        return _get_categories()
+        Args:
+            slug: Category slug
+            active_only: Only return if active (and only active children)
+            
+        Returns:
+            Category dictionary or None
+        """
+        return CategoryService.get_tree().get(slug, active_only)
     
     @staticmethod
+    @replica_read()
     def get_category_by_slug(slug: str, active_only: bool = True) -> Optional[Category]:
         """
         Get category by slug.
@@ -351,7 +640,10 @@ class CategoryService:
         """
         category = Category(**data)
         db.session.add(category)
+        db.session.flush()
+        CategoryService._closure_add(category.id, category.parent_id)
         db.session.commit()
+        CategoryService.refresh_tree(bump=True)
         return category
     
     @staticmethod
@@ -365,16 +657,33 @@ class CategoryService:
             
         Returns:
             Updated category instance
+            
+        Raises:
+            ValueError: If not found, or moved under itself or its own subtree
         """
         category = Category.query.get(category_id)
         if not category:
             raise ValueError('Category not found')
         
+        parent_id = data.get('parent_id')
+        if parent_id is not None and parent_id != category.parent_id:
+            in_subtree = db.session.query(CategoryClosure.descendant_id).filter_by(
+                ancestor_id=category_id, descendant_id=parent_id
+            ).first()
+            if in_subtree:
+                raise ValueError('Category cannot be moved under itself or its own subcategory')
+        
+        old_parent_id = category.parent_id
         for field, value in data.items():
             if value is not None:
                 setattr(category, field, value)
         
+        db.session.flush()
+        if category.parent_id != old_parent_id:
+            CategoryService._closure_move(category.id, category.parent_id)
         db.session.commit()
+        CategoryService.refresh_tree(bump=True)
+        ProductDetailService.invalidate_all()  # Payloads embed the category
         return category
     
     @staticmethod
@@ -385,6 +694,8 @@ class CategoryService:
         Args:
             category_id: Category ID
             
+        Subcategories move up to the deleted category's parent.
+        
         Returns:
             True if deleted successfully
         """
@@ -392,8 +703,14 @@ class CategoryService:
         if not category:
             raise ValueError('Category not found')
         
+        CategoryService._closure_remove(category_id)
+        Category.query.filter_by(parent_id=category_id).update(
+            {'parent_id': category.parent_id}, synchronize_session='fetch'
+        )
         db.session.delete(category)
         db.session.commit()
+        CategoryService.refresh_tree(bump=True)
+        ProductDetailService.invalidate_all()  # Payloads embed the category
         return True
 
 
@@ -459,7 +776,7 @@ class FavoriteService:
             List of product dictionaries
         """
         favorites = Favorite.query.filter_by(user_id=user_id)\
-            .options(joinedload(Favorite.product)).all()
+            .options(joinedload(Favorite.product).selectinload(Product.images)).all()
         
         return [f.product.to_dict() for f in favorites if f.product and f.product.is_active]
 
@@ -0,0 +1,190 @@
+"""
+Sales Rollup Service - Maintains the daily_sales_rollup table
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, and_, literal
+from ..extensions import db
+from ..models import Order, OrderItem, Product, DailySalesRollup
+
+
+def _day_bounds(start_day: date, end_day: date) -> Tuple[datetime, datetime]:
+    """Half-open datetime range covering [start_day, end_day]."""
+    return (datetime.combine(start_day, datetime.min.time()),
+            datetime.combine(end_day + timedelta(days=1), datetime.min.time()))
+
+
+class SalesRollupService:
+    """Incremental maintenance, backfill and reconciliation of sales rollups."""
+    
+    @staticmethod
+    def apply_order(order: Order, sign: int = 1) -> None:
+        """
+        Add (sign=1) or remove (sign=-1) a paid order from the rollup.
+        
+        Runs inside the caller's transaction; the caller commits.
+        
+        Args:
+            order: Order whose payment status changed
+            sign: +1 when the order became paid, -1 when it stopped being paid
+        """
+        day = (order.created_at or datetime.utcnow()).date()
+        totals = DailySalesRollup.ORDER_TOTALS
+        
+        # Pre-aggregate so each key appears once per upsert statement
+        rows: Dict[tuple, dict] = defaultdict(
+            lambda: {'product_name': None, 'quantity': 0, 'revenue': Decimal('0'), 'orders': 0}
+        )
+        items = OrderItem.query.filter_by(order_id=order.id)\
+            .outerjoin(Product, Product.id == OrderItem.product_id)\
+            .with_entities(OrderItem, Product.category_id).all()
+        for item, category_id in items:
+            row = rows[(day, category_id or 0, item.product_id)]
+            row['product_name'] = item.product_name
+            row['quantity'] += sign * (item.quantity or 0)
+            row['revenue'] += sign * Decimal(str(item.total or 0))
+            row['orders'] = sign
+        
+        rows[(day, totals, totals)].update(
+            orders=sign, revenue=sign * Decimal(str(order.total or 0))
+        )
+        
+        SalesRollupService._upsert([
+            {'day': key[0], 'category_id': key[1], 'product_id': key[2], **values}
+            for key, values in rows.items()
+        ])
+    
+    @staticmethod
+    def _upsert(rows: List[dict]) -> None:
+        """Increment rollup rows, inserting missing keys."""
+        table = DailySalesRollup.__table__
+        dialect = db.session.get_bind().dialect.name
+        
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(table).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.day, table.c.category_id, table.c.product_id],
+                set_={
+                    'product_name': func.coalesce(stmt.excluded.product_name, table.c.product_name),
+                    'quantity': table.c.quantity + stmt.excluded.quantity,
+                    'revenue': table.c.revenue + stmt.excluded.revenue,
+                    'orders': table.c.orders + stmt.excluded.orders,
+                }
+            )
+            db.session.execute(stmt)
+            return
+        
+        # Generic fallback: read-modify-write per key
+        for row in rows:
+            existing = db.session.get(DailySalesRollup, (row['day'], row['category_id'], row['product_id']))
+            if existing is None:
+                db.session.add(DailySalesRollup(**row))
+                continue
+            existing.product_name = row['product_name'] or existing.product_name
+            existing.quantity += row['quantity']
+            existing.revenue += row['revenue']
+            existing.orders += row['orders']
+    
+    @staticmethod
+    def backfill(start_day: date, end_day: Optional[date] = None) -> int:
+        """
+        Rebuild rollup rows for [start_day, end_day] from raw orders.
+        
+        Set-based: deletes the range and re-inserts it with two
+        INSERT ... SELECT statements in one transaction.
+        
+        Returns:
+            Number of rollup rows written
+        """
+        end_day = end_day or datetime.utcnow().date()
+        start, end = _day_bounds(start_day, end_day)
+        table = DailySalesRollup.__table__
+        columns = ['day', 'category_id', 'product_id', 'product_name', 'quantity', 'revenue', 'orders']
+        paid_in_range = and_(
+            Order.payment_status == 'paid',
+            Order.created_at >= start,
+            Order.created_at < end
+        )
+        
+        db.session.execute(table.delete().where(
+            table.c.day >= start_day, table.c.day <= end_day
+        ))
+        
+        day = func.date(Order.created_at)
+        category = func.coalesce(Product.category_id, 0)
+        items_select = db.select(
+            day, category, OrderItem.product_id, func.max(OrderItem.product_name),
+            func.sum(OrderItem.quantity), func.sum(OrderItem.total),
+            func.count(func.distinct(Order.id))
+        ).select_from(OrderItem)\
+         .join(Order, Order.id == OrderItem.order_id)\
+         .outerjoin(Product, Product.id == OrderItem.product_id)\
+         .where(paid_in_range)\
+         .group_by(day, category, OrderItem.product_id)
+        
+        totals = DailySalesRollup.ORDER_TOTALS
+        totals_select = db.select(
+            day, literal(totals), literal(totals), literal(None),
+            literal(0), func.sum(Order.total), func.count(Order.id)
+        ).where(paid_in_range).group_by(day)
+        
+        written = 0
+        for select in (items_select, totals_select):
+            result = db.session.execute(table.insert().from_select(columns, select))
+            written += result.rowcount or 0
+        
+        db.session.commit()
+        return written
+    
+    @staticmethod
+    def reconcile(start_day: date, end_day: Optional[date] = None) -> List[dict]:
+        """
+        Compare rollup day totals with raw orders.
+        
+        Returns:
+            List of mismatching days ({'day', 'raw_*', 'rollup_*'}); empty if consistent
+        """
+        end_day = end_day or datetime.utcnow().date()
+        start, end = _day_bounds(start_day, end_day)
+        
+        raw = {
+            str(row.day): (row.orders, Decimal(str(row.revenue or 0)))
+            for row in db.session.query(
+                func.date(Order.created_at).label('day'),
+                func.count(Order.id).label('orders'),
+                func.sum(Order.total).label('revenue')
+            ).filter(
+                Order.payment_status == 'paid',
+                Order.created_at >= start,
+                Order.created_at < end
+            ).group_by(func.date(Order.created_at)).all()
+        }
+        rollup = {
+            str(row.day): (row.orders, Decimal(str(row.revenue or 0)))
+            for row in DailySalesRollup.query.filter(
+                DailySalesRollup.product_id == DailySalesRollup.ORDER_TOTALS,
+                DailySalesRollup.day >= start_day,
+                DailySalesRollup.day <= end_day,
+                DailySalesRollup.orders != 0
+            ).all()
+        }
+        
+        mismatches = []
+        for day in sorted(set(raw) | set(rollup)):
+            raw_orders, raw_revenue = raw.get(day, (0, Decimal('0')))
+            rollup_orders, rollup_revenue = rollup.get(day, (0, Decimal('0')))
+            if raw_orders != rollup_orders or abs(raw_revenue - rollup_revenue) >= Decimal('0.01'):
+                mismatches.append({
+                    'day': day,
+                    'raw_orders': raw_orders,
+                    'raw_revenue': float(raw_revenue),
+                    'rollup_orders': rollup_orders,
+                    'rollup_revenue': float(rollup_revenue),
+                })
+        return mismatches
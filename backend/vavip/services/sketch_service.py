@@ -0,0 +1,208 @@
+"""
+Sketch Service - Approximate analytics on Redis sketches
+
+Fed from product views (batched by ViewTrackingService) and paid orders; every structure is partitioned by
+local day and expires after SKETCH_RETENTION_DAYS, so period queries union
+or sum the daily keys.
+
+Keys:
+    sketch:visitors:<day>           HLL of visitor ids
+    sketch:buyers:<product>:<day>   HLL of buyer user ids
+    sketch:cms:<metric>:<day>       Count-Min counters (views, sales)
+    sketch:topk:<metric>:<day>      Top-K product ids scored by estimate
+"""
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+import redis
+from flask import current_app
+from ..extensions import get_redis
+from ..models import Order, OrderItem, Product
+from ..utils.sketches import CountMinTopK
+from ..utils.time_buckets import local_date
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('views', 'sales')
+
+_sketch: Optional[CountMinTopK] = None
+
+
+def _cms() -> CountMinTopK:
+    global _sketch
+    if _sketch is None:
+        config = current_app.config
+        _sketch = CountMinTopK(
+            width=config.get('SKETCH_CMS_WIDTH', 2048),
+            depth=config.get('SKETCH_CMS_DEPTH', 4),
+            k=config.get('SKETCH_TOPK', 50)
+        )
+    return _sketch
+
+
+def _ttl() -> int:
+    return int(current_app.config.get('SKETCH_RETENTION_DAYS', 35)) * 86400
+
+
+def _days(days: int) -> List[date]:
+    today = local_date()
+    return [today - timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+
+
+class SketchService:
+    """Feeds and queries HyperLogLog / Count-Min / Top-K sketches."""
+
+    @staticmethod
+    def record_product_views(views: Dict[tuple, int]) -> None:
+        """
+        Record aggregated product views.
+
+        Args:
+            views: (product_id, visitor_id) -> number of views
+        """
+        client = get_redis()
+        if client is None or not views:
+            return
+
+        day = local_date().isoformat()
+        ttl = _ttl()
+        visitors_key = f'sketch:visitors:{day}'
+        per_product: Dict[int, int] = defaultdict(int)
+        for (product_id, _visitor), count in views.items():
+            per_product[product_id] += count
+
+        def queue(pipe):
+            pipe.pfadd(visitors_key, *{visitor for _product, visitor in views})
+            pipe.expire(visitors_key, ttl)
+            for product_id, count in per_product.items():
+                _cms().add(client, f'sketch:cms:views:{day}', f'sketch:topk:views:{day}',
+                           product_id, count, ttl, pipe=pipe)
+
+        SketchService._execute(client, queue)
+
+    @staticmethod
+    def record_order_paid(order: Order) -> None:
+        """Record buyers and sold quantities of a newly paid order."""
+        client = get_redis()
+        if client is None:
+            return
+
+        day = local_date(order.created_at).isoformat()
+        ttl = _ttl()
+        items = OrderItem.query.filter_by(order_id=order.id)\
+            .with_entities(OrderItem.product_id, OrderItem.quantity).all()
+
+        def queue(pipe):
+            for product_id, quantity in items:
+                buyers_key = f'sketch:buyers:{product_id}:{day}'
+                pipe.pfadd(buyers_key, order.user_id)
+                pipe.expire(buyers_key, ttl)
+                _cms().add(client, f'sketch:cms:sales:{day}', f'sketch:topk:sales:{day}',
+                           product_id, quantity or 1, ttl, pipe=pipe)
+
+        SketchService._execute(client, queue)
+
+    @staticmethod
+    def _execute(client, queue) -> bool:
+        """Run queued commands in one pipeline behind the Redis breaker."""
+        try:
+            pipe = client.pipeline(transaction=False)
+            queue(pipe)
+            pipe.execute()
+        except redis.RedisError as e:
+            # Best effort: callers run after their commit (e.g. a payment update)
+            logger.warning(f'Failed to update analytics sketches: {e}')
+            return False
+        return True
+
+    @staticmethod
+    def unique_visitors(days: int = 7) -> Optional[Dict]:
+        """
+        Approximate unique visitors per local day and over the whole period.
+
+        Returns:
+            {'days': [{'date', 'visitors'}], 'total'}; None without Redis
+        """
+        client = get_redis()
+        if client is None:
+            return None
+        period = _days(days)
+        keys = [f'sketch:visitors:{day.isoformat()}' for day in period]
+        try:
+            pipe = client.pipeline(transaction=False)
+            for key in keys:
+                pipe.pfcount(key)
+            pipe.pfcount(*keys)
+            *per_day, total = pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f'Sketch query failed: {e}')
+            return None
+        return {
+            'days': [{'date': day.isoformat(), 'visitors': count} for day, count in zip(period, per_day)],
+            'total': total
+        }
+
+    @staticmethod
+    def unique_buyers(product_id: int, days: int = 30) -> Optional[int]:
+        """Approximate distinct buyers of a product (union of daily HLLs); None without Redis."""
+        client = get_redis()
+        if client is None:
+            return None
+        try:
+            count = client.pfcount(*[f'sketch:buyers:{product_id}:{day.isoformat()}' for day in _days(days)])
+        except redis.RedisError as e:
+            logger.warning(f'Sketch query failed: {e}')
+            return None
+        return count
+
+    @staticmethod
+    def product_count(metric: str, product_id: int, days: int = 30) -> Optional[int]:
+        """Count-Min estimate of a product's views or sold units; None without Redis."""
+        client = get_redis()
+        if client is None:
+            return None
+        sketch = _cms()
+        fields = sketch.fields(product_id)
+        try:
+            pipe = client.pipeline(transaction=False)
+            for day in _days(days):
+                pipe.hmget(f'sketch:cms:{metric}:{day.isoformat()}', fields)
+            per_day = pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f'Sketch query failed: {e}')
+            return None
+        return sum(min(int(v or 0) for v in values) for values in per_day)
+
+    @staticmethod
+    def top_products(metric: str = 'views', limit: int = 10, days: int = 7) -> Optional[List[Dict]]:
+        """
+        Approximate top products by views or sold units.
+
+        Returns:
+            List of {'product_id', 'product_name', 'count'}; None without Redis
+        """
+        if metric not in METRICS:
+            raise ValueError(f'Unsupported metric: {metric}. Use one of: {", ".join(METRICS)}')
+        client = get_redis()
+        if client is None:
+            return None
+        try:
+            pipe = client.pipeline(transaction=False)
+            for day in _days(days):
+                pipe.zrevrange(f'sketch:topk:{metric}:{day.isoformat()}', 0, -1, withscores=True)
+            per_day = pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f'Sketch query failed: {e}')
+            return None
+
+        top = CountMinTopK.merge_top(per_day, limit)
+        names = dict(
+            Product.query.filter(Product.id.in_([int(member) for member, _ in top]))
+            .with_entities(Product.id, Product.name).all()
+        ) if top else {}
+        return [{
+            'product_id': int(member),
+            'product_name': names.get(int(member)),
+            'count': count
+        } for member, count in top]
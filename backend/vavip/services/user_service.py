@@ -4,9 +4,10 @@ User Service - Business logic for user management
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from flask_jwt_extended import create_access_token, create_refresh_token
-from sqlalchemy.orm import joinedload
+from sqlalchemy import func
+from sqlalchemy.orm import selectinload
 from ..extensions import db
-from ..models import User, Order
+from ..models import User, Order, CustomerSummary
 from ..utils.errors import ValidationError, NotFoundError, ErrorCodes
 
 
@@ -244,7 +245,7 @@ class UserService:
             List of order dictionaries
         """
         orders = Order.query.filter_by(user_id=user_id)\
-            .options(joinedload(Order.items))\
+            .options(selectinload(Order.items))\
             .order_by(Order.created_at.desc())\
             .limit(limit).all()
         
@@ -348,6 +349,13 @@ class UserService:
         """
         Get statistics for a user.
         
+        Served from the customer_summaries batch table plus a live delta:
+        orders created after the summary was computed are added with one
+        grouped query (customers without a summary are computed entirely
+        live). Cancelled orders are ignored and only paid orders count as
+        spent. Status changes of orders already in the summary show up after
+        the next `flask analytics rebuild-customers`.
+        
         Args:
             user_id: User ID
             
@@ -361,23 +369,34 @@ class UserService:
                 error_code=ErrorCodes.USER_NOT_FOUND
             )
         
-        # Get order statistics
-        total_orders = Order.query.filter_by(user_id=user_id).count()
-        completed_orders = Order.query.filter_by(
-            user_id=user_id, 
-            status='completed'
-        ).count()
-        
-        # Get total spent
-        from sqlalchemy import func
-        total_spent = db.session.query(func.sum(Order.total_amount))\
-            .filter_by(user_id=user_id, status='completed').scalar() or 0
+        summary = CustomerSummary.query.get(user_id)
+        # Orders after both the rebuild start and the newest summarized order are not in the summary
+        since = max(summary.computed_at, summary.last_order_at or summary.computed_at) if summary else None
+        
+        paid = Order.payment_status == 'paid'
+        query = db.session.query(
+            func.count(Order.id),
+            func.count(Order.id).filter(paid),
+            func.sum(Order.total).filter(paid),
+            func.min(Order.created_at),
+            func.max(Order.created_at)
+        ).filter(Order.user_id == user_id, Order.status != 'cancelled')
+        if since is not None:
+            query = query.filter(Order.created_at > since)
+        total_orders, paid_orders, total_spent, first_order_at, last_order_at = query.one()
+        
+        if summary is not None:
+            total_orders += summary.order_count
+            paid_orders += summary.paid_order_count
+            total_spent = (total_spent or 0) + summary.total_spent
+            first_order_at = summary.first_order_at or first_order_at
+            last_order_at = last_order_at or summary.last_order_at
         
         return {
             'total_orders': total_orders,
-            'completed_orders': completed_orders,
-            'total_spent': float(total_spent),
+            'completed_orders': paid_orders,
+            'total_spent': float(total_spent or 0),
+            'first_order_at': first_order_at.isoformat() if first_order_at else None,
+            'last_order_at': last_order_at.isoformat() if last_order_at else None,
             'member_since': user.created_at.isoformat() if user.created_at else None,
         }
-
-
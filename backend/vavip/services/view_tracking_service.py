@@ -0,0 +1,150 @@
+"""
+View Tracking Service - Buffered product view counter
+
+Product pages only bump an in-process counter keyed by (product, visitor);
+nothing is written while the request is served. A background task drains
+the buffer every VIEW_FLUSH_INTERVAL seconds and writes the aggregated
+increments in one go:
+
+- daily_product_views: one upsert statement per flush (durable counts that
+  feed the popularity score and conversion analytics)
+- Redis sketches: one pipelined round trip (unique visitors, Top-K views)
+
+Views still buffered when a worker dies (or in a flush that fails) are
+lost, which is acceptable for analytics. Each worker flushes its own
+buffer; upserts are additive, so several workers add up correctly.
+"""
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Tuple
+from flask import current_app
+from ..extensions import db, socketio
+from ..models import DailyProductViews
+from .sketch_service import SketchService
+
+logger = logging.getLogger(__name__)
+
+
+class ViewBuffer:
+    """Thread-safe (product_id, visitor_id) -> count accumulator."""
+
+    def __init__(self):
+        self._counts: Dict[Tuple[int, str], int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, product_id: int, visitor_id: str, count: int = 1) -> int:
+        """Add views and return the number of buffered keys."""
+        with self._lock:
+            self._counts[(product_id, visitor_id)] += count
+            return len(self._counts)
+
+    def drain(self) -> Dict[Tuple[int, str], int]:
+        """Take everything buffered so far, leaving the buffer empty."""
+        with self._lock:
+            counts, self._counts = self._counts, defaultdict(int)
+        return dict(counts)
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+
+_buffer = ViewBuffer()
+_flush_scheduled = threading.Event()
+
+
+class ViewTrackingService:
+    """Records product views without per-request writes."""
+
+    @staticmethod
+    def record_view(product_id: int, visitor_id: str) -> None:
+        """
+        Buffer one product view (no I/O).
+
+        A buffer holding VIEW_BUFFER_MAX_KEYS keys is flushed early in the
+        background instead of waiting for the next tick.
+        """
+        size = _buffer.add(product_id, visitor_id)
+        if size >= current_app.config.get('VIEW_BUFFER_MAX_KEYS', 10000) and not _flush_scheduled.is_set():
+            _flush_scheduled.set()
+            socketio.start_background_task(_flush_in_background, current_app._get_current_object())
+
+    @staticmethod
+    def flush() -> int:
+        """
+        Write buffered views to the database and the Redis sketches.
+
+        Returns:
+            Number of views written
+        """
+        views = _buffer.drain()
+        if not views:
+            return 0
+
+        per_product: Dict[int, int] = defaultdict(int)
+        for (product_id, _visitor), count in views.items():
+            per_product[product_id] += count
+
+        ViewTrackingService._upsert(datetime.utcnow().date(), per_product)
+        db.session.commit()
+        SketchService.record_product_views(views)
+        return sum(per_product.values())
+
+    @staticmethod
+    def pending() -> int:
+        """Number of (product, visitor) keys waiting for the next flush."""
+        return len(_buffer)
+
+    @staticmethod
+    def _upsert(day, per_product: Dict[int, int]) -> None:
+        """Increment daily view rows, inserting missing keys."""
+        table = DailyProductViews.__table__
+        rows = [{'day': day, 'product_id': pid, 'views': count} for pid, count in per_product.items()]
+        dialect = db.session.get_bind().dialect.name
+
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(table).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.day, table.c.product_id],
+                set_={'views': table.c.views + stmt.excluded.views}
+            )
+            db.session.execute(stmt)
+            return
+
+        # Generic fallback: read-modify-write per key
+        for row in rows:
+            existing = db.session.get(DailyProductViews, (row['day'], row['product_id']))
+            if existing is None:
+                db.session.add(DailyProductViews(**row))
+            else:
+                existing.views += row['views']
+
+
+def _flush_in_background(app) -> None:
+    with app.app_context():
+        try:
+            ViewTrackingService.flush()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f'Product view flush failed: {e}')
+        finally:
+            _flush_scheduled.clear()
+
+
+def _flush_loop(app, interval: float) -> None:
+    while True:
+        socketio.sleep(interval)
+        _flush_in_background(app)
+
+
+def init_view_tracking(app) -> None:
+    """Start the periodic view flush (not in tests; tests call flush() directly)."""
+    interval = app.config.get('VIEW_FLUSH_INTERVAL', 0)
+    if app.testing or interval <= 0:
+        return
+    socketio.start_background_task(_flush_loop, app, interval)
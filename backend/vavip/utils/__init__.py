@@ -2,9 +2,9 @@
 Utility functions
 """
 from .validators import validate_email, validate_phone
-from .helpers import generate_slug, paginate_query
+from .helpers import generate_slug, paginate_query, parse_bool
 
-__all__ = ['validate_email', 'validate_phone', 'generate_slug', 'paginate_query']
+__all__ = ['validate_email', 'validate_phone', 'generate_slug', 'paginate_query', 'parse_bool']
 
 
 
@@ -34,8 +34,11 @@ def cache_result(ttl: int = 3600, prefix: str = "default"):
             # Generate cache key
             cache_key = get_cache_key(prefix, *args, **kwargs)
             
-            # Try to get from cache
-            cached = redis_client.get(cache_key)
+            # Try to get from cache (fall through if Redis is slow or down)
+            try:
+                cached = redis_client.get(cache_key)
+            except Exception:
+                return func(*args, **kwargs)
             if cached:
                 try:
                     return json.loads(cached)
@@ -61,23 +64,32 @@ def cache_result(ttl: int = 3600, prefix: str = "default"):
     return decorator
 
 
-def invalidate_cache(prefix: str):
+def invalidate_cache(prefix: str, batch_size: int = 500):
     """
     Invalidate all cache entries with given prefix.
     
+    Keys are found with incremental SCAN rather than KEYS, which blocks
+    Redis for the whole keyspace walk, and deleted page by page.
+    
     Args:
         prefix: Cache key prefix to invalidate
+        batch_size: SCAN COUNT hint (roughly the keys per DEL)
     """
-    from ..extensions import redis_client
+    from ..extensions import get_redis
     
-    if redis_client is None:
+    client = get_redis()
+    if client is None:
         return
     
     try:
         pattern = f"cache:{prefix}:*"
-        keys = redis_client.keys(pattern)
-        if keys:
-            redis_client.delete(*keys)
+        cursor = 0
+        while True:
+            cursor, keys = client.scan(cursor, match=pattern, count=batch_size)
+            if keys:
+                client.delete(*keys)
+            if not cursor:
+                break
     except Exception:
         pass
 
@@ -0,0 +1,113 @@
+"""
+Immutable in-memory category tree snapshot
+
+Built once from all category rows; afterwards slug resolution, parent
+links and subtree expansion are dict lookups. A snapshot is never
+modified: category writes build a new one and swap the reference, so
+readers in other threads always see a consistent tree.
+"""
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+
+class CategoryTree:
+    """
+    Read-only view of the category tree.
+
+    Args:
+        categories: Category dicts (Category.to_dict()) in display order,
+            i.e. ordered by (sort_order, id)
+    """
+
+    __slots__ = ('_nodes', '_slug_ids', '_parents', '_children', '_subtrees')
+
+    def __init__(self, categories: Iterable[Dict]):
+        nodes = {c['id']: MappingProxyType(dict(c)) for c in categories}
+        children: Dict[Optional[int], List[int]] = {}
+        for category_id, node in nodes.items():
+            parent_id = node['parent_id'] if node['parent_id'] in nodes else None
+            children.setdefault(parent_id, []).append(category_id)
+
+        subtrees: Dict[int, FrozenSet[int]] = {}
+
+        def collect(category_id: int, path: Tuple[int, ...]) -> FrozenSet[int]:
+            ids = {category_id}
+            for child_id in children.get(category_id, ()):
+                if child_id not in path:  # Guard against cyclic parent links
+                    ids |= collect(child_id, path + (child_id,))
+            subtrees[category_id] = frozenset(ids)
+            return subtrees[category_id]
+
+        for category_id in nodes:
+            if category_id not in subtrees:
+                collect(category_id, (category_id,))
+
+        self._nodes = MappingProxyType(nodes)
+        self._slug_ids = MappingProxyType({node['slug']: category_id for category_id, node in nodes.items()})
+        self._parents = MappingProxyType({category_id: node['parent_id'] for category_id, node in nodes.items()})
+        self._children = MappingProxyType({k: tuple(v) for k, v in children.items()})
+        self._subtrees = MappingProxyType(subtrees)
+
+    def resolve(self, slug: str) -> Optional[int]:
+        """Category id of a slug, or None."""
+        return self._slug_ids.get(slug)
+
+    def parent_id(self, category_id: int) -> Optional[int]:
+        """Parent id of a category (None for roots and unknown ids)."""
+        return self._parents.get(category_id)
+
+    def subtree_ids(self, slug: str) -> FrozenSet[int]:
+        """Ids of a category and all its descendants (empty for unknown slugs)."""
+        category_id = self._slug_ids.get(slug)
+        return self._subtrees.get(category_id, frozenset())
+
+    def ancestor_ids(self, category_id: int) -> List[int]:
+        """Ids from the root down to the category's parent (breadcrumbs)."""
+        ancestors = []
+        node = self._parents.get(category_id)
+        while node is not None and node not in ancestors and node != category_id:
+            ancestors.append(node)
+            node = self._parents.get(node)
+        return ancestors[::-1]
+
+    def get(self, slug: str, active_only: bool = True, include_children: bool = True) -> Optional[Dict]:
+        """
+        Category dict by slug with its direct children (fresh copy), or None.
+
+        Inactive categories are treated as missing and inactive children
+        are left out when active_only is set.
+        """
+        category_id = self._slug_ids.get(slug)
+        if category_id is None or (active_only and not self._nodes[category_id]['is_active']):
+            return None
+        data = dict(self._nodes[category_id])
+        if include_children:
+            data['children'] = [
+                dict(self._nodes[child_id]) for child_id in self._children.get(category_id, ())
+                if not active_only or self._nodes[child_id]['is_active']
+            ]
+        return data
+
+    def to_list(self, active_only: bool = True, include_children: bool = True) -> List[Dict]:
+        """
+        Nested category dicts (fresh copies, safe to modify).
+
+        Inactive categories are left out together with their subtrees when
+        active_only is set; children keep the display order.
+        """
+        def build(category_id: int) -> Optional[Dict]:
+            node = self._nodes[category_id]
+            if active_only and not node['is_active']:
+                return None
+            data = dict(node)
+            if include_children:
+                data['children'] = [c for c in map(build, self._children.get(category_id, ())) if c is not None]
+            return data
+
+        return [c for c in map(build, self._children.get(None, ())) if c is not None]
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, slug: str) -> bool:
+        return slug in self._slug_ids
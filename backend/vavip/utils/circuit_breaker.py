@@ -0,0 +1,147 @@
+"""
+Circuit breaker for Redis access.
+
+After `failure_threshold` consecutive connection/timeout errors the breaker
+opens and every call fails immediately with CircuitOpenError for
+`reset_timeout` seconds. Then one trial call is let through (half-open);
+success closes the breaker, failure re-opens it.
+"""
+import logging
+import threading
+import time
+import redis
+from redis.client import Pipeline
+from redis.commands.core import Script
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(redis.ConnectionError):
+    """Raised instead of calling Redis while the breaker is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker."""
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = 0.0
+        self._state = self.CLOSED
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+    
+    @property
+    def is_open(self) -> bool:
+        """True while calls would be rejected (no side effects, unlike allow_request)."""
+        with self._lock:
+            return self._state != self.CLOSED and time.monotonic() - self._opened_at < self.reset_timeout
+    
+    def allow_request(self) -> bool:
+        """Return True if a call may be attempted now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                # Let a single trial call through; others keep failing fast
+                self._state = self.HALF_OPEN
+                self._opened_at = time.monotonic()
+                return True
+            return False
+    
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f'Circuit "{self.name}" closed')
+            self._failures = 0
+            self._state = self.CLOSED
+    
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f'Circuit "{self.name}" opened after {self._failures} failures')
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+def _guarded_call(breaker: CircuitBreaker, func, *args, **kwargs):
+    """Call func through the breaker, recording the outcome."""
+    if not breaker.allow_request():
+        raise CircuitOpenError(f'Redis circuit "{breaker.name}" is open')
+    try:
+        result = func(*args, **kwargs)
+    except (redis.ConnectionError, redis.TimeoutError):
+        breaker.record_failure()
+        raise
+    except redis.RedisError:
+        # Redis answered, so the connection itself is healthy
+        breaker.record_success()
+        raise
+    breaker.record_success()
+    return result
+
+
+class GuardedRedis:
+    """
+    Proxy around a redis.Redis client that routes commands through a breaker.
+    
+    Only connection and timeout errors count as failures; command errors
+    (wrong type, etc.) are passed through untouched. Pipelines are guarded
+    on execute(), the only call that talks to Redis.
+    """
+    
+    def __init__(self, client: redis.Redis, breaker: CircuitBreaker):
+        self._client = client
+        self.breaker = breaker
+    
+    @property
+    def client(self) -> redis.Redis:
+        return self._client
+    
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> 'GuardedPipeline':
+        return GuardedPipeline(self._client, self.breaker, transaction, shard_hint)
+    
+    def register_script(self, script) -> Script:
+        """Lua script whose direct calls (EVALSHA, SCRIPT LOAD) also go through the breaker."""
+        return Script(self, script)
+    
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+        
+        def guarded(*args, **kwargs):
+            return _guarded_call(self.breaker, attr, *args, **kwargs)
+        
+        return guarded
+
+
+class GuardedPipeline(Pipeline):
+    """
+    Pipeline whose execute() goes through the breaker.
+    
+    A real redis-py Pipeline, so Lua scripts called on it register with it
+    and execute() loads any the server is missing (SCRIPT EXISTS / LOAD)
+    before sending the queued EVALSHAs.
+    """
+    
+    def __init__(self, client: redis.Redis, breaker: CircuitBreaker, transaction: bool = True, shard_hint=None):
+        super().__init__(client.connection_pool, client.response_callbacks, transaction, shard_hint)
+        self.breaker = breaker
+    
+    def execute(self, raise_on_error: bool = True):
+        return _guarded_call(self.breaker, super().execute, raise_on_error)
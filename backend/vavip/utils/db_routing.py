@@ -0,0 +1,157 @@
+"""
+Read-replica routing for SQLAlchemy sessions.
+
+Replica engines are created from SQLALCHEMY_REPLICA_URIS and owned by a
+ReplicaPool stored in `app.extensions`. Code wrapped in
+`replica_read()` sends its SELECTs to a replica; everything else, flushes,
+INSERT/UPDATE/DELETE statements, and any query issued after the current
+request has written (a flush, or DML / text SQL through session.execute),
+stays on the primary (read-your-writes).
+
+Replica lag is measured on PostgreSQL via pg_last_xact_replay_timestamp()
+and cached for REPLICA_LAG_CHECK_INTERVAL seconds. A replica lagging more
+than the allowed budget is skipped. The budget is resolved per call:
+explicit `max_lag` argument, then REPLICA_ROUTE_MAX_LAG[request.endpoint],
+then REPLICA_MAX_LAG.
+"""
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Optional, Dict, List
+import sqlalchemy as sa
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+
+logger = logging.getLogger(__name__)
+
+# Allowed replica lag (seconds) for the current call; None = use primary
+_replica_max_lag: ContextVar[Optional[float]] = ContextVar('replica_max_lag', default=None)
+
+
+class ReplicaPool:
+    """Replica engines and their last measured lag."""
+    
+    def __init__(self, engines: List[sa.engine.Engine], check_interval: float = 5.0):
+        self.engines = engines
+        self.check_interval = check_interval
+        self._lag: Dict[int, tuple] = {}  # engine index -> (lag_seconds, measured_at)
+        self._lock = threading.Lock()
+    
+    def lag(self, index: int) -> float:
+        """Return replica lag in seconds (inf if the replica is unreachable)."""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._lag.get(index)
+            if cached and now - cached[1] < self.check_interval:
+                return cached[0]
+        
+        lag = self._measure(self.engines[index])
+        with self._lock:
+            self._lag[index] = (lag, now)
+        return lag
+    
+    @staticmethod
+    def _measure(engine: sa.engine.Engine) -> float:
+        if engine.dialect.name != 'postgresql':
+            return 0.0
+        try:
+            with engine.connect() as conn:
+                value = conn.execute(sa.text(
+                    'SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())'
+                )).scalar()
+        except sa.exc.SQLAlchemyError as e:
+            logger.warning(f'Replica lag check failed: {e}')
+            return float('inf')
+        # NULL means the server is not replaying WAL (not a standby)
+        return max(float(value), 0.0) if value is not None else 0.0
+    
+    def choose(self, max_lag: float) -> Optional[sa.engine.Engine]:
+        """Pick a random replica within the lag budget, or None."""
+        candidates = [i for i in range(len(self.engines)) if self.lag(i) <= max_lag]
+        if not candidates:
+            return None
+        return self.engines[random.choice(candidates)]
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that can route reads to replicas."""
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._should_use_replica(clause):
+            pool = current_app.extensions.get('vavip_replicas')
+            if pool is not None:
+                engine = pool.choose(_replica_max_lag.get())
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+    
+    def _should_use_replica(self, clause) -> bool:
+        if _replica_max_lag.get() is None or not has_app_context():
+            return False
+        if self._flushing:
+            return False
+        if isinstance(clause, sa.sql.dml.UpdateBase):
+            return False
+        return not g.get('_db_wrote', False)
+
+
+def _mark_write(session, flush_context):
+    if has_app_context():
+        g._db_wrote = True
+
+
+def _mark_statement_write(orm_execute_state):
+    # Core DML and text SQL sent through session.execute() never flush;
+    # text SQL may write, so anything but a SELECT counts
+    if not orm_execute_state.is_select and has_app_context():
+        g._db_wrote = True
+
+
+def _route_max_lag() -> float:
+    config = current_app.config
+    if has_request_context() and request.endpoint:
+        route_lag = config.get('REPLICA_ROUTE_MAX_LAG', {}).get(request.endpoint)
+        if route_lag is not None:
+            return float(route_lag)
+    return float(config.get('REPLICA_MAX_LAG', 5))
+
+
+def replica_read(max_lag: Optional[float] = None):
+    """
+    Decorator: run the wrapped function's queries on a read replica.
+    
+    Args:
+        max_lag: Maximum acceptable replica lag in seconds
+                 (defaults to the per-route / global config)
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            lag = max_lag if max_lag is not None else _route_max_lag()
+            token = _replica_max_lag.set(lag)
+            try:
+                return f(*args, **kwargs)
+            finally:
+                _replica_max_lag.reset(token)
+        return decorated
+    return decorator
+
+
+def init_replicas(app):
+    """Create replica engines and register the write tracker."""
+    uris = app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+    if not uris:
+        return
+    
+    options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    app.extensions['vavip_replicas'] = ReplicaPool(
+        [sa.create_engine(uri, **options) for uri in uris],
+        check_interval=app.config.get('REPLICA_LAG_CHECK_INTERVAL', 5)
+    )
+    if not sa.event.contains(RoutingSession, 'after_flush', _mark_write):
+        sa.event.listen(RoutingSession, 'after_flush', _mark_write)
+        sa.event.listen(RoutingSession, 'do_orm_execute', _mark_statement_write)
+    app.logger.info(f'Read replicas enabled: {len(uris)}')
@@ -0,0 +1,145 @@
+"""
+In-memory facet index over active products
+
+Every facet value keeps a posting list of product ids stored as a Python
+int bitmap (bit n set = product n is in the list). Filtering is AND across
+facet groups and OR within a group, i.e. plain integer & and |, and a
+count is int.bit_count(), so facet counts never touch the database.
+
+Groups:
+    category        category id
+    price           price bucket label ("0-1000", ..., "50000+")
+    attr:<name>     ProductAttribute value for that attribute name
+"""
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+CATEGORY = 'category'
+PRICE = 'price'
+ATTRIBUTE_PREFIX = 'attr:'
+
+
+def bitmap_ids(bitmap: int) -> List[int]:
+    """Product ids set in a bitmap, ascending."""
+    bits = bin(bitmap)[:1:-1]
+    return [i for i, bit in enumerate(bits) if bit == '1']
+
+
+class FacetIndex:
+    """
+    Posting lists for category, price bucket and attribute facets.
+
+    Args:
+        price_bounds: Ascending bucket boundaries, e.g. [1000, 5000, 10000]
+    """
+
+    def __init__(self, price_bounds: Sequence[float]):
+        self.price_bounds = sorted(float(b) for b in price_bounds)
+        self.all = 0
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._memberships: Dict[int, List[Tuple[str, str]]] = {}
+
+    def copy(self) -> 'FacetIndex':
+        """Independent copy to modify while readers keep using this one."""
+        clone = FacetIndex(self.price_bounds)
+        clone.all = self.all
+        for group, values in self.postings.items():
+            clone.postings[group] = dict(values)
+        clone._memberships = dict(self._memberships)
+        return clone
+
+    def price_bucket(self, price) -> str:
+        """Bucket label of a price."""
+        value = float(price or 0)
+        lower = 0
+        for bound in self.price_bounds:
+            if value < bound:
+                return f'{lower:g}-{bound:g}'
+            lower = bound
+        return f'{lower:g}+'
+
+    def add(self, product_id: int, category_id: Optional[int], price,
+            attributes: Iterable[Tuple[str, str]] = ()) -> None:
+        """Index a product (replacing its previous postings)."""
+        self.remove(product_id)
+        bit = 1 << product_id
+        memberships = [(PRICE, self.price_bucket(price))]
+        if category_id is not None:
+            memberships.append((CATEGORY, str(category_id)))
+        memberships.extend((ATTRIBUTE_PREFIX + name, str(value)) for name, value in attributes)
+
+        self.all |= bit
+        for group, value in memberships:
+            values = self.postings[group]
+            values[value] = values.get(value, 0) | bit
+        self._memberships[product_id] = memberships
+
+    def remove(self, product_id: int) -> None:
+        """Drop a product from every posting list."""
+        memberships = self._memberships.pop(product_id, None)
+        if memberships is None:
+            return
+        mask = ~(1 << product_id)
+        self.all &= mask
+        for group, value in memberships:
+            values = self.postings[group]
+            remaining = values.get(value, 0) & mask
+            if remaining:
+                values[value] = remaining
+            else:
+                values.pop(value, None)
+
+    def matching(self, filters: Dict[str, Iterable[str]], skip: Optional[str] = None) -> int:
+        """
+        Bitmap of products matching the filters.
+
+        Args:
+            filters: group -> selected values (OR within a group, AND across
+                groups; an empty selection matches nothing)
+            skip: Group to leave out (for that group's own counts)
+        """
+        result = self.all
+        for group, selected in filters.items():
+            if group == skip or selected is None:
+                continue
+            values = self.postings.get(group, {})
+            union = 0
+            for value in selected:
+                union |= values.get(str(value), 0)
+            result &= union
+        return result
+
+    def counts(self, filters: Dict[str, Iterable[str]],
+               groups: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, int]]:
+        """
+        Facet counts: for each group, matches per value under all the other
+        groups' filters (so selecting a value does not zero its siblings).
+
+        Args:
+            filters: Current selections
+            groups: Groups to count (default: all)
+
+        Returns:
+            group -> value -> count, values with no matches omitted
+        """
+        result = {}
+        for group in (groups if groups is not None else list(self.postings)):
+            base = self.matching(filters, skip=group)
+            counts = {}
+            for value, bitmap in self.postings.get(group, {}).items():
+                count = (base & bitmap).bit_count()
+                if count:
+                    counts[value] = count
+            result[group] = counts
+        return result
+
+    def __len__(self) -> int:
+        return len(self._memberships)
+
+
+def price_bounds_from_config(raw) -> List[float]:
+    """Parse FACET_PRICE_BOUNDS ("1000,5000" or a list)."""
+    if isinstance(raw, str):
+        raw = [part for part in raw.split(',') if part.strip()]
+    return [float(Decimal(str(bound).strip())) for bound in raw]
@@ -22,6 +22,11 @@ def generate_slug(text, max_length=200):
     return text[:max_length].strip('-')
 
 
+def parse_bool(value) -> bool:
+    """Parse a query-string flag: only 1/true/yes/on (any case) are true."""
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on') if value is not None else False
+
+
 def paginate_query(query, page=1, per_page=20, error_out=False):
     """Paginate a query and return formatted response."""
     pagination = query.paginate(page=page, per_page=per_page, error_out=error_out)
@@ -0,0 +1,188 @@
+"""
+Per-request SQL query counting and timing.
+
+One pair of `before_cursor_execute` / `after_cursor_execute` listeners
+times every statement; they are registered on the Engine class, so the
+primary and the replica engines are covered alike. Each timed statement is
+added to the QueryStats objects active in the current context (each
+request gets one, and `count_queries()` opens one around any block of
+code: tests, CLI commands, benchmarks) and passed to the callbacks
+registered with `on_statement()` (the slow query log). With neither, the
+listeners cost one ContextVar lookup.
+
+After each request:
+- with DEBUG or QUERY_STATS_HEADERS, `X-Query-Count` and `X-Query-Time-Ms`
+  are added to the response;
+- a request running more statements than its budget is logged as a warning
+  together with its most repeated statements (the usual N+1 signature).
+  The budget is QUERY_BUDGETS[request.endpoint], then QUERY_BUDGET.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_START_KEY = 'query_stats_start'
+_WHITESPACE = re.compile(r'\s+')
+
+_active: ContextVar[Tuple['QueryStats', ...]] = ContextVar('query_stats_active', default=())
+# Called as callback(conn, cursor, statement, parameters, context, executemany, seconds)
+_callbacks: List[Callable[..., Any]] = []
+
+
+class QueryStats:
+    """
+    Statement count, total execution time and the executed statements in order.
+
+    Args:
+        keep_parameters: Also keep each statement's bound parameters
+    """
+
+    __slots__ = ('count', 'duration', 'queries', 'keep_parameters')
+
+    def __init__(self, keep_parameters: bool = False):
+        self.count = 0
+        self.duration = 0.0
+        self.queries: List[Tuple[str, Any]] = []  # (statement, parameters or None)
+        self.keep_parameters = keep_parameters
+
+    def record(self, statement: str, parameters: Any, seconds: float) -> None:
+        self.count += 1
+        self.duration += seconds
+        self.queries.append((statement, parameters if self.keep_parameters else None))
+
+    @property
+    def duration_ms(self) -> float:
+        return self.duration * 1000
+
+    @property
+    def statements(self) -> List[str]:
+        return [statement for statement, _ in self.queries]
+
+    def repeated(self, limit: int = 3) -> List[Tuple[str, int]]:
+        """Statements executed more than once, most frequent first (whitespace collapsed)."""
+        return [
+            (_WHITESPACE.sub(' ', statement).strip(), n)
+            for statement, n in Counter(self.statements).most_common(limit) if n > 1
+        ]
+
+    def __repr__(self) -> str:
+        return f'<QueryStats {self.count} queries, {self.duration_ms:.1f} ms>'
+
+
+@contextmanager
+def count_queries(keep_parameters: bool = False) -> Iterator[QueryStats]:
+    """
+    Count the statements executed inside the block.
+
+    Nests freely: an inner block's statements also count for the enclosing
+    block and for the current request.
+
+    Args:
+        keep_parameters: Also keep each statement's bound parameters
+
+    Yields:
+        QueryStats filled in as statements run
+    """
+    _install_listeners()
+    stats = QueryStats(keep_parameters)
+    _active.set(_active.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active.set(tuple(s for s in _active.get() if s is not stats))
+
+
+def on_statement(callback: Callable[..., Any]) -> None:
+    """
+    Call `callback(conn, cursor, statement, parameters, context, executemany, seconds)`
+    after every statement, on any engine (registered once per process).
+    """
+    if callback not in _callbacks:
+        _callbacks.append(callback)
+    _install_listeners()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _callbacks or _active.get():
+        conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get(_START_KEY)
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    for stats in _active.get():
+        stats.record(statement, parameters, elapsed)
+    for callback in _callbacks:
+        callback(conn, cursor, statement, parameters, context, executemany, elapsed)
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute: drop its start time
+    conn = exception_context.connection
+    if conn is not None and conn.info.get(_START_KEY):
+        conn.info[_START_KEY].pop()
+
+
+def _install_listeners() -> None:
+    """Register the engine listeners once per process."""
+    if event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        return
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(Engine, 'handle_error', _handle_error)
+
+
+def query_budget(endpoint: Optional[str] = None) -> int:
+    """Allowed statements per request for an endpoint (QUERY_BUDGETS, then QUERY_BUDGET)."""
+    config = current_app.config
+    return config.get('QUERY_BUDGETS', {}).get(endpoint, config.get('QUERY_BUDGET', 30))
+
+
+def init_query_stats(app):
+    """Register the engine listeners and the per-request hooks."""
+    if not app.config.get('QUERY_STATS_ENABLED', True):
+        return
+    _install_listeners()
+
+    @app.before_request
+    def start_query_stats():
+        stats = QueryStats()
+        g.query_stats = stats
+        _active.set(_active.get() + (stats,))
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = g.get('query_stats')
+        if stats is None:
+            return response
+
+        if app.debug or app.config.get('QUERY_STATS_HEADERS'):
+            response.headers['X-Query-Count'] = str(stats.count)
+            response.headers['X-Query-Time-Ms'] = f'{stats.duration_ms:.1f}'
+
+        budget = query_budget(request.endpoint)
+        if stats.count > budget:
+            repeated = '; '.join(f'{n}x {statement[:200]}' for statement, n in stats.repeated())
+            logger.warning(
+                f'Query budget exceeded: {request.method} {request.path} ({request.endpoint}) ran '
+                f'{stats.count} queries in {stats.duration_ms:.1f} ms, budget {budget}'
+                + (f'; repeated: {repeated}' if repeated else '')
+            )
+        return response
+
+    @app.teardown_request
+    def stop_query_stats(exc=None):
+        stats = g.pop('query_stats', None)
+        if stats is not None:
+            _active.set(tuple(s for s in _active.get() if s is not stats))
@@ -0,0 +1,174 @@
+"""
+Hybrid rate limit storage: per-worker counters synced to Redis in batches.
+
+Registered with the `limits` library under the `hybrid+redis://` and
+`hybrid+rediss://` schemes, so Flask-Limiter picks it up from
+RATELIMIT_STORAGE_URI like any built-in backend.
+
+Each worker counts hits locally and pushes the accumulated delta to Redis
+(INCRBY) once it reaches `sync_batch` hits or `sync_interval` seconds have
+passed. The value seen by a worker is the last Redis total plus its own
+unsynced hits, so a limit can be overshot by at most
+`(workers - 1) * sync_batch` hits per window. Only counter based strategies
+(fixed window, the Flask-Limiter default) are supported.
+
+Syncs go through a circuit breaker: while Redis is failing, workers enforce
+limits from their local counters only and skip the network round-trip.
+The Redis round-trip runs outside the storage lock, so a slow Redis only
+delays the request that triggered the sync; at most one sync per key is in
+flight, and hits arriving meanwhile keep counting locally.
+"""
+import logging
+import threading
+import time
+from typing import Dict, Optional
+import redis
+from limits.storage import Storage
+from .circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+
+class _Counter:
+    """Local view of one rate limit key."""
+    __slots__ = ('remote', 'pending', 'in_flight', 'expires_at', 'synced_at')
+    
+    def __init__(self, expires_at: float):
+        self.remote = 0
+        self.pending = 0
+        self.in_flight = 0  # Hits taken by a sync that has not answered yet
+        self.expires_at = expires_at
+        self.synced_at = 0.0
+    
+    @property
+    def value(self) -> int:
+        return self.remote + self.in_flight + self.pending
+
+
+class HybridRedisStorage(Storage):
+    """Fixed-window counters kept in process, flushed to Redis periodically."""
+    
+    STORAGE_SCHEME = ['hybrid+redis', 'hybrid+rediss']
+    
+    def __init__(
+        self,
+        uri: str,
+        wrap_exceptions: bool = False,
+        sync_interval: float = 1.0,
+        sync_batch: int = 10,
+        key_prefix: str = 'LIMITS',
+        breaker_threshold: int = 5,
+        breaker_reset_timeout: float = 30.0,
+        **options
+    ):
+        self.sync_interval = float(sync_interval)
+        self.sync_batch = int(sync_batch)
+        self.key_prefix = key_prefix
+        self._redis = redis.from_url(uri.replace('hybrid+', '', 1), **options)
+        self.breaker = CircuitBreaker('ratelimit', int(breaker_threshold), float(breaker_reset_timeout))
+        self._counters: Dict[str, _Counter] = {}
+        self._lock = threading.Lock()
+        self._pruned_at = time.time()
+        super().__init__(uri, wrap_exceptions=wrap_exceptions)
+    
+    @property
+    def base_exceptions(self):
+        return redis.RedisError
+    
+    def _redis_key(self, key: str) -> str:
+        return f'{self.key_prefix}:{key}'
+    
+    def _counter(self, key: str, expiry: Optional[int], now: float) -> Optional[_Counter]:
+        counter = self._counters.get(key)
+        if counter is not None and counter.expires_at <= now:
+            counter = None
+            del self._counters[key]
+        if counter is None and expiry is not None:
+            counter = _Counter(now + expiry)
+            self._counters[key] = counter
+        return counter
+    
+    def _push(self, key: str, delta: int, expiry: int) -> Optional[tuple]:
+        """INCRBY the delta in Redis (called without the lock); (total, ttl), or None on failure."""
+        if not self.breaker.allow_request():
+            return None
+        
+        redis_key = self._redis_key(key)
+        try:
+            pipe = self._redis.pipeline()
+            pipe.incrby(redis_key, delta)
+            pipe.ttl(redis_key)
+            total, ttl = pipe.execute()
+            if ttl < 0:
+                self._redis.expire(redis_key, expiry)
+                ttl = expiry
+        except redis.RedisError as e:
+            self.breaker.record_failure()
+            logger.warning(f'Rate limit sync failed for {key}: {e}')
+            return None
+        
+        self.breaker.record_success()
+        return int(total), ttl
+    
+    def _prune(self, now: float) -> None:
+        if now - self._pruned_at < 60:
+            return
+        self._pruned_at = now
+        for key in [k for k, c in self._counters.items() if c.expires_at <= now]:
+            del self._counters[key]
+    
+    def incr(self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1) -> int:
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            counter = self._counter(key, expiry, now)
+            counter.pending += amount
+            if counter.in_flight or (
+                counter.pending < self.sync_batch and now - counter.synced_at < self.sync_interval
+            ):
+                return counter.value
+            # Take the delta under the lock; the round-trip happens outside it
+            delta, counter.pending, counter.in_flight = counter.pending, 0, counter.pending
+            counter.synced_at = now
+        
+        result = self._push(key, delta, expiry)
+        
+        with self._lock:
+            counter.in_flight = 0
+            if result is None:
+                # Keep counting locally; the next sync retries the whole delta
+                counter.pending += delta
+            else:
+                total, ttl = result
+                counter.remote = total
+                counter.expires_at = now + ttl
+            return counter.value
+    
+    def get(self, key: str) -> int:
+        with self._lock:
+            counter = self._counter(key, None, time.time())
+            return counter.value if counter else 0
+    
+    def get_expiry(self, key: str) -> float:
+        with self._lock:
+            counter = self._counter(key, None, time.time())
+            return counter.expires_at if counter else time.time()
+    
+    def check(self) -> bool:
+        try:
+            return self._redis.ping()
+        except redis.RedisError:
+            return False
+    
+    def reset(self) -> Optional[int]:
+        with self._lock:
+            self._counters.clear()
+        keys = list(self._redis.scan_iter(f'{self.key_prefix}:*'))
+        if keys:
+            return self._redis.delete(*keys)
+        return 0
+    
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._counters.pop(key, None)
+        self._redis.delete(self._redis_key(key))
@@ -0,0 +1,82 @@
+"""
+Request body parsing with a per-request cache.
+
+The JSON body is decoded at most once per request and shared between
+rate-limit key functions, schema validation and views.
+Uses orjson when installed, falling back to the stdlib json module.
+"""
+import json
+from typing import Any
+from flask import g, request
+from .errors import ValidationError, ErrorCodes
+
+try:
+    import orjson
+    
+    def _loads(raw: bytes) -> Any:
+        return orjson.loads(raw)
+    
+    _DECODE_ERRORS = (orjson.JSONDecodeError, UnicodeDecodeError)
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+    
+    def _loads(raw: bytes) -> Any:
+        return json.loads(raw)
+    
+    _DECODE_ERRORS = (json.JSONDecodeError, UnicodeDecodeError)
+
+_MISSING = object()
+
+
+def get_json_body(silent: bool = False) -> Any:
+    """
+    Return the decoded JSON body of the current request.
+    
+    Args:
+        silent: Return None instead of raising on malformed JSON
+    
+    Returns:
+        Decoded JSON value, or None if the request has no JSON body
+    
+    Raises:
+        ValidationError: If the body is not valid JSON and silent is False
+    """
+    # g outlives the request when an app context was already active (tests,
+    # nested contexts), so the cache entry is tied to the request it decoded
+    current = request._get_current_object()
+    owner, cached = g.get('_json_body', (None, _MISSING))
+    if owner is not current or cached is _MISSING:
+        cached = _parse_body()
+        g._json_body = (current, cached)
+    
+    if isinstance(cached, _InvalidBody):
+        if silent:
+            return None
+        raise ValidationError('Invalid JSON body', ErrorCodes.INVALID_FORMAT)
+    return cached
+
+
+def get_json_field(name: str, default: Any = None) -> Any:
+    """Return a top-level field of the JSON body (never raises)."""
+    data = get_json_body(silent=True)
+    if isinstance(data, dict):
+        return data.get(name, default)
+    return default
+
+
+class _InvalidBody:
+    """Marker cached for bodies that failed to decode."""
+
+
+def _parse_body() -> Any:
+    if not request.is_json:
+        return None
+    
+    raw = request.get_data(cache=True)
+    if not raw:
+        return None
+    
+    try:
+        return _loads(raw)
+    except _DECODE_ERRORS:
+        return _InvalidBody()
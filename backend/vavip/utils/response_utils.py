@@ -56,7 +56,7 @@ def error_response(message: str, error_code: Optional[str] = None, status_code:
 
 
 def paginated_response(items: List[Any], pagination: Pagination, 
-                      data_key: str = 'items') -> tuple:
+                      data_key: str = 'items', extra: Optional[dict] = None) -> tuple:
     """
     Create a standardized paginated response.
     
@@ -64,11 +64,12 @@ def paginated_response(items: List[Any], pagination: Pagination,
         items: List of items to return
         pagination: SQLAlchemy Pagination object
         data_key: Key name for items in response
+        extra: Optional additional top-level keys (e.g. facet counts)
     
     Returns:
         Tuple of (jsonify response, status_code)
     """
-    return jsonify({
+    response = {
         data_key: items,
         'total': pagination.total,
         'pages': pagination.pages,
@@ -76,7 +77,10 @@ def paginated_response(items: List[Any], pagination: Pagination,
         'per_page': pagination.per_page,
         'has_next': pagination.has_next,
         'has_prev': pagination.has_prev
-    }), 200
+    }
+    if extra:
+        response.update(extra)
+    return jsonify(response), 200
 
 
 
@@ -3,15 +3,16 @@ Utility for validating request data with Marshmallow schemas.
 """
 from marshmallow import ValidationError as MarshmallowValidationError
 from ..utils.errors import ValidationError
+from .request_body import get_json_body
 
 
-def validate_request(schema_class, data):
+def validate_request(schema_class, data=None):
     """
     Validate request data using a Marshmallow schema.
     
     Args:
         schema_class: Marshmallow Schema class
-        data: Request data to validate
+        data: Request data to validate (defaults to the cached JSON body)
     
     Returns:
         Validated and deserialized data
@@ -19,6 +20,9 @@ def validate_request(schema_class, data):
     Raises:
         ValidationError: If validation fails
     """
+    if data is None:
+        data = get_json_body() or {}
+    
     schema = schema_class()
     try:
         return schema.load(data)
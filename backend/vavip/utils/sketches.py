@@ -0,0 +1,91 @@
+"""
+Probabilistic sketches stored in Redis
+
+- Distinct counts use Redis HyperLogLog (PFADD / PFCOUNT, ~0.81% error,
+  at most 12 KB per key; PFCOUNT over several keys counts their union).
+- Frequencies use a Count-Min sketch kept in a Redis hash (`depth` rows of
+  `width` counters, fields "<row>:<column>"). Estimates never undercount
+  and overcount by at most 2N/width with high probability.
+- Heavy hitters are tracked in a sorted set bounded to `k` members and
+  scored with the Count-Min estimate (the usual CMS + heap Top-K).
+
+Count-Min updates and the Top-K update run in one Lua script, so recording
+an event is a single round trip (and can be pipelined).
+"""
+import hashlib
+from typing import Dict, Iterable, List, Tuple
+from redis.commands.core import Script
+
+# KEYS: cms hash, top-k zset. ARGV: member, increment, k, ttl, fields...
+_CMS_TOPK_ADD = """
+local estimate = nil
+for i = 5, #ARGV do
+    local value = redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[2])
+    if estimate == nil or value < estimate then
+        estimate = value
+    end
+end
+redis.call('ZADD', KEYS[2], estimate, ARGV[1])
+redis.call('ZREMRANGEBYRANK', KEYS[2], 0, -(tonumber(ARGV[3]) + 1))
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+return estimate
+"""
+
+
+class CountMinTopK:
+    """
+    Count-Min sketch with a bounded Top-K sorted set.
+
+    Args:
+        width: Counters per row (error ~ 2/width of the total count)
+        depth: Number of rows (failure probability ~ 0.5 ** depth)
+        k: Heavy hitters kept in the sorted set
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4, k: int = 50):
+        self.width = width
+        self.depth = depth
+        self.k = k
+        # Created once and not bound to a client: every call names its client or pipeline
+        self._script = Script(None, _CMS_TOPK_ADD.encode('utf-8'))
+
+    def fields(self, member) -> List[str]:
+        """Hash fields for a member: one column per row (double hashing)."""
+        digest = hashlib.blake2b(str(member).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [f'{row}:{(h1 + row * h2) % self.width}' for row in range(self.depth)]
+
+    def add(self, client, cms_key: str, topk_key: str, member, count: int = 1,
+            ttl: int = 86400, pipe=None):
+        """
+        Record `count` occurrences of member.
+
+        Args:
+            client: Redis client (used when no pipeline is given)
+            pipe: Optional pipeline to queue the call on (loads the script on execute)
+
+        Returns:
+            New estimate for member (or the pipeline when queued)
+        """
+        return self._script(
+            keys=[cms_key, topk_key],
+            args=[member, count, self.k, ttl, *self.fields(member)],
+            client=client if pipe is None else pipe
+        )
+
+    @staticmethod
+    def merge_top(scored: Iterable[List[Tuple[str, float]]], limit: int) -> List[Tuple[str, int]]:
+        """
+        Merge Top-K lists of several periods (e.g. days) by summing scores.
+
+        Members that fell out of one period's top set contribute nothing for
+        that period, so merged counts are lower bounds.
+        """
+        totals: Dict[str, float] = {}
+        for period in scored:
+            for member, score in period:
+                totals[member] = totals.get(member, 0) + score
+        ranked = sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+        return [(member, int(score)) for member, score in ranked[:limit]]
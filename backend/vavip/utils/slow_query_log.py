@@ -0,0 +1,220 @@
+"""
+Slow SQL statement log.
+
+Every statement running longer than SLOW_QUERY_THRESHOLD_MS (timed by the
+shared engine listeners in utils/query_stats.py) is written as one JSON
+line to logs/vavip_slow_queries.log (rotated like vavip.log):
+
+    {"ts": ..., "duration_ms": 412.7, "fingerprint": "3f9c0a1e5b7d",
+     "statement": "SELECT ... WHERE products.category_id IN (...) LIMIT ?",
+     "params": {"param_1": "int", ...}, "executemany": false,
+     "call_site": "vavip.services.product_service:ProductService.get_products:318",
+     "request": {"method": "GET", "path": "/api/products/", "endpoint": "products.get_products"},
+     "database": "vavip", "plan": [...]}
+
+Statements are normalized (literals become `?`, IN lists `(...)`) and
+fingerprinted so occurrences of the same query group together; bound
+parameters are logged as type shapes only, never values. The call site is
+the innermost frame in vavip/services (else vavip/api, else any vavip
+module outside utils).
+
+On PostgreSQL a sample (SLOW_QUERY_EXPLAIN_SAMPLE, 0..1) of slow SELECTs
+also gets `EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`, at most once per
+fingerprint every SLOW_QUERY_EXPLAIN_INTERVAL seconds. ANALYZE runs the
+statement a second time, so only compiled SELECTs are explained (never
+text SQL or DML, including UPDATEs behind a leading WITH), and the EXPLAIN
+is always rolled back to a savepoint on the same connection, so neither
+its effects nor a failure reach the caller's transaction.
+"""
+import hashlib
+import json
+import logging
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Dict, Optional
+from flask import has_request_context, request
+from .query_stats import on_statement
+
+logger = logging.getLogger(__name__)
+# JSON lines only go to the slow query file, never to the application logs
+slow_query_logger = logging.getLogger('vavip.slow_queries')
+slow_query_logger.propagate = False
+slow_query_logger.addHandler(logging.NullHandler())
+
+_MAX_PARAMS = 50
+
+_settings = {'threshold': 0.2, 'explain_sample': 0.0, 'explain_interval': 300.0}
+_explained: Dict[str, float] = {}  # fingerprint -> last EXPLAIN (monotonic)
+_explain_lock = threading.Lock()
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.$])-?\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)\s*,?)+\)', re.IGNORECASE)
+_VALUES_LIST = re.compile(r'(\bVALUES\s*\([^()]*\))(?:\s*,\s*\([^()]*\))+', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(statement: str) -> str:
+    """Statement with literals replaced by `?` and IN / multi-row VALUES lists collapsed."""
+    sql = _WHITESPACE.sub(' ', statement).strip()
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _VALUES_LIST.sub(r'\1, ...', sql)
+
+
+def fingerprint(normalized: str) -> str:
+    """Short stable id of a normalized statement."""
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12]
+
+
+def _type_name(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return f'{type(value).__name__}[{len(value)}]'
+    return type(value).__name__
+
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> Any:
+    """
+    Types of the bound parameters (values are never logged).
+
+    Returns:
+        {name: type} for named parameters, [type, ...] for positional ones;
+        for executemany {'rows': n, 'shape': shape of the first row}
+    """
+    if executemany:
+        rows = list(parameters or ())
+        return {'rows': len(rows), 'shape': parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: _type_name(value) for key, value in list(parameters.items())[:_MAX_PARAMS]}
+    if isinstance(parameters, (list, tuple)):
+        return [_type_name(value) for value in parameters[:_MAX_PARAMS]]
+    return None
+
+
+def call_site() -> Optional[str]:
+    """Innermost service frame (else API view, else other vavip code) as module:qualname:line."""
+    candidates = {}
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if module.startswith('vavip.') and not module.startswith('vavip.utils.'):
+            rank = 0 if module.startswith('vavip.services.') else 1 if module.startswith('vavip.api.') else 2
+            if rank not in candidates:
+                code = frame.f_code
+                candidates[rank] = f'{module}:{getattr(code, "co_qualname", code.co_name)}:{frame.f_lineno}'
+                if rank == 0:
+                    break
+        frame = frame.f_back
+    return candidates[min(candidates)] if candidates else None
+
+
+def _is_read_only(context) -> bool:
+    """Only compiled SELECTs qualify: text SQL and DML (even behind a leading WITH) never do."""
+    compiled = getattr(context, 'compiled', None)
+    if compiled is None or context.isinsert or context.isupdate or context.isdelete:
+        return False
+    return bool(getattr(compiled.statement, 'is_select', False))
+
+
+def _should_explain(conn, context, executemany: bool, key: str) -> bool:
+    if executemany or conn.dialect.name != 'postgresql' or not _is_read_only(context):
+        return False
+    if random.random() >= _settings['explain_sample']:
+        return False
+    now = time.monotonic()
+    with _explain_lock:
+        if now - _explained.get(key, float('-inf')) < _settings['explain_interval']:
+            return False
+        if len(_explained) > 10000:
+            _explained.clear()
+        _explained[key] = now
+    return True
+
+
+def _explain(cursor, statement: str, parameters) -> Optional[Any]:
+    """EXPLAIN (ANALYZE, BUFFERS) on the raw DBAPI connection, undone through a savepoint."""
+    raw = cursor.connection.cursor()
+    try:
+        raw.execute('SAVEPOINT slow_query_explain')
+        try:
+            raw.execute(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}', parameters)
+            plan = raw.fetchone()[0]
+        finally:
+            # Always roll back: whatever ANALYZE executed must not outlive the EXPLAIN
+            raw.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+        return json.loads(plan) if isinstance(plan, str) else plan
+    except Exception as e:
+        logger.warning(f'Slow query EXPLAIN failed: {e}')
+        return None
+    finally:
+        raw.close()
+
+
+def _record(conn, cursor, statement, parameters, context, executemany, elapsed):
+    if elapsed < _settings['threshold']:
+        return
+
+    try:
+        normalized = normalize_sql(statement)
+        key = fingerprint(normalized)
+        entry = {
+            'ts': datetime.now(timezone.utc).isoformat(),
+            'duration_ms': round(elapsed * 1000, 1),
+            'fingerprint': key,
+            'statement': normalized,
+            'params': parameter_shape(parameters, executemany),
+            'executemany': executemany,
+            'call_site': call_site(),
+            'request': {
+                'method': request.method, 'path': request.path, 'endpoint': request.endpoint
+            } if has_request_context() else None,
+            'database': conn.engine.url.database,
+        }
+        if _should_explain(conn, context, executemany, key):
+            entry['plan'] = _explain(cursor, statement, parameters)
+        slow_query_logger.warning(json.dumps(entry, default=str))
+    except Exception as e:  # Never let logging break the query
+        logger.warning(f'Slow query logging failed: {e}')
+
+
+def _setup_handler(path: Path) -> None:
+    """Attach the rotating JSON-lines handler once per file."""
+    slow_query_logger.setLevel(logging.WARNING)
+    target = str(path.resolve())
+    if any(getattr(h, 'baseFilename', None) == target for h in slow_query_logger.handlers):
+        return
+    handler = RotatingFileHandler(
+        path,
+        maxBytes=10 * 1024 * 1024,  # 10MB
+        backupCount=10
+    )
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    slow_query_logger.addHandler(handler)
+
+
+def init_slow_query_log(app):
+    """Subscribe to the statement timings and attach the slow query log file."""
+    if not app.config.get('SLOW_QUERY_LOG_ENABLED', True):
+        return
+    _settings.update(
+        threshold=app.config.get('SLOW_QUERY_THRESHOLD_MS', 200) / 1000,
+        explain_sample=app.config.get('SLOW_QUERY_EXPLAIN_SAMPLE', 0.0),
+        explain_interval=app.config.get('SLOW_QUERY_EXPLAIN_INTERVAL', 300),
+    )
+
+    logs_dir = Path('logs')
+    logs_dir.mkdir(exist_ok=True)
+    _setup_handler(logs_dir / 'vavip_slow_queries.log')
+    _install_listeners()
+
+
+def _install_listeners() -> None:
+    """Subscribe to the shared statement timings (once per process)."""
+    on_statement(_record)
@@ -0,0 +1,123 @@
+"""
+Time bucketing for analytics charts
+
+Buckets (day / week / month) are laid out in the local timezone
+(ANALYTICS_TIMEZONE, Moscow by default) and translated into half-open UTC
+ranges, since timestamps are stored as naive UTC. Queries then filter the
+raw column with plain range predicates, so an index on the column is used,
+instead of wrapping it in date(). Empty buckets are filled on the server.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from flask import current_app
+from sqlalchemy import case, func, literal
+
+GRANULARITIES = ('day', 'week', 'month')
+
+
+class Bucket(NamedTuple):
+    """One chart bucket: local start date and its UTC [start, end) range."""
+    label: date
+    start: datetime
+    end: datetime
+
+
+def get_timezone(name: Optional[str] = None) -> ZoneInfo:
+    """
+    Resolve a timezone name (defaults to ANALYTICS_TIMEZONE).
+
+    Raises:
+        ValueError: If the timezone is unknown
+    """
+    name = name or current_app.config.get('ANALYTICS_TIMEZONE', 'Europe/Moscow')
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f'Unknown timezone: {name}')
+
+
+def local_date(moment: Optional[datetime] = None, tz: Optional[ZoneInfo] = None) -> date:
+    """Local calendar date of a naive UTC datetime (defaults to now)."""
+    moment = moment or datetime.utcnow()
+    return moment.replace(tzinfo=timezone.utc).astimezone(tz or get_timezone()).date()
+
+
+def truncate(day: date, granularity: str) -> date:
+    """Start date of the bucket containing day (weeks start on Monday)."""
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    raise ValueError(f'Unsupported granularity: {granularity}. Use one of: {", ".join(GRANULARITIES)}')
+
+
+def _next_start(day: date, granularity: str) -> date:
+    if granularity == 'day':
+        return day + timedelta(days=1)
+    if granularity == 'week':
+        return day + timedelta(days=7)
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _local_midnight_utc(day: date, tz: ZoneInfo) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=tz).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def make_buckets(start: datetime, end: datetime, granularity: str = 'day',
+                 tz: Optional[ZoneInfo] = None) -> List[Bucket]:
+    """
+    Buckets covering the local dates of [start, end].
+
+    Args:
+        start: Naive UTC datetime
+        end: Naive UTC datetime
+        granularity: 'day', 'week' or 'month'
+        tz: Local timezone (defaults to ANALYTICS_TIMEZONE)
+
+    Returns:
+        Consecutive buckets; the first contains start, the last contains end
+    """
+    tz = tz or get_timezone()
+    local_start = start.replace(tzinfo=timezone.utc).astimezone(tz).date()
+    local_end = end.replace(tzinfo=timezone.utc).astimezone(tz).date()
+
+    buckets = []
+    label = truncate(local_start, granularity)
+    while label <= local_end:
+        next_label = _next_start(label, granularity)
+        buckets.append(Bucket(label, _local_midnight_utc(label, tz), _local_midnight_utc(next_label, tz)))
+        label = next_label
+    return buckets
+
+
+def bucket_index(column, buckets: List[Bucket], dialect: str):
+    """
+    SQL expression giving the 0-based bucket index of a timestamp column.
+
+    Uses width_bucket() over the bucket boundaries on PostgreSQL (binary
+    search per row) and a CASE ladder elsewhere. Rows outside the buckets
+    must be excluded with range predicates by the caller.
+    """
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import array
+        return func.width_bucket(column, array([b.start for b in buckets])) - 1
+    return case(
+        *[(column < b.end, literal(i)) for i, b in enumerate(buckets)],
+        else_=literal(len(buckets) - 1)
+    )
+
+
+def fill_gaps(buckets: List[Bucket], rows: Dict[int, Any],
+              build: Callable[[Bucket, Optional[Any]], dict]) -> List[dict]:
+    """
+    One result per bucket, in order.
+
+    Args:
+        buckets: Buckets from make_buckets
+        rows: Query rows keyed by bucket index (missing = empty bucket)
+        build: Makes the output dict from a bucket and its row (or None)
+    """
+    return [build(bucket, rows.get(i)) for i, bucket in enumerate(buckets)]